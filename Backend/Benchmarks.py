@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 timeKernel = None
@@ -36,4 +37,4 @@ def initCPU():
 	timeKernel = Utils.timeKernel
 
 
-autoinit()
+bindBackend(globals(), autoinit)
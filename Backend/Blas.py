@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 toVectorAddVector = None
@@ -9,6 +10,8 @@ vectorL1Norm = None
 mulMatrixOnMatrix = None
 sumOnMatrix = None
 
+mulInt8MatrixOnMatrix = None
+
 
 def autoinit():
 	if Config.backend == Config.Backend.cuda:
@@ -89,14 +92,18 @@ def initCPU():
 	mulMatrixOnMatrix = NumpyBlas.mulMatrixOnMatrix
 	sumOnMatrix = NumpyBlas.sumOnMatrix
 
+	global mulInt8MatrixOnMatrix
+	mulInt8MatrixOnMatrix = NumpyBlas.mulInt8MatrixOnMatrix
+
 
 def initIntel():
 	initCPU()
 
 	from PuzzleLib.Intel.Wrappers import DNNLBlas
 
-	global mulMatrixOnMatrix
+	global mulMatrixOnMatrix, mulInt8MatrixOnMatrix
 	mulMatrixOnMatrix = DNNLBlas.mulMatrixOnMatrix
+	mulInt8MatrixOnMatrix = DNNLBlas.mulInt8MatrixOnMatrix
 
 
-autoinit()
+bindBackend(globals(), autoinit)
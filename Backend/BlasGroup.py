@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 mulTensorOnVecGroup = None
@@ -62,7 +63,12 @@ def initOpenCL():
 
 
 def initCPU():
-	pass
+	from PuzzleLib.CPU.Wrappers import NumpyBlasGroup
+
+	global mulTensorOnVecGroup, sumOnTensorGroup, mulTensorBatch
+	mulTensorOnVecGroup = NumpyBlasGroup.mulTensorOnVecGroup
+	sumOnTensorGroup = NumpyBlasGroup.sumOnTensorGroup
+	mulTensorBatch = NumpyBlasGroup.mulTensorBatch
 
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,6 +1,7 @@
 from enum import Enum
 
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 ConvFwdAlgo = None
@@ -304,9 +305,33 @@ def initCPU():
 	def wrapPoolNd(data, size, stride, pad, mode, test):
 		return NumpyDnn.pool2d(data, size, stride, pad, mode), None
 
+	def wrapPoolNdBackward(indata, outdata, grad, _, size, stride, pad, mode):
+		return NumpyDnn.pool2dBackward(indata, outdata, grad, size, stride, pad, mode)
+
 	global PoolMode, poolNd, poolNdBackward
 	PoolMode = NumpyDnn.PoolMode
 	poolNd = wrapPoolNd
+	poolNdBackward = wrapPoolNdBackward
+
+	def wrapMapLRN(data, means, N, alpha, beta, K, test):
+		return NumpyDnn.mapLRN(data, means, N, alpha, beta, K), None
+
+	def wrapMapLRNBackward(data, _, grad, means, __, N, alpha, beta, K):
+		return NumpyDnn.mapLRNBackward(data, grad, means, N, alpha, beta, K)
+
+	global mapLRN, mapLRNBackward
+	mapLRN = wrapMapLRN
+	mapLRNBackward = wrapMapLRNBackward
+
+	def wrapCrossMapLRN(data, N, alpha, beta, K, test):
+		return NumpyDnn.crossMapLRN(data, N, alpha, beta, K), None
+
+	def wrapCrossMapLRNBackward(data, _, grad, __, N, alpha, beta, K):
+		return NumpyDnn.crossMapLRNBackward(data, grad, N, alpha, beta, K)
+
+	global crossMapLRN, crossMapLRNBackward
+	crossMapLRN = wrapCrossMapLRN
+	crossMapLRNBackward = wrapCrossMapLRNBackward
 
 	class ProxyBatchNormMode(Enum):
 		perActivation = 0
@@ -418,4 +443,4 @@ def initIntel():
 	crossMapLRNBackward = wrapCrossMapLRNBackward
 
 
-autoinit()
+bindBackend(globals(), autoinit)
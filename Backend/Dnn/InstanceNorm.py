@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 instanceNorm2d = None
@@ -67,4 +68,4 @@ def initIntel():
 	instanceNorm2dBackward = wrapInstanceNorm2dBackward
 
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 RNNMode = None
@@ -102,4 +103,4 @@ def initCPU():
 	deviceSupportsBatchHint = lambda: False
 
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 spatialTf = None
@@ -36,7 +37,11 @@ def initOpenCL():
 
 
 def initCPU():
-	pass
+	from PuzzleLib.CPU.Wrappers import NumpySpatialTf
+
+	global spatialTf, spatialTfBackward
+	spatialTf = NumpySpatialTf.spatialTf
+	spatialTfBackward = NumpySpatialTf.spatialTfBackward
 
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 bceKer = None
@@ -58,7 +59,11 @@ def initOpenCL():
 
 
 def initCPU():
-	pass
+	from PuzzleLib.CPU.Kernels import CTC
+
+	global ctcLoss, ctcLossTest
+	ctcLoss = CTC.ctcLoss
+	ctcLossTest = CTC.ctcLossTest
 
 
 def initIntel():
@@ -74,4 +79,4 @@ def initIntel():
 	svmKernel = Costs.svm
 
 
-autoinit()
+bindBackend(globals(), autoinit)
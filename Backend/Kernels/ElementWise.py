@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 sigmoidKer = None
@@ -26,6 +27,7 @@ classicMomSGDKer = None
 nesterovMomSGDKer = None
 rmspropKer = None
 adamKer = None
+adamRowKer = None
 rmspropGravesKer = None
 adagradKer = None
 adadeltaKer = None
@@ -81,11 +83,12 @@ def initCuda():
 	toVectorAddVectorKer = ElementWise.toVectorAddVectorKer
 
 	global classicMomSGDKer, nesterovMomSGDKer, rmspropKer, adamKer, rmspropGravesKer, adagradKer, adadeltaKer
-	global smorms3Ker
+	global smorms3Ker, adamRowKer
 	classicMomSGDKer = ElementWise.classicMomSGDKer
 	nesterovMomSGDKer = ElementWise.nesterovMomSGDKer
 	rmspropKer = ElementWise.rmspropKer
 	adamKer = ElementWise.adamKer
+	adamRowKer = ElementWise.adamRowKer
 	rmspropGravesKer = ElementWise.rmspropGravesKer
 	adagradKer = ElementWise.adagradKer
 	adadeltaKer = ElementWise.adadeltaKer
@@ -132,11 +135,12 @@ def initOpenCL():
 	toVectorAddVectorKer = ElementWise.toVectorAddVectorKer
 
 	global classicMomSGDKer, nesterovMomSGDKer, rmspropKer, adamKer, rmspropGravesKer, adagradKer, adadeltaKer
-	global smorms3Ker
+	global smorms3Ker, adamRowKer
 	classicMomSGDKer = ElementWise.classicMomSGDKer
 	nesterovMomSGDKer = ElementWise.nesterovMomSGDKer
 	rmspropKer = ElementWise.rmspropKer
 	adamKer = ElementWise.adamKer
+	adamRowKer = ElementWise.adamRowKer
 	rmspropGravesKer = ElementWise.rmspropGravesKer
 	adagradKer = ElementWise.adagradKer
 	adadeltaKer = ElementWise.adadeltaKer
@@ -179,11 +183,12 @@ def initCPU():
 	toVectorAddVectorKer = ElementWise.toVectorAddVectorKer
 
 	global classicMomSGDKer, nesterovMomSGDKer, rmspropKer, adamKer, rmspropGravesKer, adagradKer, adadeltaKer
-	global smorms3Ker
+	global smorms3Ker, adamRowKer
 	classicMomSGDKer = ElementWise.classicMomSGDKer
 	nesterovMomSGDKer = ElementWise.nesterovMomSGDKer
 	rmspropKer = ElementWise.rmspropKer
 	adamKer = ElementWise.adamKer
+	adamRowKer = ElementWise.adamRowKer
 	rmspropGravesKer = ElementWise.rmspropGravesKer
 	adagradKer = ElementWise.adagradKer
 	adadeltaKer = ElementWise.adadeltaKer
@@ -197,5 +202,9 @@ def initCPU():
 	l1penaltyKer = ElementWise.l1penaltyKer
 	l1gradKer = ElementWise.l1gradKer
 
+	global castFP16toFP32, castFP32toFP16
+	castFP16toFP32 = ElementWise.castFP16toFP32
+	castFP32toFP16 = ElementWise.castFP32toFP16
+
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 embed = None
@@ -33,7 +34,11 @@ def initOpenCL():
 
 
 def initCPU():
-	pass
+	from PuzzleLib.CPU.Kernels import Embedder
+
+	global embed, embedBackwardParams
+	embed = Embedder.embed
+	embedBackwardParams = Embedder.embedBackwardParams
 
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 addVecToMat = None
@@ -35,14 +36,31 @@ def initOpenCL():
 def initCPU():
 	import numpy as np
 	from PuzzleLib.CPU.CPUArray import CPUArray
+	from PuzzleLib.CPU.Kernels import Half
 
 	def wrapAddVecToMat(v, m, axis, out):
+		if m.dtype == Half.bfloat16:
+			outdata = Half.toFloat32(m)
+			wrapAddVecToMat(Half.toFloat32(v), outdata, axis, outdata)
+
+			Half.fromFloat32(outdata, dtype=Half.bfloat16, out=out)
+			return
+
+		mat, outmat = m.get(copy=False), out.get(copy=False)
+
 		if axis == 0:
 			v = v[:, np.newaxis]
+
 		elif axis == 1:
+			if m.shape[-1] != v.shape[-1]:
+				assert m.shape[-1] % v.shape[-1] == 0
+				shape = m.shape[:-1] + (m.shape[-1] // v.shape[-1], v.shape[-1])
+
+				mat, outmat = mat.reshape(shape), outmat.reshape(shape)
+
 			v = v[np.newaxis, :]
 
-		np.add(m.get(copy=False), v.get(copy=False), out=out.get(copy=False))
+		np.add(mat, v.get(copy=False), out=outmat)
 
 	def wrapArgmax(mats, axis):
 		out = np.empty(mats.shape[:axis] + mats.shape[axis + 1:], dtype=np.int32)
@@ -55,4 +73,4 @@ def initCPU():
 	argmax = wrapArgmax
 
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 addVecToMatBatch = None
@@ -36,14 +37,24 @@ def initCPU():
 	import numpy as np
 	from PuzzleLib.CPU.CPUArray import CPUArray
 
+	def wrapAddVecToMatBatch(vs, mats, axis=0, out=None):
+		out = CPUArray.empty(mats.shape, dtype=mats.dtype) if out is None else out
+
+		vs = vs.get(copy=False)
+		vs = vs[:, :, np.newaxis] if axis == 0 else vs[:, np.newaxis, :]
+
+		np.add(mats.get(copy=False), vs, out=out.get(copy=False))
+		return out
+
 	def wrapArgmax(mats, axis):
 		out = np.empty(mats.shape[:axis] + mats.shape[axis + 1:], dtype=np.int32)
 		np.argmax(mats.get(copy=False), axis, out=out)
 
 		return CPUArray(out.shape, out.dtype, data=out, acquire=True)
 
-	global argmaxBatch
+	global addVecToMatBatch, argmaxBatch
+	addVecToMatBatch = wrapAddVecToMatBatch
 	argmaxBatch = wrapArgmax
 
 
-autoinit()
+bindBackend(globals(), autoinit)
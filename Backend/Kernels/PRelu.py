@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 prelu = None
@@ -36,7 +37,12 @@ def initOpenCL():
 
 
 def initCPU():
-	pass
+	from PuzzleLib.CPU.Kernels import PRelu
+
+	global prelu, preluBackwardData, preluBackwardParams
+	prelu = PRelu.prelu
+	preluBackwardData = PRelu.preluBackwardData
+	preluBackwardParams = PRelu.preluBackwardParams
 
 
-autoinit()
+bindBackend(globals(), autoinit)
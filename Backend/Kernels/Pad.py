@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 reflectpad1d = None
@@ -34,11 +35,13 @@ def initOpenCL():
 def initCPU():
 	from PuzzleLib.CPU.Kernels import Pad
 
-	global reflectpad1d
+	global reflectpad1d, reflectpad1dBackward
 	reflectpad1d = Pad.reflectpad1d
+	reflectpad1dBackward = Pad.reflectpad1dBackward
 
-	global reflectpad2d
+	global reflectpad2d, reflectpad2dBackward
 	reflectpad2d = Pad.reflectpad2d
+	reflectpad2dBackward = Pad.reflectpad2dBackward
 
 
-autoinit()
+bindBackend(globals(), autoinit)
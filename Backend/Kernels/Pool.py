@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 maxpool2d = None
@@ -39,7 +40,13 @@ def initOpenCL():
 
 
 def initCPU():
-	pass
+	from PuzzleLib.CPU.Kernels import Pool
+
+	global maxpool2d, maxpool2dBackward, maxunpool2d, maxunpool2dBackward
+	maxpool2d = Pool.maxpool2d
+	maxpool2dBackward = Pool.maxpool2dBackward
+	maxunpool2d = Pool.maxunpool2d
+	maxunpool2dBackward = Pool.maxunpool2dBackward
 
 
-autoinit()
+bindBackend(globals(), autoinit)
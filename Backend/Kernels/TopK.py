@@ -0,0 +1,44 @@
+from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
+
+
+topk = None
+topkBackward = None
+
+
+def autoinit():
+	if Config.backend == Config.Backend.cuda:
+		initCuda()
+	elif Config.backend == Config.Backend.opencl:
+		initOpenCL()
+	elif Config.isCPUBased(Config.backend):
+		initCPU()
+	else:
+		raise Config.ConfigError(Config.backend)
+
+
+def initCuda():
+	from PuzzleLib.Cuda.Kernels import TopK
+
+	global topk, topkBackward
+	topk = TopK.topk
+	topkBackward = TopK.topkBackward
+
+
+def initOpenCL():
+	from PuzzleLib.OpenCL.Kernels import TopK
+
+	global topk, topkBackward
+	topk = TopK.topk
+	topkBackward = TopK.topkBackward
+
+
+def initCPU():
+	from PuzzleLib.CPU.Kernels import TopK
+
+	global topk, topkBackward
+	topk = TopK.topk
+	topkBackward = TopK.topkBackward
+
+
+bindBackend(globals(), autoinit)
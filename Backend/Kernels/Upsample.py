@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 upsample2d = None
@@ -44,10 +45,15 @@ def initOpenCL():
 
 
 def initCPU():
-	from PuzzleLib.CPU.Kernels import Upsample2D
+	from PuzzleLib.CPU.Kernels import Upsample2D, Upsample3D
 
-	global upsample2d
+	global upsample2d, upsample2dBackward
 	upsample2d = Upsample2D.upsample2d
+	upsample2dBackward = Upsample2D.upsample2dBackward
+
+	global upsample3d, upsample3dBackward
+	upsample3d = Upsample3D.upsample3d
+	upsample3dBackward = Upsample3D.upsample3dBackward
 
 
-autoinit()
+bindBackend(globals(), autoinit)
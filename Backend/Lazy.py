@@ -0,0 +1,179 @@
+import sys, time, types, importlib
+from collections import OrderedDict
+
+from PuzzleLib import Config
+
+
+initTimes = OrderedDict()
+
+
+class LazySymbol:
+	__slots__ = ["name", "binder", "target", "resolved"]
+
+
+	def __init__(self, name, binder):
+		self.name, self.binder = name, binder
+		self.target, self.resolved = None, False
+
+
+	def resolve(self):
+		if not self.resolved:
+			self.binder.init()
+
+			self.target = self.binder.namespace[self.name]
+			self.resolved = True
+
+		return self.target
+
+
+	def __call__(self, *args, **kwargs):
+		return self.resolve()(*args, **kwargs)
+
+
+	def __getattr__(self, item):
+		return getattr(self.resolve(), item)
+
+
+	def __getitem__(self, item):
+		return self.resolve()[item]
+
+
+	def __iter__(self):
+		return iter(self.resolve())
+
+
+	def __instancecheck__(self, instance):
+		return isinstance(instance, self.resolve())
+
+
+	def __subclasscheck__(self, subclass):
+		return issubclass(subclass, self.resolve())
+
+
+	def __repr__(self):
+		return "LazySymbol(%s.%s)" % (self.binder.modname, self.name)
+
+
+class LazyBinder:
+	def __init__(self, namespace, autoinit):
+		self.namespace, self.autoinit = namespace, autoinit
+		self.modname = namespace["__name__"]
+
+		self.symbols = {
+			name: LazySymbol(name, self) for name, value in namespace.items()
+			if value is None and not name.startswith("_")
+		}
+
+		self.initialized = False
+
+
+	def bind(self):
+		self.namespace.update(self.symbols)
+
+
+	def init(self):
+		if self.initialized:
+			return
+
+		self.initialized = True
+
+		for name, symbol in self.symbols.items():
+			if self.namespace[name] is symbol:
+				self.namespace[name] = None
+
+		timedInit(self.modname, self.autoinit)
+
+
+def timedInit(modname, autoinit):
+	start = time.perf_counter()
+	autoinit()
+
+	initTimes[modname] = time.perf_counter() - start
+
+
+def bindBackend(namespace, autoinit):
+	if Config.lazyBackendInit:
+		LazyBinder(namespace, autoinit).bind()
+	else:
+		timedInit(namespace["__name__"], autoinit)
+
+
+class LazyPackage(types.ModuleType):
+	def __getattr__(self, name):
+		modname = self.__dict__["lazyExports"].get(name, None)
+
+		if modname is None:
+			raise AttributeError("module '%s' has no attribute '%s'" % (self.__name__, name))
+
+		value = getattr(importlib.import_module("%s.%s" % (self.__name__, modname)), name)
+		super().__setattr__(name, value)
+
+		return value
+
+
+	def __setattr__(self, name, value):
+		if isinstance(value, types.ModuleType) and value.__name__ == "%s.%s" % (self.__name__, name):
+			exports = self.__dict__.get("lazyExports", {})
+
+			if exports.get(name, None) == name and hasattr(value, name):
+				value = getattr(value, name)
+
+		super().__setattr__(name, value)
+
+
+	def __dir__(self):
+		return sorted(set(self.__dict__) | set(self.__dict__["lazyExports"]))
+
+
+def lazyPackage(modname, exports):
+	package = sys.modules[modname]
+
+	package.lazyExports = {name: submodule for submodule, names in exports.items() for name in names}
+	package.__class__ = LazyPackage
+
+	return list(package.lazyExports)
+
+
+def initReport(log=True):
+	report = sorted(initTimes.items(), key=lambda item: item[1], reverse=True)
+
+	if log:
+		width = max((len(modname) for modname, _ in report), default=0)
+		print("[%s] Backend init times (inclusive of nested backend imports):" % Config.libname)
+
+		for modname, secs in report:
+			print("%-*s %.4f secs" % (width, modname, secs))
+
+	return report
+
+
+def unittest():
+	lazyTest()
+
+
+def lazyTest():
+	import numpy as np
+
+	calls = []
+
+	def autoinit():
+		calls.append(True)
+		namespace.update(square=lambda x: x * x, Array=np.ndarray)
+
+	namespace = {"__name__": "LazyTest", "square": None, "Array": None, "unset": None}
+
+	binder = LazyBinder(namespace, autoinit)
+	binder.bind()
+
+	square, Array, unset = namespace["square"], namespace["Array"], namespace["unset"]
+	assert len(calls) == 0
+
+	assert square(3) == 9 and len(calls) == 1
+	assert isinstance(np.empty(1), Array) and len(calls) == 1
+
+	assert namespace["unset"] is None and unset.resolve() is None
+	assert "LazyTest" in dict(initReport(log=False))
+
+
+if __name__ == "__main__":
+	unittest()
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 depthConcat = None
@@ -84,4 +85,4 @@ def initCPU():
 	transpose = wrapTranspose
 
 
-autoinit()
+bindBackend(globals(), autoinit)
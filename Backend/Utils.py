@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 SharedArray = None
@@ -18,6 +19,8 @@ fillNormal = None
 setupDebugAllocator = None
 dtypesSupported = None
 
+synchronize = None
+
 
 def autoinit():
 	if Config.backend == Config.Backend.cuda:
@@ -54,6 +57,11 @@ def initCuda():
 	setupDebugAllocator = CudaUtils.setupDebugAllocator
 	dtypesSupported = CudaUtils.dtypesSupported
 
+	from PuzzleLib.Cuda import Driver
+
+	global synchronize
+	synchronize = Driver.Device.synchronize
+
 
 def initOpenCL():
 	from PuzzleLib.OpenCL import Utils as OpenCLUtils
@@ -79,34 +87,25 @@ def initOpenCL():
 	setupDebugAllocator = OpenCLUtils.setupDebugAllocator
 	dtypesSupported = OpenCLUtils.dtypesSupported
 
+	global synchronize
+	synchronize = lambda: OpenCLUtils.queue.finish()
+
 
 def initCPU():
 	import numpy as np
 
 	from PuzzleLib.CPU.CPUArray import CPUArray
 	from PuzzleLib.CPU import Utils
+	from PuzzleLib.CPU.Kernels.Random import PhiloxGenerator
 
 	class ProxyMemoryPool:
 		def freeHeld(self):
 			pass
 
-	class ProxyRNG:
-		@staticmethod
-		def fillUniform(data, minval=0.0, maxval=1.0):
-			data.set(np.random.uniform(minval, maxval, size=data.shape))
-
-		@staticmethod
-		def fillNormal(data, mean=0.0, sigma=1.0):
-			data.set(np.random.normal(mean, sigma, size=data.shape))
-
-		@staticmethod
-		def fillInteger(data):
-			data.set(np.random.randint(np.iinfo(data.dtype).min, np.iinfo(data.dtype).max, dtype=data.dtype))
-
 	global SharedArray, memoryPool, globalRng
 	SharedArray = Utils.SharedArray
 	memoryPool = ProxyMemoryPool()
-	globalRng = ProxyRNG()
+	globalRng = PhiloxGenerator()
 
 	def wrapCopy(dest, source):
 		if dest is None:
@@ -153,5 +152,8 @@ def initCPU():
 	setupDebugAllocator = lambda: None
 	dtypesSupported = Utils.dtypesSupported
 
+	global synchronize
+	synchronize = lambda: None
+
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,4 +1,5 @@
 from PuzzleLib import Config
+from PuzzleLib.Backend.Lazy import bindBackend
 
 
 GPUArray = None
@@ -66,4 +67,4 @@ def initCPU():
 	maximum = CPUArray.maximum
 
 
-autoinit()
+bindBackend(globals(), autoinit)
@@ -1,11 +1,10 @@
-import json, os, importlib.util
+import json, os, importlib
 
 import numpy as np
 
 from PuzzleLib.Config import libname
 from PuzzleLib.Backend import gpuarray
 
-from PuzzleLib.Modules.Module import Module
 from PuzzleLib.Containers.Node import Node
 
 
@@ -13,33 +12,52 @@ class BlueprintError(Exception):
 	pass
 
 
-class BlueprintFactory:
-	def __init__(self):
-		self.containers = {}
-		self.modules = {}
+class ModuleRegistry:
+	def __init__(self, path, ignore):
+		self.path, self.ignore = path, ignore
+
+		self.paths = None
+		self.classes = {}
+
+
+	def scan(self):
+		if self.paths is not None:
+			return self.paths
+
+		factoryPath = os.path.join(os.path.dirname(__file__), self.path)
+		self.paths = {}
+
+		for file in os.listdir(factoryPath):
+			name, ext = os.path.splitext(file)
+
+			if ext == ".py" and name not in self.ignore:
+				self.paths[name] = "%s.%s.%s" % (libname, self.path, name)
+
+		return self.paths
+
+
+	def __contains__(self, name):
+		return name in self.classes or name in self.scan()
+
 
-		paths = ["Containers", "Modules"]
+	def __getitem__(self, name):
+		cl = self.classes.get(name, None)
 
-		ignores = [
-			{"Node", "Container", "__init__"},
-			{"Module", "__init__"}
-		]
+		if cl is None:
+			cl = getattr(importlib.import_module(self.scan()[name]), name)
+			self.classes[name] = cl
 
-		factories = [self.containers, self.modules]
+		return cl
 
-		for path, ignore, factory in zip(paths, ignores, factories):
-			factoryPath = os.path.join(os.path.dirname(__file__), path)
-			for file in os.listdir(factoryPath):
-				if file.endswith(".py") and os.path.splitext(file)[0] not in ignore:
-					filepath = os.path.abspath(os.path.join(factoryPath, file))
 
-					spec = importlib.util.spec_from_file_location(os.path.basename(filepath)[:-3], filepath)
-					mod = importlib.util.module_from_spec(spec)
+containerRegistry = ModuleRegistry("Containers", ignore={"Node", "Container", "__init__"})
+moduleRegistry = ModuleRegistry("Modules", ignore={"Module", "__init__"})
 
-					spec.loader.exec_module(mod)
 
-					name = os.path.splitext(file)[0]
-					factory[name] = getattr(mod, name)
+class BlueprintFactory:
+	def __init__(self):
+		self.containers = containerRegistry
+		self.modules = moduleRegistry
 
 
 	def build(self, blueprint, log=False, logwidth=20):
@@ -92,6 +110,8 @@ class BlueprintFactory:
 
 
 def load(hdf, name=None, assumeUniqueNames=False, log=False, logwidth=20):
+	from PuzzleLib.Modules.Module import Module
+
 	with Module.ensureHdf(hdf, "r") as hdf:
 		blueprint = json.loads(str(np.array(hdf["blueprint"])))
 
@@ -109,6 +129,8 @@ def load(hdf, name=None, assumeUniqueNames=False, log=False, logwidth=20):
 
 
 def unittest():
+	registryTest()
+	lazyImportTest()
 	fileTest()
 	memoryTest()
 	graphTest()
@@ -149,6 +171,37 @@ def buildGraph():
 	return graph
 
 
+def registryTest():
+	from PuzzleLib.Containers.Sequential import Sequential
+	from PuzzleLib.Modules.Linear import Linear
+
+	assert "Sequential" in containerRegistry and "Node" not in containerRegistry
+	assert "Linear" in moduleRegistry and "Module" not in moduleRegistry
+
+	assert containerRegistry["Sequential"] is Sequential
+	assert moduleRegistry["Linear"] is Linear
+
+
+def lazyImportTest():
+	import sys, subprocess
+	from PuzzleLib import Config
+
+	script = "; ".join([
+		"import sys, json", "from PuzzleLib import Config", "Config.backend = Config.Backend.%s" % Config.backend.name,
+		"from PuzzleLib.Blueprint import moduleRegistry", "from PuzzleLib.Modules import Linear",
+		"assert moduleRegistry['Linear'] is Linear",
+		"print(json.dumps(sorted(name for name in sys.modules if name.startswith('%s.Modules.'))))" % libname
+	])
+
+	output = subprocess.run(
+		[sys.executable, "-c", script], env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+		stdout=subprocess.PIPE, check=True, universal_newlines=True
+	).stdout
+
+	loaded = set(json.loads(output.splitlines()[-1]))
+	assert "%s.Modules.Linear" % libname in loaded and "%s.Modules.Conv2D" % libname not in loaded
+
+
 def fileTest():
 	seq = buildNet()
 
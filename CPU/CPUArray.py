@@ -64,6 +64,7 @@ class CPUArray:
 
 	def fill(self, value):
 		self.data[...] = value
+		return self
 
 
 	def reshape(self, *args):
@@ -86,6 +87,11 @@ class CPUArray:
 		return CPUArray(data.shape, data.dtype, data=data, acquire=True)
 
 
+	def astype(self, dtype):
+		data = self.data.astype(dtype)
+		return CPUArray(data.shape, data.dtype, data=data, acquire=True)
+
+
 	@staticmethod
 	def unpackArg(arg):
 		return arg if isinstance(arg, (int, float)) else arg.data
@@ -0,0 +1,326 @@
+import random
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule
+from PuzzleLib.CPU.CPUArray import CPUArray
+from PuzzleLib.CPU.Utils import getThreadPool
+
+
+ctcTmpl = """
+
+#include <math.h>
+
+
+static inline float logPlus(float p1, float p2)
+{
+	if (p1 <= -INFINITY)
+		return p2;
+
+	if (p2 <= -INFINITY)
+		return p1;
+
+	return log1pf(expf(-fabsf(p1 - p2))) + (p1 > p2 ? p1 : p2);
+}
+
+
+static void ctcLoss(float * __restrict grad, float * __restrict nll, float * __restrict alphas,
+					float * __restrict betas, float * __restrict logsums, const float * __restrict indata,
+					const int32_t * __restrict datalen, const int32_t * __restrict labels,
+					const int32_t * __restrict offsets, int32_t T, int32_t batchsize, int32_t vocabsize,
+					int32_t blank, int32_t b)
+{
+	int32_t offset = offsets[b], S = 2 * (offsets[b + 1] - offset) + 1, length = datalen[b];
+
+	labels += offset, alphas += T * (2 * offset + b), betas += 2 * (2 * offset + b);
+	logsums += b * vocabsize;
+
+	indata += b * vocabsize, grad += b * vocabsize;
+	ptrdiff_t stride = (ptrdiff_t)batchsize * vocabsize;
+
+	for (int32_t t = length; t < T; t++)
+		for (int32_t c = 0; c < vocabsize; c++)
+			grad[t * stride + c] = 0.0f;
+
+	if (length <= 0)
+	{
+		nll[b] = 0.0f;
+		return;
+	}
+
+	for (int32_t i = 0; i < S; i++)
+	{
+		int32_t label = (i % 2 == 0) ? blank : labels[i / 2];
+		alphas[i] = (i < 2) ? logf(indata[label]) : -INFINITY;
+	}
+
+	for (int32_t t = 1; t < length; t++)
+	{
+		const float *prev = alphas + (t - 1) * S;
+
+		for (int32_t i = 0; i < S; i++)
+		{
+			int32_t label = (i % 2 == 0) ? blank : labels[i / 2];
+			float prevSum = prev[i];
+
+			if (i > 0)
+			{
+				prevSum = logPlus(prevSum, prev[i - 1]);
+
+				if (i > 1 && label != blank && label != labels[i / 2 - 1])
+					prevSum = logPlus(prevSum, prev[i - 2]);
+			}
+
+			alphas[t * S + i] = prevSum + logf(indata[t * stride + label]);
+		}
+	}
+
+	const float *last = alphas + (length - 1) * S;
+	float loglike = (S > 1) ? logPlus(last[S - 2], last[S - 1]) : last[0];
+
+	nll[b] = -loglike;
+
+	if (loglike <= -INFINITY)
+	{
+		for (int32_t t = 0; t < length; t++)
+			for (int32_t c = 0; c < vocabsize; c++)
+				grad[t * stride + c] = 0.0f;
+
+		return;
+	}
+
+	float *cur = betas, *next = betas + S;
+
+	for (int32_t t = length - 1; t >= 0; t--)
+	{
+		for (int32_t i = 0; i < S; i++)
+		{
+			int32_t label = (i % 2 == 0) ? blank : labels[i / 2];
+			float logprob = logf(indata[t * stride + label]);
+
+			if (t == length - 1)
+				cur[i] = (i >= S - 2) ? logprob : -INFINITY;
+			else
+			{
+				float nextSum = next[i];
+
+				if (i < S - 1)
+				{
+					nextSum = logPlus(nextSum, next[i + 1]);
+
+					if (i < S - 2 && label != blank && label != labels[i / 2 + 1])
+						nextSum = logPlus(nextSum, next[i + 2]);
+				}
+
+				cur[i] = nextSum + logprob;
+			}
+		}
+
+		for (int32_t c = 0; c < vocabsize; c++)
+			logsums[c] = -INFINITY;
+
+		for (int32_t i = 0; i < S; i++)
+		{
+			int32_t label = (i % 2 == 0) ? blank : labels[i / 2];
+			logsums[label] = logPlus(logsums[label], alphas[t * S + i] + cur[i]);
+		}
+
+		for (int32_t c = 0; c < vocabsize; c++)
+		{
+			float prob = indata[t * stride + c];
+			float g = -prob;
+
+			if (prob > 0.0f && logsums[c] > -INFINITY)
+				g += expf(logsums[c] - logf(prob) - loglike);
+
+			grad[t * stride + c] = g;
+		}
+
+		float *tmp = cur;
+		cur = next, next = tmp;
+	}
+}
+
+"""
+
+
+mod = SourceModule(ctcTmpl, functions=[
+	("ctcLoss", void_t, [
+		(float_t.ptr.restrict, "grad"), (float_t.ptr.restrict, "nll"), (float_t.ptr.restrict, "alphas"),
+		(float_t.ptr.restrict, "betas"), (float_t.ptr.restrict, "logsums"), (float_t.const.ptr.restrict, "indata"),
+		(int32_t.const.ptr.restrict, "datalen"), (int32_t.const.ptr.restrict, "labels"),
+		(int32_t.const.ptr.restrict, "offsets"), (int32_t, "T"), (int32_t, "batchsize"), (int32_t, "vocabsize"),
+		(int32_t, "blank"), (int32_t, "b")
+	], True)
+])
+
+
+def ctcLoss(data, datalen, labels, lengths, blank, error=None, normalized=False, returnAlphas=False, grad=None):
+	assert data.dtype == np.float32 and datalen.dtype == labels.dtype and labels.dtype == np.int32
+	T, batchsize, vocabsize = data.shape
+
+	if not normalized:
+		data = CPUArray.toDevice(hostSoftmax(data.get(copy=False)))
+
+	lengths = lengths.get() if isinstance(lengths, CPUArray) else np.asarray(lengths)
+
+	offsets = np.zeros((batchsize + 1, ), dtype=np.int32)
+	np.cumsum(lengths, out=offsets[1:])
+
+	extlength = 2 * int(offsets[-1]) + batchsize
+
+	alphas = CPUArray.empty((T * extlength, ), dtype=np.float32)
+	betas = np.empty((2 * extlength, ), dtype=np.float32)
+	logsums = np.empty((batchsize, vocabsize), dtype=np.float32)
+
+	nll = np.empty((batchsize, ), dtype=np.float32)
+
+	if grad is None:
+		grad = CPUArray.empty(data.shape, dtype=np.float32)
+	else:
+		assert grad.shape == data.shape and grad.dtype == np.float32
+
+	indata, hostDatalen, hostLabels = data.get(copy=False), datalen.get(copy=False), labels.get(copy=False)
+	args = (grad.data, nll, alphas.data, betas, logsums, indata, hostDatalen, hostLabels, offsets, T, batchsize,
+			vocabsize, blank)
+
+	fn = mod.ctcLoss
+	order = np.argsort(-hostDatalen.astype(np.int64) * (2 * lengths + 1), kind="stable")
+
+	futures = [getThreadPool().submit(fn, *args, int(b)) for b in order]
+
+	for future in futures:
+		future.result()
+
+	error = CPUArray.zeros((), dtype=np.float32) if error is None else error
+	error.data[...] += np.sum(nll)
+
+	return (error, grad) if not returnAlphas else (error, grad, alphas)
+
+
+def hostSoftmax(w):
+	e = np.exp(w - np.amax(w, axis=-1, keepdims=True))
+	return e / np.sum(e, axis=-1, keepdims=True)
+
+
+def logPlus(a, b):
+	return np.logaddexp(a, b)
+
+
+def ctcLossTest(data, datalen, labels, lengths, blank):
+	data = hostSoftmax(data)
+	T, batchsize, vocabsize = data.shape
+
+	offsets = np.concatenate(([0], np.cumsum(lengths)))
+	alphas = np.full((T * (2 * offsets[-1] + batchsize), ), fill_value=np.nan, dtype=np.float32)
+
+	nll = np.empty((batchsize, ), dtype=np.float32)
+	grad = np.zeros(data.shape, dtype=np.float32)
+
+	with np.errstate(divide="ignore"):
+		logdata = np.log(data)
+
+	for b in range(batchsize):
+		L, length = int(lengths[b]), int(datalen[b])
+		S, offset = 2 * L + 1, int(offsets[b])
+
+		extLabels = np.full((S, ), fill_value=blank, dtype=np.int32)
+		extLabels[1::2] = labels[offset:offset + L]
+
+		skips = np.zeros((S, ), dtype=np.bool_)
+		skips[2:] = (extLabels[2:] != blank) & (extLabels[2:] != extLabels[:-2])
+
+		extOffset = 2 * offset + b
+		alpha = alphas[extOffset * T:extOffset * T + length * S].reshape(length, S)
+
+		alpha[0] = -np.inf
+		alpha[0, :2] = logdata[0, b, extLabels[:2]]
+
+		for t in range(1, length):
+			prevSum = alpha[t - 1].copy()
+			prevSum[1:] = logPlus(prevSum[1:], alpha[t - 1, :-1])
+			prevSum[skips] = logPlus(prevSum[skips], alpha[t - 1, :-2][skips[2:]])
+
+			alpha[t] = prevSum + logdata[t, b, extLabels]
+
+		loglike = logPlus(alpha[-1, -2], alpha[-1, -1]) if S > 1 else alpha[-1, -1]
+		nll[b] = -loglike
+
+		beta = np.full((length, S), fill_value=-np.inf, dtype=np.float32)
+		beta[-1, -2:] = logdata[length - 1, b, extLabels[-2:]]
+
+		for t in reversed(range(length - 1)):
+			nextSum = beta[t + 1].copy()
+			nextSum[:-1] = logPlus(nextSum[:-1], beta[t + 1, 1:])
+			nextSum[:-2][skips[2:]] = logPlus(nextSum[:-2][skips[2:]], beta[t + 1, 2:][skips[2:]])
+
+			beta[t] = nextSum + logdata[t, b, extLabels]
+
+		logsums = np.full((length, vocabsize), fill_value=-np.inf, dtype=np.float32)
+		for i in range(S):
+			logsums[:, extLabels[i]] = logPlus(logsums[:, extLabels[i]], alpha[:, i] + beta[:, i])
+
+		grad[:length, b] = np.exp(logsums - logdata[:length, b] - loglike) - data[:length, b]
+
+	return np.sum(nll), grad, alphas
+
+
+def unittest():
+	calcTest()
+	paddingTest()
+
+
+def calcTest():
+	times, batchsize, vocabsize = 20, 3, 6
+	hostData, hostDataLen, hostLabels, lengths = createData(times, batchsize, vocabsize)
+
+	data, datalen, labels = CPUArray.toDevice(hostData), CPUArray.toDevice(hostDataLen), CPUArray.toDevice(hostLabels)
+	blank = 0
+
+	error, grad, alphas = ctcLoss(data, datalen, labels, lengths, blank, returnAlphas=True)
+	hostError, hostGrad, hostAlphas = ctcLossTest(hostData, hostDataLen, hostLabels, lengths, blank)
+
+	assert np.allclose(hostAlphas, alphas.get(), equal_nan=True)
+
+	assert np.isclose(hostError, error.get())
+	assert np.allclose(hostGrad, grad.get(), atol=1e-5)
+
+
+def paddingTest():
+	times, batchsize, vocabsize = 30, 8, 10
+	hostData, hostDataLen, hostLabels, lengths = createData(times, batchsize, vocabsize)
+
+	hostDataLen = np.array([random.randint(a=times - 10, b=times) for _ in range(batchsize)], dtype=np.int32)
+	blank = vocabsize - 1
+
+	hostLabels[hostLabels == blank] = 1
+
+	data, datalen, labels = CPUArray.toDevice(hostData), CPUArray.toDevice(hostDataLen), CPUArray.toDevice(hostLabels)
+	grad = CPUArray.toDevice(np.full(hostData.shape, fill_value=np.nan, dtype=np.float32))
+
+	error, _ = ctcLoss(data, datalen, labels, lengths, blank, grad=grad)
+	hostError, hostGrad, _ = ctcLossTest(hostData, hostDataLen, hostLabels, lengths, blank)
+
+	assert np.isclose(hostError, error.get())
+	assert np.allclose(hostGrad, grad.get(), atol=1e-5)
+
+	for b in range(batchsize):
+		assert np.all(grad.get()[hostDataLen[b]:, b] == 0.0)
+
+
+def createData(times, batchsize, vocabsize):
+	data = np.random.randn(times, batchsize, vocabsize).astype(np.float32)
+	datalen = np.array([times] * batchsize, dtype=np.int32)
+
+	lengths = np.array([random.randint(a=times // 4, b=times // 2 - 1) for _ in range(batchsize)], dtype=np.int32)
+	labels = np.concatenate([
+		np.array([random.randint(a=1, b=vocabsize - 1) for _ in range(lengths[b])], dtype=np.int32)
+		for b in range(batchsize)
+	])
+
+	return data, datalen, labels, lengths
+
+
+if __name__ == "__main__":
+	unittest()
@@ -4,152 +4,156 @@ from PuzzleLib.Compiler.Codegen.Types import int32_t, uint32_t, float_t
 
 from PuzzleLib.CPU.SourceModule import ElementwiseKernel
 from PuzzleLib.CPU.Utils import memoize
+from PuzzleLib.CPU.Kernels.Half import bfloat16, toFloat32, fromFloat32
+
+
+storageTypes = (np.float32, np.float16, bfloat16)
 
 
 @memoize
 def sigmoidKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata")],
 		"outdata[i] = 1.0f / (1.0f + expf(-indata[i]))",
-		"sigmoidKer"
-	)
+		"sigmoidKer", storage=dtype
+	).build()
 
 
 @memoize
 def sigmoidDerKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[
 			(float_t.ptr, "ingrad"), (float_t.const.ptr, "outgrad"),
 			(float_t.const.ptr, "outdata")
 		],
 		"ingrad[i] = outgrad[i] * outdata[i] * (1.0f - outdata[i])",
-		"sigmoidDerKer"
-	)
+		"sigmoidDerKer", storage=dtype
+	).build()
 
 
 @memoize
 def tanhKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata")],
 		"outdata[i] = tanhf(indata[i])",
-		"tanhKer"
-	)
+		"tanhKer", storage=dtype
+	).build()
 
 
 @memoize
 def tanhDerKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "ingrad"), (float_t.const.ptr, "outgrad"), (float_t.const.ptr, "outdata")],
 		"ingrad[i] = outgrad[i] * (1.0f - outdata[i] * outdata[i])",
-		"tanhDerKer"
-	)
+		"tanhDerKer", storage=dtype
+	).build()
 
 
 @memoize
 def reluKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata")],
 		"outdata[i] = indata[i] * (indata[i] > 0.0f)",
-		"reluKer"
-	)
+		"reluKer", storage=dtype
+	).build()
 
 
 @memoize
 def reluDerKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "ingrad"), (float_t.const.ptr, "outgrad"), (float_t.const.ptr, "outdata")],
 		"ingrad[i] = outgrad[i] * (outdata[i] > 0.0f)",
-		"reluDerKer"
-	)
+		"reluDerKer", storage=dtype
+	).build()
 
 
 @memoize
 def leakyReluKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (float_t, "a")],
 		"outdata[i] = indata[i] * ((indata[i] > 0.0f) + a * (indata[i] <= 0.0f))",
-		"leakyReluKer"
-	)
+		"leakyReluKer", storage=dtype
+	).build()
 
 
 @memoize
 def leakyReluDerKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "ingrad"), (float_t.const.ptr, "outgrad"), (float_t.const.ptr, "outdata"), (float_t, "a")],
 		"ingrad[i] = outgrad[i] * ((outdata[i] > 0.0f) + a * (outdata[i] <= 0.0f))",
-		"leakyReluDerKer"
-	)
+		"leakyReluDerKer", storage=dtype
+	).build()
 
 
 @memoize
 def eluKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (float_t, "a")],
 		"outdata[i] = indata[i] * (indata[i] > 0.0f) + a * (expf(indata[i]) - 1.0f) * (indata[i] <= 0.0f)",
-		"eluKer"
-	)
+		"eluKer", storage=dtype
+	).build()
 
 
 @memoize
 def eluDerKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "ingrad"), (float_t.const.ptr, "outgrad"), (float_t.const.ptr, "outdata"), (float_t, "a")],
 		"ingrad[i] = outgrad[i] * ((outdata[i] > 0.0f) + (outdata[i] + a) * (outdata[i] <= 0.0f))",
-		"eluDerKer"
-	)
+		"eluDerKer", storage=dtype
+	).build()
 
 
 @memoize
 def softPlusKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata")],
 		"outdata[i] = logf(1.0f + expf(indata[i]))",
-		"softPlusKer"
-	)
+		"softPlusKer", storage=dtype
+	).build()
 
 
 @memoize
 def softPlusDerKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "ingrad"), (float_t.const.ptr, "outgrad"), (float_t.const.ptr, "outdata")],
 		"ingrad[i] = outgrad[i] * (1.0f - expf(-outdata[i]))",
-		"softPlusDerKer"
-	)
+		"softPlusDerKer", storage=dtype
+	).build()
 
 
 @memoize
 def clipKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (float_t, "a"), (float_t, "b")],
 		"outdata[i] = indata[i] * (indata[i] > a && indata[i] < b) + a * (indata[i] <= a) + b * (indata[i] >= b)",
-		"clipKer"
-	)
+		"clipKer", storage=dtype
+	).build()
 
 
 @memoize
 def clipDerKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[
 			(float_t.ptr, "ingrad"), (float_t.const.ptr, "outgrad"), (float_t.const.ptr, "outdata"),
 			(float_t, "a"), (float_t, "b")
 		],
 		"ingrad[i] = outgrad[i] * (outdata[i] > a && outdata[i] < b);",
-		"clipDerKer"
-	)
+		"clipDerKer", storage=dtype
+	).build()
 
 
 @memoize
@@ -162,7 +166,7 @@ def dropoutKer(dtype):
 		],
 		"outdata[i] = indata[i] * (b[i] < v) / p",
 		"dropoutKer"
-	)
+	).build()
 
 
 @memoize
@@ -175,17 +179,17 @@ def dropout2dKer(dtype):
 		],
 		"outdata[i] = indata[i] * (b[i / mapsize] < v) / p",
 		"dropout2dKer"
-	)
+	).build()
 
 
 @memoize
 def toVectorAddVectorKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (float_t, "alpha")],
 		"outdata[i] += indata[i] * alpha",
-		"toVectorAddVectorKer"
-	)
+		"toVectorAddVectorKer", storage=dtype
+	).build()
 
 
 addVectorToVectorKer = ElementwiseKernel(
@@ -213,7 +217,7 @@ def adadeltaKer(dtype):
 		param[i] += dx;
 		""",
 		"adadeltaKer"
-	)
+	).build()
 
 
 @memoize
@@ -229,7 +233,7 @@ def adagradKer(dtype):
 		param[i] += learnRate * grad[i] / (sqrtf(h[i]) + epsilon);
 		""",
 		"adagradKer"
-	)
+	).build()
 
 
 @memoize
@@ -246,7 +250,28 @@ def adamKer(dtype):
 		param[i] += learnRate * mg[i] / (sqrtf(ms[i]) + epsilon);
 		""",
 		"adamKer"
-	)
+	).build()
+
+
+@memoize
+def adamRowKer(dtype):
+	assert dtype == np.float32
+	return ElementwiseKernel(
+		[
+			(float_t.ptr, "param"), (float_t.const.ptr, "grad"), (float_t.ptr, "mg"), (float_t.ptr, "ms"),
+			(float_t.const.ptr, "steps"), (int32_t, "rowsize"), (float_t, "alpha"), (float_t, "beta1"),
+			(float_t, "beta2"), (float_t, "epsilon")
+		],
+		"""
+		float t = steps[i / rowsize];
+		float learnRate = alpha * sqrtf(1.0f - powf(beta2, t)) / (1.0f - powf(beta1, t));
+
+		mg[i] += (1.0f - beta1) * (grad[i] - mg[i]);
+		ms[i] += (1.0f - beta2) * (grad[i] * grad[i] - ms[i]);
+		param[i] += learnRate * mg[i] / (sqrtf(ms[i]) + epsilon);
+		""",
+		"adamRowKer"
+	).build()
 
 
 @memoize
@@ -262,7 +287,7 @@ def classicMomSGDKer(dtype):
 		param[i] += mom[i];
 		""",
 		"classicMomSGDKer"
-	)
+	).build()
 
 
 @memoize
@@ -279,7 +304,7 @@ def nesterovMomSGDKer(dtype):
 		param[i] += momRate * momRate * m + (1.0f + momRate) * learnRate * grad[i];
 		""",
 		"nesterovMomSGDKer"
-	)
+	).build()
 
 
 @memoize
@@ -295,7 +320,7 @@ def rmspropKer(dtype):
 		param[i] += learnRate * grad[i] / (sqrtf(ms[i]) + epsilon);
 		""",
 		"rmspropKer"
-	)
+	).build()
 
 
 @memoize
@@ -314,7 +339,7 @@ def rmspropGravesKer(dtype):
 		param[i] += delta[i];
 		""",
 		"rmspropGravesKer"
-	)
+	).build()
 
 
 @memoize
@@ -336,40 +361,40 @@ def smorms3Ker(dtype):
 		param[i] += grad[i] * fminf(learnRate, x) / (sqrtf(msi) + epsilon);
 		""",
 		"smorms3Ker"
-	)
+	).build()
 
 
 @memoize
 def addKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[
 			(float_t.ptr, "outdata"), (float_t.const.ptr, "a"), (float_t, "alpha"),
 			(float_t.const.ptr, "b"), (float_t, "beta")
 		],
 		"outdata[i] = alpha * a[i] + beta * b[i]",
-		"addKer"
-	)
+		"addKer", storage=dtype
+	).build()
 
 
 @memoize
 def mulKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "a"), (float_t.const.ptr, "b")],
 		"outdata[i] = a[i] * b[i]",
-		"mulKer"
-	)
+		"mulKer", storage=dtype
+	).build()
 
 
 @memoize
 def linearKer(dtype):
-	assert dtype == np.float32
+	assert dtype in storageTypes
 	return ElementwiseKernel(
 		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (float_t, "a"), (float_t, "b")],
 		"outdata[i] = a * indata[i] + b",
-		"linearKer"
-	)
+		"linearKer", storage=dtype
+	).build()
 
 
 rbmKer = ElementwiseKernel(
@@ -403,3 +428,11 @@ l1gradKer = ElementwiseKernel(
 	"grad[i] = (pred[i] > target[i] ? -norm : norm)",
 	"l1gradKer"
 )
+
+
+def castFP16toFP32(outdata, indata):
+	toFloat32(indata, out=outdata)
+
+
+def castFP32toFP16(outdata, indata):
+	fromFloat32(indata, dtype=np.float16, out=outdata)
@@ -0,0 +1,100 @@
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule
+from PuzzleLib.CPU.CPUArray import CPUArray
+
+
+embedTmpl = """
+
+static void embed(float * __restrict outdata, const int32_t * __restrict indata,
+				  const float * __restrict vocabulary, int32_t size, int32_t embsize)
+{
+	for (int32_t i = 0; i < size; i++)
+	{
+		int32_t wordidx = indata[i];
+		if (wordidx == -1) continue;
+
+		for (int32_t j = 0; j < embsize; j++)
+			outdata[embsize * i + j] = vocabulary[embsize * wordidx + j];
+	}
+}
+
+static void embedBackwardParams(float * __restrict vocabulary, const float * __restrict outgrad,
+								const int32_t * __restrict indata, float scale, int32_t size, int32_t embsize)
+{
+	for (int32_t i = 0; i < size; i++)
+	{
+		int32_t wordidx = indata[i];
+		if (wordidx == -1) continue;
+
+		for (int32_t j = 0; j < embsize; j++)
+			vocabulary[embsize * wordidx + j] += scale * outgrad[embsize * i + j];
+	}
+}
+
+"""
+
+
+mod = SourceModule(embedTmpl, functions=[
+	("embed", void_t, [
+		(float_t.ptr.restrict, "outdata"), (int32_t.const.ptr.restrict, "indata"),
+		(float_t.const.ptr.restrict, "vocabulary"), (int32_t, "size"), (int32_t, "embsize")
+	], True),
+	("embedBackwardParams", void_t, [
+		(float_t.ptr.restrict, "vocabulary"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t.const.ptr.restrict, "indata"), (float_t, "scale"), (int32_t, "size"), (int32_t, "embsize")
+	], True)
+])
+
+
+def embed(data, W):
+	assert data.dtype == np.int32 and W.dtype == np.float32
+
+	batchsize, sentlen = data.shape
+	_, embsize = W.shape
+
+	outdata = CPUArray.zeros((batchsize, sentlen, embsize), dtype=np.float32)
+
+	mod.embed(outdata.data, data.data, W.data, batchsize * sentlen, embsize)
+	return outdata
+
+
+def embedBackwardParams(indata, grad, W, scale):
+	assert indata.shape == grad.shape[:2] and W.shape[1] == grad.shape[2]
+	assert indata.dtype == np.int32 and grad.dtype == W.dtype and W.dtype == np.float32
+
+	batchsize, sentlen = indata.shape
+	_, embsize = W.shape
+
+	mod.embedBackwardParams(W.data, grad.data, indata.data, scale, batchsize * sentlen, embsize)
+
+
+def unittest():
+	batchsize, sentlen, embsize = 10, 5, 20
+	vocabsize = 1000
+
+	hostInData = np.random.randint(low=-1, high=vocabsize, size=(batchsize, sentlen), dtype=np.int32)
+	hostW = np.random.randn(vocabsize, embsize).astype(np.float32)
+
+	indata, W = CPUArray.toDevice(hostInData), CPUArray.toDevice(hostW)
+	outdata = embed(indata, W)
+
+	hostOutData = np.zeros(outdata.shape, dtype=np.float32)
+	mask = hostInData != -1
+
+	hostOutData[mask] = hostW[hostInData[mask]]
+	assert np.allclose(hostOutData, outdata.get())
+
+	learnRate = 0.1
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+
+	embedBackwardParams(indata, CPUArray.toDevice(hostGrad), W, learnRate)
+	np.add.at(hostW, hostInData[mask], learnRate * hostGrad[mask])
+
+	assert np.allclose(hostW, W.get())
+
+
+if __name__ == "__main__":
+	unittest()
@@ -0,0 +1,146 @@
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, int64_t, uint16_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule, storageTmpl
+from PuzzleLib.CPU.CPUArray import CPUArray
+from PuzzleLib.CPU.Utils import parallelRange
+
+
+halfTmpl = storageTmpl + """
+
+static void unpackHalf(float * __restrict outdata, const uint16_t * __restrict indata, int32_t bfloat,
+					   int64_t start, int64_t stop)
+{
+	if (bfloat)
+		for (int64_t i = start; i < stop; i++)
+			outdata[i] = bfloat16ToFloat(indata[i]);
+	else
+		for (int64_t i = start; i < stop; i++)
+			outdata[i] = halfToFloat(indata[i]);
+}
+
+
+static void packHalf(uint16_t * __restrict outdata, const float * __restrict indata, int32_t bfloat,
+					 int64_t start, int64_t stop)
+{
+	if (bfloat)
+		for (int64_t i = start; i < stop; i++)
+			outdata[i] = floatToBFloat16(indata[i]);
+	else
+		for (int64_t i = start; i < stop; i++)
+			outdata[i] = floatToHalf(indata[i]);
+}
+
+"""
+
+
+mod = SourceModule(halfTmpl, functions=[
+	("unpackHalf", void_t, [
+		(float_t.ptr.restrict, "outdata"), (uint16_t.const.ptr.restrict, "indata"), (int32_t, "bfloat"),
+		(int64_t, "start"), (int64_t, "stop")
+	], True),
+	("packHalf", void_t, [
+		(uint16_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"), (int32_t, "bfloat"),
+		(int64_t, "start"), (int64_t, "stop")
+	], True)
+])
+
+
+bfloat16 = np.uint16
+halfTypes = (np.float16, bfloat16)
+
+
+def toFloat32(data, out=None):
+	assert data.dtype in halfTypes and data.flags.c_contiguous
+	out = CPUArray.empty(data.shape, dtype=np.float32) if out is None else out
+
+	assert out.dtype == np.float32 and out.size == data.size
+	parallelRange(mod.unpackHalf, data.size, out.data, data.data.view(np.uint16), int(data.dtype == np.uint16))
+
+	return out
+
+
+def fromFloat32(data, dtype=np.float16, out=None):
+	assert data.dtype == np.float32 and dtype in halfTypes and data.flags.c_contiguous
+	out = CPUArray.empty(data.shape, dtype=dtype) if out is None else out
+
+	assert out.dtype == dtype and out.size == data.size
+	parallelRange(mod.packHalf, data.size, out.data.view(np.uint16), data.data, int(dtype == np.uint16))
+
+	return out
+
+
+def cast(data, dtype):
+	if data.dtype == dtype:
+		return data.copy()
+
+	if data.dtype != bfloat16 and dtype != bfloat16:
+		return data.astype(dtype)
+
+	data = data if data.dtype == np.float32 else toFloat32(data)
+	return data if dtype == np.float32 else fromFloat32(data, dtype=dtype)
+
+
+def unittest():
+	float16Test()
+	bfloat16Test()
+	castTest()
+
+
+def float16Test():
+	hostHalf = np.arange(1 << 16, dtype=np.uint32).astype(np.uint16).view(np.float16)
+
+	outdata = toFloat32(CPUArray.toDevice(hostHalf)).get()
+	hostOutData = hostHalf.astype(np.float32)
+
+	assert np.array_equal(np.isnan(outdata), np.isnan(hostOutData))
+	assert (outdata[~np.isnan(outdata)] == hostOutData[~np.isnan(hostOutData)]).all()
+
+	hostData = np.random.randn(1 << 16) * 2.0**np.random.randint(-30, 18, size=1 << 16)
+	hostData = np.concatenate((hostData.astype(np.float32), np.array([
+		0.0, -0.0, np.inf, -np.inf, 65504.0, 65519.0, 65520.0, 2.0**-25, 1.5 * 2.0**-25, 2.0**-24, 3.0 * 2.0**-25
+	], dtype=np.float32)))
+
+	with np.errstate(over="ignore"):
+		hostOutData = hostData.astype(np.float16)
+
+	outdata = fromFloat32(CPUArray.toDevice(hostData)).get()
+	assert (outdata.view(np.uint16) == hostOutData.view(np.uint16)).all()
+
+
+def bfloat16Test():
+	hostData = np.random.randn(1 << 16).astype(np.float32)
+	hostData[:4] = [np.inf, -np.inf, 0.0, 1.0 + 2.0**-8]
+
+	packed = fromFloat32(CPUArray.toDevice(hostData), dtype=np.uint16)
+	assert packed.get()[3] == 0x3F80
+
+	outdata = toFloat32(packed).get()
+	assert (outdata[:3] == hostData[:3]).all()
+
+	hostData, outdata = hostData[2:], outdata[2:]
+
+	hostDiff = np.abs(outdata - hostData)
+	assert (hostDiff <= np.abs(hostData) * 2.0**-8).all()
+
+	truncated = (hostData.view(np.uint32) & 0xFFFF0000).view(np.float32)
+	assert (hostDiff <= np.abs(hostData - truncated)).all()
+
+
+def castTest():
+	hostData = np.random.randn(64).astype(np.float32)
+	data = CPUArray.toDevice(hostData)
+
+	packed = cast(data, bfloat16)
+	assert packed.dtype == bfloat16 and (packed.get() == fromFloat32(data, dtype=bfloat16).get()).all()
+
+	half = cast(packed, np.float16)
+	assert half.dtype == np.float16 and (half.get() == toFloat32(packed).get().astype(np.float16)).all()
+
+	assert (cast(half, np.float32).get() == half.get().astype(np.float32)).all()
+	assert cast(data, np.float32) is not data and (cast(data, np.float32).get() == hostData).all()
+
+
+if __name__ == "__main__":
+	unittest()
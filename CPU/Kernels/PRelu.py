@@ -0,0 +1,169 @@
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule
+from PuzzleLib.CPU.CPUArray import CPUArray
+
+
+preluTmpl = """
+
+static void prelu(float *outdata, const float *indata, const float * __restrict slopes, int32_t divFactor,
+				  int32_t mapsize, int32_t maps, int32_t batchsize)
+{
+	for (int32_t z = 0; z < batchsize * maps; z++)
+	{
+		float slope = slopes[z % maps / divFactor];
+
+		for (int32_t i = z * mapsize; i < (z + 1) * mapsize; i++)
+			outdata[i] = indata[i] > 0.0f ? indata[i] : indata[i] * slope;
+	}
+}
+
+
+static void preluBackwardData(float * __restrict ingrad, const float * __restrict outgrad,
+							  const float * __restrict slopes, const float * __restrict indata, int32_t divFactor,
+							  int32_t mapsize, int32_t maps, int32_t batchsize)
+{
+	for (int32_t z = 0; z < batchsize * maps; z++)
+	{
+		float slope = slopes[z % maps / divFactor];
+
+		for (int32_t i = z * mapsize; i < (z + 1) * mapsize; i++)
+			ingrad[i] = indata[i] > 0.0f ? outgrad[i] : outgrad[i] * slope;
+	}
+}
+
+
+static void preluBackwardParams(float * __restrict slopegrad, const float * __restrict outgrad,
+								const float * __restrict indata, int32_t divFactor, int32_t mapsize, int32_t maps,
+								int32_t batchsize)
+{
+	for (int32_t c = 0; c < maps / divFactor; c++)
+		slopegrad[c] = 0.0f;
+
+	for (int32_t z = 0; z < batchsize * maps; z++)
+	{
+		float acc = 0.0f;
+
+		for (int32_t i = z * mapsize; i < (z + 1) * mapsize; i++)
+			acc += indata[i] > 0.0f ? 0.0f : outgrad[i] * indata[i];
+
+		slopegrad[z % maps / divFactor] += acc;
+	}
+}
+
+"""
+
+
+mod = SourceModule(preluTmpl, functions=[
+	("prelu", void_t, [
+		(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (float_t.const.ptr.restrict, "slopes"),
+		(int32_t, "divFactor"), (int32_t, "mapsize"), (int32_t, "maps"), (int32_t, "batchsize")
+	]),
+	("preluBackwardData", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(float_t.const.ptr.restrict, "slopes"), (float_t.const.ptr.restrict, "indata"), (int32_t, "divFactor"),
+		(int32_t, "mapsize"), (int32_t, "maps"), (int32_t, "batchsize")
+	]),
+	("preluBackwardParams", void_t, [
+		(float_t.ptr.restrict, "slopegrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(float_t.const.ptr.restrict, "indata"), (int32_t, "divFactor"), (int32_t, "mapsize"), (int32_t, "maps"),
+		(int32_t, "batchsize")
+	])
+])
+
+
+def prelu(data, slopes, inplace=False, sharedMaps=False):
+	assert data.dtype == slopes.dtype and slopes.dtype == np.float32
+	assert slopes.shape == (1, ) if sharedMaps else data.shape[1] == slopes.shape[0]
+
+	outdata = data if inplace else CPUArray.empty(data.shape, dtype=np.float32)
+	divFactor = data.shape[1] if sharedMaps else 1
+
+	mod.prelu(
+		outdata.data, data.data, slopes.data, divFactor, int(np.prod(data.shape[2:])), data.shape[1], data.shape[0]
+	)
+
+	return outdata
+
+
+def preluBackwardData(grad, slopes, indata, sharedMaps=False):
+	assert grad.dtype == slopes.dtype and slopes.dtype == indata.dtype and indata.dtype == np.float32
+	assert grad.shape == indata.shape
+	assert slopes.shape == (1, ) if sharedMaps else grad.shape[1] == slopes.shape[0]
+
+	ingrad = CPUArray.empty(grad.shape, dtype=np.float32)
+	divFactor = grad.shape[1] if sharedMaps else 1
+
+	mod.preluBackwardData(
+		ingrad.data, grad.data, slopes.data, indata.data, divFactor, int(np.prod(grad.shape[2:])),
+		grad.shape[1], grad.shape[0]
+	)
+
+	return ingrad
+
+
+def preluBackwardParams(indata, outgrad, sharedMaps=False):
+	assert indata.dtype == outgrad.dtype and outgrad.dtype == np.float32
+	assert indata.shape == outgrad.shape
+
+	maps = outgrad.shape[1]
+	divFactor = maps if sharedMaps else 1
+
+	slopegrad = CPUArray.empty((maps // divFactor, ), dtype=np.float32)
+
+	mod.preluBackwardParams(
+		slopegrad.data, outgrad.data, indata.data, divFactor, int(np.prod(outgrad.shape[2:])), maps, outgrad.shape[0]
+	)
+
+	return slopegrad
+
+
+def unittest():
+	for sharedMaps in (False, True):
+		preluTest(sharedMaps)
+
+
+def preluTest(sharedMaps):
+	batchsize, maps, h, w = 5, 4, 6, 6
+
+	hostData = np.random.randn(batchsize, maps, h, w).astype(np.float32)
+	hostSlopes = np.random.randn(1 if sharedMaps else maps).astype(np.float32)
+
+	data, slopes = CPUArray.toDevice(hostData), CPUArray.toDevice(hostSlopes)
+	outdata = prelu(data, slopes, sharedMaps=sharedMaps)
+
+	hostMapSlopes = np.repeat(hostSlopes, maps) if sharedMaps else hostSlopes
+	hostOutData = np.empty(outdata.shape, dtype=np.float32)
+
+	for c in range(maps):
+		hostOutData[:, c] = (hostData[:, c] > 0.0) * hostData[:, c] + \
+							(hostData[:, c] <= 0.0) * hostMapSlopes[c] * hostData[:, c]
+
+	assert np.allclose(hostOutData, outdata.get())
+
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+
+	grad = CPUArray.toDevice(hostGrad)
+	ingrad = preluBackwardData(grad, slopes, data, sharedMaps=sharedMaps)
+
+	hostInGrad = np.empty(ingrad.shape, dtype=np.float32)
+
+	for c in range(maps):
+		hostInGrad[:, c] = hostGrad[:, c] * ((hostData[:, c] > 0.0) + (hostData[:, c] <= 0.0) * hostMapSlopes[c])
+
+	assert np.allclose(hostInGrad, ingrad.get())
+
+	slopegrad = preluBackwardParams(data, grad, sharedMaps=sharedMaps)
+	hostSlopeGrad = np.empty((maps, ), dtype=np.float32)
+
+	for c in range(maps):
+		hostSlopeGrad[c] = np.sum(hostGrad[:, c] * hostData[:, c] * (hostData[:, c] <= 0.0))
+
+	hostSlopeGrad = np.sum(hostSlopeGrad, keepdims=True) if sharedMaps else hostSlopeGrad
+	assert np.allclose(hostSlopeGrad, slopegrad.get(), atol=1e-5)
+
+
+if __name__ == "__main__":
+	unittest()
@@ -39,6 +39,42 @@ static void reflectpad1d(float * __restrict outdata, const float * __restrict in
 			}
 }
 
+inline static int32_t reflectSources(int32_t index, int32_t insize, int32_t lpad, int32_t rpad, int32_t *sources)
+{
+	int32_t n = 0, outsize = insize + lpad + rpad;
+	int32_t left = lpad - index, right = 2 * (insize - 1) + lpad - index;
+
+	if (index >= 1 && left >= 0 && left < outsize) sources[n++] = left;
+	if (index <= insize - 2 && right >= insize + lpad && right < outsize) sources[n++] = right;
+
+	return n;
+}
+
+static void reflectpad1dBackward(float * __restrict ingrad, const float * __restrict outgrad,
+								 int32_t batchsize, int32_t maps, int32_t insize, int32_t lpad, int32_t rpad)
+{
+	int32_t outsize = insize + lpad + rpad;
+
+	for (int32_t z = 0; z < batchsize * maps; z++)
+		for (int32_t x = 0; x < insize; x++)
+		{
+			const float *slice = outgrad + z * outsize;
+
+			int32_t sources[2];
+			int32_t nsources = reflectSources(x, insize, lpad, rpad, sources);
+
+			float acc = 0.0f;
+
+			for (int32_t i = 0; i < nsources; i++)
+				acc += slice[sources[i]];
+
+			if (x + lpad >= 0 && x + lpad < outsize)
+				acc += slice[x + lpad];
+
+			ingrad[z * insize + x] = acc;
+		}
+}
+
 
 inline static void map2d(int32_t b, int32_t c, int32_t maps, int32_t inh, int32_t inw, int32_t outh, int32_t outw,
 						 int32_t index, int32_t upad, int32_t lpad, int32_t *inindex, int32_t *outindex)
@@ -75,6 +111,53 @@ static void reflectpad2d(float * __restrict outdata, const float * __restrict in
 			}
 }
 
+static void reflectpad2dBackward(float * __restrict ingrad, const float * __restrict outgrad,
+								 int32_t batchsize, int32_t maps, int32_t inh, int32_t inw, int32_t upad, int32_t bpad,
+								 int32_t lpad, int32_t rpad)
+{
+	int32_t outh = inh + upad + bpad, outw = inw + lpad + rpad;
+
+	for (int32_t z = 0; z < batchsize * maps; z++)
+		for (int32_t y = 0; y < inh; y++)
+		{
+			const float *slice = outgrad + z * outh * outw;
+
+			int32_t ysources[2];
+			int32_t nysources = reflectSources(y, inh, upad, bpad, ysources);
+
+			int32_t outy = y + upad;
+			int32_t hasy = outy >= 0 && outy < outh;
+
+			for (int32_t x = 0; x < inw; x++)
+			{
+				int32_t xsources[2];
+				int32_t nxsources = reflectSources(x, inw, lpad, rpad, xsources);
+
+				int32_t outx = x + lpad;
+				int32_t hasx = outx >= 0 && outx < outw;
+
+				float acc = 0.0f;
+
+				for (int32_t i = 0; i < nysources; i++)
+					for (int32_t j = 0; j < nxsources; j++)
+						acc += slice[ysources[i] * outw + xsources[j]];
+
+				if (hasy && hasx)
+					acc += slice[outy * outw + outx];
+
+				if (hasx)
+					for (int32_t i = 0; i < nysources; i++)
+						acc += slice[ysources[i] * outw + outx];
+
+				if (hasy)
+					for (int32_t j = 0; j < nxsources; j++)
+						acc += slice[outy * outw + xsources[j]];
+
+				ingrad[(z * inh + y) * inw + x] = acc;
+			}
+		}
+}
+
 """
 
 
@@ -83,10 +166,19 @@ mod = SourceModule(src, functions=[
 		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"),
 		(int32_t, "batchsize"), (int32_t, "maps"), (int32_t, "insize"), (int32_t, "lpad"), (int32_t, "rpad")
 	]),
+	("reflectpad1dBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t, "batchsize"), (int32_t, "maps"), (int32_t, "insize"), (int32_t, "lpad"), (int32_t, "rpad")
+	]),
 	("reflectpad2d", void_t, [
 		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"),
 		(int32_t, "batchsize"), (int32_t, "maps"), (int32_t, "inh"), (int32_t, "inw"),
 		(int32_t, "upad"), (int32_t, "bpad"), (int32_t, "lpad"), (int32_t, "rpad")
+	]),
+	("reflectpad2dBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t, "batchsize"), (int32_t, "maps"), (int32_t, "inh"), (int32_t, "inw"),
+		(int32_t, "upad"), (int32_t, "bpad"), (int32_t, "lpad"), (int32_t, "rpad")
 	])
 ])
 
@@ -117,9 +209,35 @@ def reflectpad2d(data, pad):
 	return outdata
 
 
+def reflectpad1dBackward(grad, pad):
+	assert grad.dtype == np.float32 and grad.ndim == 3
+
+	batchsize, maps, outsize = grad.shape
+	lpad, rpad = pad
+
+	ingrad = CPUArray.empty((batchsize, maps, outsize - lpad - rpad), dtype=grad.dtype)
+
+	mod.reflectpad1dBackward(ingrad.data, grad.data, batchsize, maps, outsize - lpad - rpad, lpad, rpad)
+	return ingrad
+
+
+def reflectpad2dBackward(grad, pad):
+	assert grad.dtype == np.float32 and grad.ndim == 4
+
+	batchsize, maps, outh, outw = grad.shape
+	upad, bpad, lpad, rpad = pad
+
+	inh, inw = outh - upad - bpad, outw - lpad - rpad
+	ingrad = CPUArray.empty((batchsize, maps, inh, inw), dtype=grad.dtype)
+
+	mod.reflectpad2dBackward(ingrad.data, grad.data, batchsize, maps, inh, inw, upad, bpad, lpad, rpad)
+	return ingrad
+
+
 def unittest():
 	reflectpad1dTest()
 	reflectpad2dTest()
+	adjointTest()
 
 
 def reflectpad1dTest():
@@ -135,6 +253,37 @@ def reflectpad1dTest():
 	assert np.allclose(hostOutData[:, :, :lpad][:, :, ::-1], hostData[:, :, 1:lpad+1])
 	assert np.allclose(hostOutData[:, :, insize + lpad:][:, :, ::-1], hostData[:, :, insize - 1 - rpad:insize - 1])
 
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = reflectpad1dBackward(CPUArray.toDevice(hostGrad), pad=(lpad, rpad))
+
+	hostInGrad = hostGrad[:, :, lpad:insize + lpad].copy()
+
+	hostInGrad[:, :, 1:lpad + 1] += hostGrad[:, :, :lpad][:, :, ::-1]
+	hostInGrad[:, :, insize - 1 - rpad:insize - 1] += hostGrad[:, :, insize + lpad:][:, :, ::-1]
+
+	assert np.allclose(hostInGrad, ingrad.get())
+
+
+def adjointTest():
+	batchsize, maps, inh, inw = 2, 3, 5, 7
+
+	for pad in [(2, 3, 3, 1), (-1, 2, 3, -2), (4, 4, 6, 6)]:
+		data = CPUArray.toDevice(np.random.randn(batchsize, maps, inh, inw).astype(np.float32))
+		outdata = reflectpad2d(data, pad)
+
+		grad = CPUArray.toDevice(np.random.randn(*outdata.shape).astype(np.float32))
+		ingrad = reflectpad2dBackward(grad, pad)
+
+		assert np.isclose(np.vdot(outdata.get(), grad.get()), np.vdot(data.get(), ingrad.get()), rtol=1e-4)
+
+		data = CPUArray.toDevice(data.get()[:, :, 0])
+		outdata = reflectpad1d(data, pad[2:])
+
+		grad = CPUArray.toDevice(np.random.randn(*outdata.shape).astype(np.float32))
+		ingrad = reflectpad1dBackward(grad, pad[2:])
+
+		assert np.isclose(np.vdot(outdata.get(), grad.get()), np.vdot(data.get(), ingrad.get()), rtol=1e-4)
+
 
 def reflectpad2dTest():
 	batchsize, maps, inh, inw = 4, 8, 12, 15
@@ -152,6 +301,21 @@ def reflectpad2dTest():
 		hostData[:, :, inh - 1 - bpad:inh - 1, inw - 1 - rpad:inw - 1]
 	)
 
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = reflectpad2dBackward(CPUArray.toDevice(hostGrad), pad=(upad, bpad, lpad, rpad))
+
+	def reflect(index, size, pad):
+		index = abs(index - pad)
+		return 2 * (size - 1) - index if index >= size else index
+
+	hostInGrad = np.zeros(data.shape, dtype=np.float32)
+
+	for y in range(outdata.shape[2]):
+		for x in range(outdata.shape[3]):
+			hostInGrad[:, :, reflect(y, inh, upad), reflect(x, inw, lpad)] += hostGrad[:, :, y, x]
+
+	assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+
 
 if __name__ == "__main__":
 	unittest()
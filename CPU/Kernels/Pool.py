@@ -0,0 +1,245 @@
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule
+from PuzzleLib.CPU.CPUArray import CPUArray
+
+
+poolTmpl = """
+
+#include <float.h>
+
+
+static void maxpool2d(float * __restrict outdata, const float * __restrict indata, int32_t * __restrict mask,
+					  int32_t inh, int32_t inw, int32_t outh, int32_t outw, int32_t hstride, int32_t wstride,
+					  int32_t hpad, int32_t wpad, int32_t fh, int32_t fw, int32_t planes)
+{
+	for (int32_t z = 0; z < planes; z++)
+	{
+		const float *slice = indata + z * inh * inw;
+
+		for (int32_t ph = 0; ph < outh; ph++)
+			for (int32_t pw = 0; pw < outw; pw++)
+			{
+				int32_t hstart = ph * hstride - hpad, wstart = pw * wstride - wpad;
+				int32_t hend = hstart + fh < inh ? hstart + fh : inh, wend = wstart + fw < inw ? wstart + fw : inw;
+
+				hstart = hstart > 0 ? hstart : 0, wstart = wstart > 0 ? wstart : 0;
+
+				float maxval = -FLT_MAX;
+				int32_t maxidx = -1;
+
+				for (int32_t h = hstart; h < hend; h++)
+					for (int32_t w = wstart; w < wend; w++)
+						if (slice[h * inw + w] > maxval)
+						{
+							maxidx = h * inw + w;
+							maxval = slice[maxidx];
+						}
+
+				int32_t index = (z * outh + ph) * outw + pw;
+				outdata[index] = maxval, mask[index] = maxidx;
+			}
+	}
+}
+
+
+static void maxpool2dBackward(float * __restrict ingrad, const float * __restrict outgrad,
+							  const int32_t * __restrict mask, int32_t insize, int32_t outsize, int32_t planes)
+{
+	for (int32_t i = 0; i < planes * insize; i++)
+		ingrad[i] = 0.0f;
+
+	for (int32_t z = 0; z < planes; z++)
+		for (int32_t i = z * outsize; i < (z + 1) * outsize; i++)
+			if (mask[i] >= 0)
+				ingrad[z * insize + mask[i]] += outgrad[i];
+}
+
+
+static void maxunpool2d(float * __restrict outdata, const float * __restrict indata, const int32_t * __restrict mask,
+						int32_t insize, int32_t outsize, int32_t planes)
+{
+	for (int32_t i = 0; i < planes * outsize; i++)
+		outdata[i] = 0.0f;
+
+	for (int32_t z = 0; z < planes; z++)
+		for (int32_t i = z * insize; i < (z + 1) * insize; i++)
+			if (mask[i] >= 0)
+				outdata[z * outsize + mask[i]] = indata[i];
+}
+
+
+static void maxunpool2dBackward(float * __restrict ingrad, const float * __restrict outgrad,
+								const int32_t * __restrict mask, int32_t insize, int32_t outsize, int32_t planes)
+{
+	for (int32_t z = 0; z < planes; z++)
+		for (int32_t i = z * insize; i < (z + 1) * insize; i++)
+			ingrad[i] = mask[i] >= 0 ? outgrad[z * outsize + mask[i]] : 0.0f;
+}
+
+"""
+
+
+mod = SourceModule(poolTmpl, functions=[
+	("maxpool2d", void_t, [
+		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"), (int32_t.ptr.restrict, "mask"),
+		(int32_t, "inh"), (int32_t, "inw"), (int32_t, "outh"), (int32_t, "outw"), (int32_t, "hstride"),
+		(int32_t, "wstride"), (int32_t, "hpad"), (int32_t, "wpad"), (int32_t, "fh"), (int32_t, "fw"),
+		(int32_t, "planes")
+	]),
+	("maxpool2dBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t.const.ptr.restrict, "mask"), (int32_t, "insize"), (int32_t, "outsize"), (int32_t, "planes")
+	]),
+	("maxunpool2d", void_t, [
+		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"),
+		(int32_t.const.ptr.restrict, "mask"), (int32_t, "insize"), (int32_t, "outsize"), (int32_t, "planes")
+	]),
+	("maxunpool2dBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t.const.ptr.restrict, "mask"), (int32_t, "insize"), (int32_t, "outsize"), (int32_t, "planes")
+	])
+])
+
+
+def maxpool2d(data, size, stride, pad):
+	assert data.dtype == np.float32
+	batchsize, maps, inh, inw = data.shape
+
+	fh, fw = size
+	hstride, wstride = stride
+	hpad, wpad = pad
+
+	outh = (inh - fh + 2 * hpad) // hstride + 1
+	outw = (inw - fw + 2 * wpad) // wstride + 1
+
+	outdata = CPUArray.empty((batchsize, maps, outh, outw), dtype=np.float32)
+	mask = CPUArray.empty((batchsize, maps, outh, outw), dtype=np.int32)
+
+	mod.maxpool2d(
+		outdata.data, data.data, mask.data, inh, inw, outh, outw, hstride, wstride, hpad, wpad, fh, fw,
+		batchsize * maps
+	)
+
+	return outdata, mask
+
+
+def maxpool2dBackward(grad, origshape, mask, size, stride, pad):
+	assert grad.dtype == np.float32 and mask.dtype == np.int32
+	batchsize, maps, outh, outw = grad.shape
+
+	inh, inw = origshape[2], origshape[3]
+	ingrad = CPUArray.empty((batchsize, maps, inh, inw), dtype=np.float32)
+
+	mod.maxpool2dBackward(ingrad.data, grad.data, mask.data, inh * inw, outh * outw, batchsize * maps)
+	return ingrad
+
+
+def maxunpool2d(data, origshape, mask):
+	assert data.dtype == np.float32
+	batchsize, maps, inh, inw = data.shape
+
+	outh, outw = origshape[2], origshape[3]
+	outdata = CPUArray.empty((batchsize, maps, outh, outw), dtype=np.float32)
+
+	mod.maxunpool2d(outdata.data, data.data, mask.data, inh * inw, outh * outw, batchsize * maps)
+	return outdata
+
+
+def maxunpool2dBackward(grad, poolshape, mask):
+	assert grad.dtype == np.float32 and mask.dtype == np.int32
+	batchsize, maps, outh, outw = grad.shape
+
+	inh, inw = poolshape[2], poolshape[3]
+	ingrad = CPUArray.empty((batchsize, maps, inh, inw), dtype=np.float32)
+
+	mod.maxunpool2dBackward(ingrad.data, grad.data, mask.data, inh * inw, outh * outw, batchsize * maps)
+	return ingrad
+
+
+def unittest():
+	poolTest()
+	unpoolTest()
+
+
+def poolTest():
+	batchsize, maps, h, w = 3, 4, 7, 6
+	size, stride, pad = 3, 2, 1
+
+	hostData = np.random.randn(batchsize, maps, h, w).astype(np.float32)
+
+	indata = CPUArray.toDevice(hostData)
+	pooldata, mask = maxpool2d(indata, [size, size], [stride, stride], [pad, pad])
+
+	hostPoolData = np.empty(pooldata.shape, dtype=np.float32)
+	hostMask = np.empty(mask.shape, dtype=np.int32)
+
+	for b in range(batchsize):
+		for c in range(maps):
+			for py in range(pooldata.shape[2]):
+				for px in range(pooldata.shape[3]):
+					maxval, maxidx = -np.inf, -1
+
+					for y in range(max(py * stride - pad, 0), min(h, py * stride - pad + size)):
+						for x in range(max(px * stride - pad, 0), min(w, px * stride - pad + size)):
+							if hostData[b, c, y, x] > maxval:
+								maxval, maxidx = hostData[b, c, y, x], y * w + x
+
+					hostPoolData[b, c, py, px], hostMask[b, c, py, px] = maxval, maxidx
+
+	assert np.allclose(hostPoolData, pooldata.get())
+	assert (hostMask == mask.get()).all()
+
+	hostGrad = np.random.randn(*pooldata.shape).astype(np.float32)
+	grad = CPUArray.toDevice(hostGrad)
+	ingrad = maxpool2dBackward(grad, indata.shape, mask, [size, size], [stride, stride], [pad, pad])
+
+	hostInGrad = np.zeros(ingrad.shape, dtype=np.float32)
+
+	for b in range(batchsize):
+		for c in range(maps):
+			for py in range(pooldata.shape[2]):
+				for px in range(pooldata.shape[3]):
+					hostInGrad[b, c].ravel()[hostMask[b, c, py, px]] += hostGrad[b, c, py, px]
+
+	assert np.allclose(hostInGrad, ingrad.get())
+
+
+def unpoolTest():
+	batchsize, maps, h, w = 10, 4, 6, 6
+	size, stride, pad = 2, 2, 1
+
+	indata = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+
+	pooldata, mask = maxpool2d(indata, [size, size], [stride, stride], [pad, pad])
+	unpooldata = maxunpool2d(pooldata, indata.shape, mask)
+
+	hostPoolData, hostMask = pooldata.get(), mask.get()
+	hostUnpoolData = np.zeros(unpooldata.shape, dtype=np.float32)
+
+	for b in range(batchsize):
+		for c in range(maps):
+			for y in range(pooldata.shape[2]):
+				for x in range(pooldata.shape[3]):
+					hostUnpoolData[b, c].ravel()[hostMask[b, c, y, x]] = hostPoolData[b, c, y, x]
+
+	assert np.allclose(hostUnpoolData, unpooldata.get())
+
+	hostGrad = np.random.randn(*unpooldata.shape).astype(np.float32)
+	ingrad = maxunpool2dBackward(CPUArray.toDevice(hostGrad), pooldata.shape, mask)
+
+	hostInGrad = np.empty(ingrad.shape, dtype=np.float32)
+
+	for b in range(batchsize):
+		for c in range(maps):
+			for y in range(pooldata.shape[2]):
+				for x in range(pooldata.shape[3]):
+					hostInGrad[b, c, y, x] = hostGrad[b, c].ravel()[hostMask[b, c, y, x]]
+
+	assert np.allclose(hostInGrad, ingrad.get())
+
+
+if __name__ == "__main__":
+	unittest()
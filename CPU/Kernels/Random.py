@@ -0,0 +1,361 @@
+from random import Random
+
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, int64_t, uint32_t, uint64_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule
+from PuzzleLib.CPU.CPUArray import CPUArray
+from PuzzleLib.CPU.Utils import parallelRange
+
+
+philoxTmpl = """
+
+#include <math.h>
+
+
+#define PHILOX_ROUNDS 10
+
+#define PHILOX_W32_0 0x9E3779B9U
+#define PHILOX_W32_1 0xBB67AE85U
+
+#define PHILOX_M4x32_0 0xD2511F53U
+#define PHILOX_M4x32_1 0xCD9E8D57U
+
+
+typedef struct PhiloxBlock
+{
+	int64_t index;
+	uint32_t v[4];
+}
+PhiloxBlock;
+
+
+static inline void philox4x32(uint32_t *out, uint64_t counter, uint32_t key0, uint32_t key1)
+{
+	uint32_t c0 = (uint32_t)counter, c1 = (uint32_t)(counter >> 32), c2 = 0, c3 = 0;
+
+	for (int32_t r = 0; r < PHILOX_ROUNDS; r++)
+	{
+		uint64_t p0 = (uint64_t)PHILOX_M4x32_0 * c0, p1 = (uint64_t)PHILOX_M4x32_1 * c2;
+
+		c0 = (uint32_t)(p1 >> 32) ^ c1 ^ key0, c1 = (uint32_t)p1;
+		c2 = (uint32_t)(p0 >> 32) ^ c3 ^ key1, c3 = (uint32_t)p0;
+
+		key0 += PHILOX_W32_0, key1 += PHILOX_W32_1;
+	}
+
+	out[0] = c0, out[1] = c1, out[2] = c2, out[3] = c3;
+}
+
+
+static inline const uint32_t *philoxFetch(PhiloxBlock *block, int64_t k, uint64_t offset,
+										  uint32_t key0, uint32_t key1)
+{
+	if (block->index != k >> 2)
+	{
+		block->index = k >> 2;
+		philox4x32(block->v, offset + (uint64_t)block->index, key0, key1);
+	}
+
+	return block->v;
+}
+
+
+static inline float philoxUnit(uint32_t x)
+{
+	return ((float)(x >> 8) + 0.5f) * (1.0f / 16777216.0f);
+}
+
+
+static inline float philoxValue(PhiloxBlock *block, int64_t k, uint64_t offset, uint32_t key0, uint32_t key1,
+								float a, float b, int32_t normal)
+{
+	const uint32_t *v = philoxFetch(block, k, offset, key0, key1);
+	int32_t lane = k & 3;
+
+	if (!normal)
+		return a + (b - a) * philoxUnit(v[lane]);
+
+	float radius = sqrtf(-2.0f * logf(philoxUnit(v[lane & 2])));
+	float theta = 6.283185307179586f * philoxUnit(v[(lane & 2) + 1]);
+
+	return a + b * radius * ((lane & 1) ? sinf(theta) : cosf(theta));
+}
+
+
+static void philoxFillInteger(uint32_t * __restrict outdata, uint32_t key0, uint32_t key1, uint64_t offset,
+							  int64_t start, int64_t stop)
+{
+	PhiloxBlock block = {-1, {0, 0, 0, 0}};
+
+	for (int64_t i = start; i < stop; i++)
+		outdata[i] = philoxFetch(&block, i, offset, key0, key1)[i & 3];
+}
+
+
+static void philoxFill(float * __restrict outdata, uint32_t key0, uint32_t key1, uint64_t offset, float a, float b,
+					   int32_t normal, int64_t start, int64_t stop)
+{
+	PhiloxBlock block = {-1, {0, 0, 0, 0}};
+
+	for (int64_t i = start; i < stop; i++)
+		outdata[i] = philoxValue(&block, i, offset, key0, key1, a, b, normal);
+}
+
+
+static void philoxDropout(float *outdata, const float *indata, uint32_t key0, uint32_t key1, uint64_t offset,
+						  uint32_t v, float p, int64_t mapsize, int64_t start, int64_t stop)
+{
+	PhiloxBlock block = {-1, {0, 0, 0, 0}};
+
+	for (int64_t i = start; i < stop; i++)
+	{
+		int64_t k = i / mapsize;
+		outdata[i] = indata[i] * (philoxFetch(&block, k, offset, key0, key1)[k & 3] < v) / p;
+	}
+}
+
+
+static void philoxInject(float *outdata, const float *indata, uint32_t key0, uint32_t key1, uint64_t offset,
+						 float a, float b, int32_t normal, int32_t mul, int64_t start, int64_t stop)
+{
+	PhiloxBlock block = {-1, {0, 0, 0, 0}};
+
+	for (int64_t i = start; i < stop; i++)
+	{
+		float noise = philoxValue(&block, i, offset, key0, key1, a, b, normal);
+		outdata[i] = mul ? indata[i] * noise : indata[i] + noise;
+	}
+}
+
+"""
+
+
+mod = SourceModule(philoxTmpl, functions=[
+	("philoxFillInteger", void_t, [
+		(uint32_t.ptr.restrict, "outdata"), (uint32_t, "key0"), (uint32_t, "key1"), (uint64_t, "offset"),
+		(int64_t, "start"), (int64_t, "stop")
+	], True),
+	("philoxFill", void_t, [
+		(float_t.ptr.restrict, "outdata"), (uint32_t, "key0"), (uint32_t, "key1"), (uint64_t, "offset"),
+		(float_t, "a"), (float_t, "b"), (int32_t, "normal"), (int64_t, "start"), (int64_t, "stop")
+	], True),
+	("philoxDropout", void_t, [
+		(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (uint32_t, "key0"), (uint32_t, "key1"),
+		(uint64_t, "offset"), (uint32_t, "v"), (float_t, "p"), (int64_t, "mapsize"), (int64_t, "start"),
+		(int64_t, "stop")
+	], True),
+	("philoxInject", void_t, [
+		(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (uint32_t, "key0"), (uint32_t, "key1"),
+		(uint64_t, "offset"), (float_t, "a"), (float_t, "b"), (int32_t, "normal"), (int32_t, "mul"),
+		(int64_t, "start"), (int64_t, "stop")
+	], True)
+])
+
+
+def launch(fn, size, slc, *args):
+	lo, hi = 0, size
+
+	if slc is not None:
+		lo, hi, step = slc.indices(size)
+		assert step == 1
+
+	parallelRange(lambda start, stop: fn(*args, lo + start, lo + stop), max(hi - lo, 0))
+
+
+class PhiloxGenerator:
+	def __init__(self, key=None, counter=0, seed=None):
+		self.key, self.counter = key, counter
+
+		if seed is not None:
+			self.seed(seed)
+
+
+	def seed(self, seed=None):
+		rng = Random(seed)
+
+		self.key = [rng.randrange(0, 1 << 32) for _ in range(2)]
+		self.counter = 0
+
+
+	def getKey(self):
+		if self.key is None:
+			self.key = [int(k) for k in np.random.randint(0, 1 << 32, size=(2, ), dtype=np.uint64)]
+
+		return self.key
+
+
+	def reserve(self, size):
+		offset = self.counter
+		self.counter += (size + 3) // 4
+
+		return offset
+
+
+	def fillInteger(self, data, offset=None):
+		assert data.dtype == np.uint32
+		offset = self.reserve(data.size) if offset is None else offset
+
+		launch(mod.philoxFillInteger, data.size, None, data.data, *self.getKey(), offset)
+		return offset
+
+
+	def fill(self, data, a, b, normal, offset):
+		assert data.dtype == np.float32
+		offset = self.reserve(data.size) if offset is None else offset
+
+		launch(mod.philoxFill, data.size, None, data.data, *self.getKey(), offset, a, b, normal)
+		return offset
+
+
+	def fillUniform(self, data, minval=0.0, maxval=1.0, offset=None):
+		return self.fill(data, minval, maxval, False, offset)
+
+
+	def fillNormal(self, data, mean=0.0, sigma=1.0, offset=None):
+		return self.fill(data, mean, sigma, True, offset)
+
+
+	def dropout(self, outdata, indata, offset, v, p, mapsize=1, slice=None):
+		assert outdata.dtype == indata.dtype and indata.dtype == np.float32 and outdata.size == indata.size
+		launch(mod.philoxDropout, indata.size, slice, outdata.data, indata.data, *self.getKey(), offset, v, p, mapsize)
+
+
+	def inject(self, outdata, indata, offset, a, b, normal, mul, slice=None):
+		assert outdata.dtype == indata.dtype and indata.dtype == np.float32 and outdata.size == indata.size
+		launch(
+			mod.philoxInject, indata.size, slice, outdata.data, indata.data, *self.getKey(), offset, a, b, normal, mul
+		)
+
+
+def unittest():
+	philoxTest()
+	reproducibilityTest()
+	seedTest()
+	dropoutTest()
+	injectTest()
+
+
+def philoxTest():
+	rng = PhiloxGenerator(key=[0, 0])
+
+	data = CPUArray.empty((4, ), dtype=np.uint32)
+	rng.fillInteger(data, offset=0)
+
+	assert (data.get() == np.array([0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8], dtype=np.uint32)).all()
+
+
+def reproducibilityTest():
+	rng = PhiloxGenerator(seed=1337)
+
+	uniform = CPUArray.empty((1 << 20, ), dtype=np.float32)
+	offset = rng.fillUniform(uniform, minval=-1.0, maxval=3.0)
+
+	hostUniform = uniform.get()
+	assert hostUniform.min() >= -1.0 and hostUniform.max() <= 3.0
+	assert abs(hostUniform.mean() - 1.0) < 1e-2
+
+	data = CPUArray.empty((1 << 20, ), dtype=np.float32)
+	assert rng.fillUniform(data, minval=-1.0, maxval=3.0) != offset
+	assert not np.allclose(hostUniform, data.get())
+
+	rng.fillUniform(data, minval=-1.0, maxval=3.0, offset=offset)
+	assert (hostUniform == data.get()).all()
+
+	prefix = CPUArray.empty((1000, ), dtype=np.float32)
+	rng.fillUniform(prefix, minval=-1.0, maxval=3.0, offset=offset)
+
+	assert (hostUniform[:1000] == prefix.get()).all()
+
+	normal = CPUArray.empty((1 << 20, ), dtype=np.float32)
+	rng.fillNormal(normal, mean=1.0, sigma=2.0)
+
+	hostNormal = normal.get()
+	assert abs(hostNormal.mean() - 1.0) < 1e-2 and abs(hostNormal.std() - 2.0) < 1e-2
+
+
+def seedTest():
+	data, hostData = CPUArray.empty((1000, ), dtype=np.float32), []
+
+	for _ in range(2):
+		np.random.seed(1234)
+		rng = PhiloxGenerator()
+
+		rng.fillUniform(data)
+		hostData.append(data.get())
+
+	assert (hostData[0] == hostData[1]).all()
+
+	rng.seed(42)
+	rng.fillNormal(data)
+
+	hostNormal = data.get()
+
+	rng.seed(42)
+	rng.fillNormal(data)
+
+	assert (hostNormal == data.get()).all() and rng.counter == 250
+
+
+def dropoutTest():
+	batchsize, maps, h, w = 16, 8, 7, 5
+	p = 0.75
+
+	rng = PhiloxGenerator(seed=42)
+
+	hostData = np.random.randn(batchsize, maps, h, w).astype(np.float32)
+	data, outdata = CPUArray.toDevice(hostData), CPUArray.empty((batchsize, maps, h, w), dtype=np.float32)
+
+	v = int(p * np.iinfo(np.uint32).max)
+
+	offset = rng.reserve(data.size)
+	rng.dropout(outdata, data, offset, v, p)
+
+	rands = CPUArray.empty(data.shape, dtype=np.uint32)
+	rng.fillInteger(rands, offset=offset)
+
+	hostMask = rands.get() < v
+	assert abs(hostMask.mean() - p) < 2e-2
+	assert np.allclose(hostData * hostMask / p, outdata.get())
+
+	offset = rng.reserve(batchsize * maps)
+	rng.dropout(outdata, data, offset, v, p, mapsize=h * w)
+
+	rands = CPUArray.empty((batchsize, maps, 1, 1), dtype=np.uint32)
+	rng.fillInteger(rands, offset=offset)
+
+	assert np.allclose(hostData * (rands.get() < v) / p, outdata.get())
+
+	sliced = CPUArray.toDevice(hostData)
+	rng.dropout(sliced, data, offset, v, p, mapsize=h * w, slice=slice(maps * h * w, 3 * maps * h * w))
+
+	hostSliced = hostData.copy()
+	hostSliced[1:3] = outdata.get()[1:3]
+
+	assert np.allclose(hostSliced, sliced.get())
+
+
+def injectTest():
+	rng = PhiloxGenerator(seed=7)
+
+	hostData = np.random.randn(10, 3, 16, 16).astype(np.float32)
+	data, outdata = CPUArray.toDevice(hostData), CPUArray.empty(hostData.shape, dtype=np.float32)
+
+	noise = CPUArray.empty(hostData.shape, dtype=np.float32)
+
+	for normal in (False, True):
+		offset = rng.reserve(data.size)
+
+		rng.fill(noise, 0.5, 2.0, normal, offset)
+		hostNoise = noise.get()
+
+		rng.inject(outdata, data, offset, 0.5, 2.0, normal, False)
+		assert np.allclose(hostData + hostNoise, outdata.get())
+
+		rng.inject(outdata, data, offset, 0.5, 2.0, normal, True)
+		assert np.allclose(hostData * hostNoise, outdata.get())
+
+
+if __name__ == "__main__":
+	unittest()
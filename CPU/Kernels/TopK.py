@@ -0,0 +1,133 @@
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule
+from PuzzleLib.CPU.CPUArray import CPUArray
+
+
+topkTmpl = """
+
+static void topk(float * __restrict outdata, int32_t * __restrict indices, const float * __restrict indata,
+				 int32_t outer, int32_t size, int32_t inner, int32_t k)
+{
+	for (int32_t o = 0; o < outer; o++)
+		for (int32_t i = 0; i < inner; i++)
+		{
+			const float *row = indata + o * size * inner + i;
+
+			float *outrow = outdata + o * k * inner + i;
+			int32_t *idxrow = indices + o * k * inner + i;
+
+			for (int32_t t = 0; t < size; t++)
+			{
+				float value = row[t * inner];
+				int32_t j = 0;
+
+				if (t < k)
+				{
+					for (j = t; j > 0 && outrow[(j - 1) * inner] > value; j--)
+					{
+						outrow[j * inner] = outrow[(j - 1) * inner];
+						idxrow[j * inner] = idxrow[(j - 1) * inner];
+					}
+				}
+				else
+				{
+					if (!(value > outrow[0]))
+						continue;
+
+					for (j = 0; j + 1 < k && outrow[(j + 1) * inner] < value; j++)
+					{
+						outrow[j * inner] = outrow[(j + 1) * inner];
+						idxrow[j * inner] = idxrow[(j + 1) * inner];
+					}
+				}
+
+				outrow[j * inner] = value, idxrow[j * inner] = t;
+			}
+		}
+}
+
+static void topkBackward(float * __restrict ingrad, const float * __restrict outgrad,
+						 const int32_t * __restrict indices, int32_t outer, int32_t size, int32_t inner, int32_t k)
+{
+	for (int32_t o = 0; o < outer; o++)
+		for (int32_t j = 0; j < k; j++)
+			for (int32_t i = 0; i < inner; i++)
+			{
+				int32_t index = (o * k + j) * inner + i;
+				ingrad[(o * size + indices[index]) * inner + i] = outgrad[index];
+			}
+}
+
+"""
+
+
+mod = SourceModule(topkTmpl, functions=[
+	("topk", void_t, [
+		(float_t.ptr.restrict, "outdata"), (int32_t.ptr.restrict, "indices"), (float_t.const.ptr.restrict, "indata"),
+		(int32_t, "outer"), (int32_t, "size"), (int32_t, "inner"), (int32_t, "k")
+	], True),
+	("topkBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t.const.ptr.restrict, "indices"), (int32_t, "outer"), (int32_t, "size"), (int32_t, "inner"),
+		(int32_t, "k")
+	], True)
+])
+
+
+def splitAxis(shape, axis):
+	return int(np.prod(shape[:axis])), shape[axis], int(np.prod(shape[axis + 1:]))
+
+
+def topk(data, k, axis):
+	assert data.dtype == np.float32 and 0 < k <= data.shape[axis]
+
+	outer, size, inner = splitAxis(data.shape, axis)
+	outshape = data.shape[:axis] + (k, ) + data.shape[axis + 1:]
+
+	outdata = CPUArray.empty(outshape, dtype=np.float32)
+	indices = CPUArray.empty(outshape, dtype=np.int32)
+
+	mod.topk(outdata.data, indices.data, data.data, outer, size, inner, k)
+	return outdata, indices
+
+
+def topkBackward(grad, indices, axis, size):
+	assert grad.dtype == np.float32 and indices.dtype == np.int32 and grad.shape == indices.shape
+
+	outer, k, inner = splitAxis(grad.shape, axis)
+	ingrad = CPUArray.zeros(grad.shape[:axis] + (size, ) + grad.shape[axis + 1:], dtype=np.float32)
+
+	mod.topkBackward(ingrad.data, grad.data, indices.data, outer, size, inner, k)
+	return ingrad
+
+
+def unittest():
+	for axis in range(3):
+		topkTest(axis)
+
+
+def topkTest(axis):
+	shape, k = (6, 10, 16), 5
+
+	hostData = np.random.randn(*shape).astype(np.float32)
+	outdata, indices = topk(CPUArray.toDevice(hostData), k, axis)
+
+	hostOutData = np.sort(np.partition(hostData, -k, axis=axis).take(range(shape[axis] - k, shape[axis]), axis), axis)
+
+	assert np.allclose(hostOutData, outdata.get())
+	assert np.allclose(np.take_along_axis(hostData, indices.get(), axis), hostOutData)
+
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = topkBackward(CPUArray.toDevice(hostGrad), indices, axis, shape[axis])
+
+	hostInGrad = np.zeros(shape, dtype=np.float32)
+	np.put_along_axis(hostInGrad, indices.get(), hostGrad, axis)
+
+	assert np.allclose(hostInGrad, ingrad.get())
+
+
+if __name__ == "__main__":
+	unittest()
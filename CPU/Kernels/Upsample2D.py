@@ -1,27 +1,125 @@
+import itertools
 import numpy as np
 
 from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, float_t
 
 from PuzzleLib.CPU.SourceModule import SourceModule
 from PuzzleLib.CPU.CPUArray import CPUArray
+from PuzzleLib.CPU.Utils import parallelRange
 
 
 upsample2dNearestTmpl = """
 
-static void upsample2dNearest(float * __restrict outdata, const float * __restrict indata,
-							  int32_t batchsize, int32_t maps, int32_t inh, int32_t inw, int32_t hscale, int32_t wscale)
+static void upsample2dNearest(float * __restrict outdata, const float * __restrict indata, int32_t inh, int32_t inw,
+							  int32_t hscale, int32_t wscale, int32_t start, int32_t stop)
 {
 	int32_t outh = inh * hscale, outw = inw * wscale;
 
-	for (int32_t z = 0; z < batchsize * maps; z++)
+	for (int32_t z = start; z < stop; z++)
 		for (int32_t y = 0; y < inh; y++)
+			for (int32_t i = 0; i < hscale; i++)
+			{
+				const float *inrow = indata + (z * inh + y) * inw;
+				float *outrow = outdata + (z * outh + y * hscale + i) * outw;
+
+				for (int32_t x = 0; x < inw; x++)
+					for (int32_t j = 0; j < wscale; j++)
+						outrow[x * wscale + j] = inrow[x];
+			}
+}
+
+
+static void upsample2dNearestBackward(float * __restrict ingrad, const float * __restrict outgrad,
+									  int32_t inh, int32_t inw, int32_t hscale, int32_t wscale,
+									  int32_t start, int32_t stop)
+{
+	int32_t outh = inh * hscale, outw = inw * wscale;
+
+	for (int32_t z = start; z < stop; z++)
+		for (int32_t y = 0; y < inh; y++)
+		{
+			float *inrow = ingrad + (z * inh + y) * inw;
+
 			for (int32_t x = 0; x < inw; x++)
-				for (int32_t i = 0; i < hscale; i++)
+				inrow[x] = 0.0f;
+
+			for (int32_t i = 0; i < hscale; i++)
+			{
+				const float *outrow = outgrad + (z * outh + y * hscale + i) * outw;
+
+				for (int32_t x = 0; x < inw; x++)
 					for (int32_t j = 0; j < wscale; j++)
-					{
-						int32_t outidx = z * outh * outw + (y * hscale + i) * outw + (x * wscale + j);
-						outdata[outidx] = indata[z * inh * inw + y * inw + x];
-					}
+						inrow[x] += outrow[x * wscale + j];
+			}
+		}
+}
+
+"""
+
+
+upsample2dLinearTmpl = """
+
+static void upsample2dLinear(float * __restrict outdata, const float * __restrict indata, int32_t inh, int32_t inw,
+							 int32_t outh, int32_t outw, float rh, float rw, int32_t start, int32_t stop)
+{
+	for (int32_t z = start; z < stop; z++)
+		for (int32_t outy = 0; outy < outh; outy++)
+		{
+			float h1r = rh * outy;
+			int32_t h1 = h1r;
+			int32_t h1p = (h1 < inh - 1) ? 1 : 0;
+			float dh1 = h1r - h1, dh0 = 1.0f - dh1;
+
+			const float *row0 = indata + (z * inh + h1) * inw, *row1 = row0 + h1p * inw;
+			float *outrow = outdata + (z * outh + outy) * outw;
+
+			for (int32_t outx = 0; outx < outw; outx++)
+			{
+				float w1r = rw * outx;
+				int32_t w1 = w1r;
+				int32_t w1p = (w1 < inw - 1) ? 1 : 0;
+				float dw1 = w1r - w1, dw0 = 1.0f - dw1;
+
+				outrow[outx] = dh0 * (dw0 * row0[w1] + dw1 * row0[w1 + w1p]) +
+							   dh1 * (dw0 * row1[w1] + dw1 * row1[w1 + w1p]);
+			}
+		}
+}
+
+
+static void upsample2dLinearBackward(float * __restrict ingrad, const float * __restrict outgrad,
+									 int32_t inh, int32_t inw, int32_t outh, int32_t outw, float rh, float rw,
+									 int32_t start, int32_t stop)
+{
+	for (int32_t i = start * inh * inw; i < stop * inh * inw; i++)
+		ingrad[i] = 0.0f;
+
+	for (int32_t z = start; z < stop; z++)
+		for (int32_t outy = 0; outy < outh; outy++)
+		{
+			float h1r = rh * outy;
+			int32_t h1 = h1r;
+			int32_t h1p = (h1 < inh - 1) ? 1 : 0;
+			float dh1 = h1r - h1, dh0 = 1.0f - dh1;
+
+			float *row0 = ingrad + (z * inh + h1) * inw, *row1 = row0 + h1p * inw;
+			const float *outrow = outgrad + (z * outh + outy) * outw;
+
+			for (int32_t outx = 0; outx < outw; outx++)
+			{
+				float w1r = rw * outx;
+				int32_t w1 = w1r;
+				int32_t w1p = (w1 < inw - 1) ? 1 : 0;
+				float dw1 = w1r - w1, dw0 = 1.0f - dw1;
+
+				float val = outrow[outx];
+
+				row0[w1] += dh0 * dw0 * val;
+				row0[w1 + w1p] += dh0 * dw1 * val;
+				row1[w1] += dh1 * dw0 * val;
+				row1[w1 + w1p] += dh1 * dw1 * val;
+			}
+		}
 }
 
 """
@@ -29,13 +127,34 @@ static void upsample2dNearest(float * __restrict outdata, const float * __restri
 
 nearestMod = SourceModule(upsample2dNearestTmpl, functions=[
 	("upsample2dNearest", void_t, [
-		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"), (int32_t, "batchsize"),
-		(int32_t, "maps"), (int32_t, "inh"), (int32_t, "inw"), (int32_t, "hscale"), (int32_t, "wscale")
+		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"), (int32_t, "inh"), (int32_t, "inw"),
+		(int32_t, "hscale"), (int32_t, "wscale"), (int32_t, "start"), (int32_t, "stop")
+	], True),
+	("upsample2dNearestBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"), (int32_t, "inh"), (int32_t, "inw"),
+		(int32_t, "hscale"), (int32_t, "wscale"), (int32_t, "start"), (int32_t, "stop")
 	], True)
 ])
 
+linearMod = SourceModule(upsample2dLinearTmpl, functions=[
+	("upsample2dLinear", void_t, [
+		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"), (int32_t, "inh"), (int32_t, "inw"),
+		(int32_t, "outh"), (int32_t, "outw"), (float_t, "rh"), (float_t, "rw"), (int32_t, "start"), (int32_t, "stop")
+	], True),
+	("upsample2dLinearBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"), (int32_t, "inh"), (int32_t, "inw"),
+		(int32_t, "outh"), (int32_t, "outw"), (float_t, "rh"), (float_t, "rw"), (int32_t, "start"), (int32_t, "stop")
+	], True)
+])
+
+
+def linearRatio(insize, outsize):
+	return (insize - 1) / (outsize - 1) if outsize > 1 else 0.0
+
 
 def upsample2d(data, scale, mode="nearest"):
+	assert data.dtype == np.float32
+
 	batchsize, maps, inh, inw = data.shape
 	hscale, wscale = (scale, scale) if isinstance(scale, int) else scale
 
@@ -43,15 +162,56 @@ def upsample2d(data, scale, mode="nearest"):
 	outdata = CPUArray.empty((batchsize, maps, outh, outw), dtype=data.dtype)
 
 	if mode == "nearest":
-		nearestMod.upsample2dNearest(outdata.data, data.data, batchsize, maps, inh, inw, hscale, wscale)
+		parallelRange(
+			nearestMod.upsample2dNearest, batchsize * maps, outdata.data, data.data, inh, inw, hscale, wscale
+		)
+
+	elif mode == "linear":
+		rh, rw = linearRatio(inh, outh), linearRatio(inw, outw)
+
+		parallelRange(
+			linearMod.upsample2dLinear, batchsize * maps, outdata.data, data.data, inh, inw, outh, outw, rh, rw
+		)
 
 	else:
-		raise ValueError("Unsupported upsampling mode")
+		raise NotImplementedError(mode)
 
 	return outdata
 
 
+def upsample2dBackward(grad, scale, mode="nearest"):
+	assert grad.dtype == np.float32
+
+	batchsize, maps, outh, outw = grad.shape
+	hscale, wscale = (scale, scale) if isinstance(scale, int) else scale
+
+	inh, inw = outh // hscale, outw // wscale
+	ingrad = CPUArray.empty((batchsize, maps, inh, inw), dtype=grad.dtype)
+
+	if mode == "nearest":
+		parallelRange(
+			nearestMod.upsample2dNearestBackward, batchsize * maps, ingrad.data, grad.data, inh, inw, hscale, wscale
+		)
+
+	elif mode == "linear":
+		rh, rw = linearRatio(inh, outh), linearRatio(inw, outw)
+
+		parallelRange(
+			linearMod.upsample2dLinearBackward, batchsize * maps, ingrad.data, grad.data, inh, inw, outh, outw, rh, rw
+		)
+
+	else:
+		raise NotImplementedError(mode)
+
+	return ingrad
+
+
 def unittest():
+	upsample2dNearestTest()
+	upsample2dLinearTest()
+
+
+def upsample2dNearestTest():
 	batchsize, maps, inh, inw = 3, 2, 16, 15
 	scale = 2
 
@@ -61,14 +221,67 @@ def unittest():
 	hostData = data.get()
 	hostOutData = np.empty(outdata.shape, dtype=np.float32)
 
-	for b in range(batchsize):
-		for c in range(maps):
-			for y in range(inh):
-				for x in range(inw):
-					hostOutData[b, c, y * scale:(y + 1) * scale, x * scale:(x + 1) * scale] = hostData[b, c, y, x]
+	for b, c, y, x in itertools.product(range(batchsize), range(maps), range(inh), range(inw)):
+		hostOutData[b, c, y * scale:(y + 1) * scale, x * scale:(x + 1) * scale] = hostData[b, c, y, x]
 
 	assert np.allclose(hostOutData, outdata.get())
 
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = upsample2dBackward(CPUArray.toDevice(hostGrad), scale)
+
+	hostInGrad = np.zeros(data.shape, dtype=np.float32)
+
+	for b, c, y, x, dy, dx in itertools.product(
+		range(batchsize), range(maps), range(inh), range(inw), range(scale), range(scale)
+	):
+		hostInGrad[b, c, y, x] += hostGrad[b, c, y * scale + dy, x * scale + dx]
+
+	assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+
+
+def upsample2dLinearTest():
+	batchsize, maps, inh, inw = 3, 2, 4, 4
+	hscale, wscale = 2, 3
+
+	hostData = np.random.randn(batchsize, maps, inh, inw).astype(np.float32)
+
+	data = CPUArray.toDevice(hostData)
+	outdata = upsample2d(data, (hscale, wscale), mode="linear")
+
+	hostOutData = np.zeros(outdata.shape, dtype=np.float32)
+	rh, rw = (inh - 1) / (inh * hscale - 1), (inw - 1) / (inw * wscale - 1)
+
+	for b, c, y, x, in itertools.product(range(batchsize), range(maps), range(inh * hscale), range(inw * wscale)):
+		iny, inx = int(rh * y), int(rw * x)
+		dy, dx = 1.0 - (rh * y - iny), 1.0 - (rw * x - inx)
+
+		yi, xi = 1 if y < inh * hscale - 1 else 0, 1 if x < inw * wscale - 1 else 0
+
+		hostOutData[b, c, y, x] = dy * (dx * hostData[b, c, iny, inx] + (1 - dx) * hostData[b, c, iny, inx + xi]) + \
+								  (1 - dy) * (dx * hostData[b, c, iny + yi, inx] +
+								  (1 - dx) * hostData[b, c, iny + yi, inx + xi])
+
+	assert np.allclose(hostOutData, outdata.get(), atol=1e-5)
+
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = upsample2dBackward(CPUArray.toDevice(hostGrad), (hscale, wscale), mode="linear")
+
+	hostInGrad = np.zeros(data.shape, dtype=np.float32)
+
+	for b, c, y, x in itertools.product(range(batchsize), range(maps), range(inh * hscale), range(inw * wscale)):
+		iny, inx = int(rh * y), int(rw * x)
+		dy, dx = 1.0 - (rh * y - iny), 1.0 - (rw * x - inx)
+
+		yi, xi = 1 if y < inh * hscale - 1 else 0, 1 if x < inw * wscale - 1 else 0
+		val = hostGrad[b, c, y, x]
+
+		hostInGrad[b, c, iny, inx] += dy * dx * val
+		hostInGrad[b, c, iny, inx + xi] += dy * (1 - dx) * val
+		hostInGrad[b, c, iny + yi, inx] += (1 - dy) * dx * val
+		hostInGrad[b, c, iny + yi, inx + xi] += (1 - dy) * (1 - dx) * val
+
+	assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+
 
 if __name__ == "__main__":
 	unittest()
@@ -0,0 +1,321 @@
+import itertools
+import numpy as np
+
+from PuzzleLib.Compiler.Codegen.Types import void_t, int32_t, float_t
+
+from PuzzleLib.CPU.SourceModule import SourceModule
+from PuzzleLib.CPU.CPUArray import CPUArray
+from PuzzleLib.CPU.Utils import parallelRange
+
+from PuzzleLib.CPU.Kernels.Upsample2D import linearRatio
+
+
+upsample3dNearestTmpl = """
+
+static void upsample3dNearest(float * __restrict outdata, const float * __restrict indata,
+							  int32_t ind, int32_t inh, int32_t inw, int32_t dscale, int32_t hscale, int32_t wscale,
+							  int32_t start, int32_t stop)
+{
+	int32_t outd = ind * dscale, outh = inh * hscale, outw = inw * wscale;
+
+	for (int32_t z = start; z < stop; z++)
+		for (int32_t d = 0; d < ind; d++)
+			for (int32_t k = 0; k < dscale; k++)
+				for (int32_t y = 0; y < inh; y++)
+					for (int32_t i = 0; i < hscale; i++)
+					{
+						const float *inrow = indata + ((z * ind + d) * inh + y) * inw;
+						float *outrow = outdata + ((z * outd + d * dscale + k) * outh + y * hscale + i) * outw;
+
+						for (int32_t x = 0; x < inw; x++)
+							for (int32_t j = 0; j < wscale; j++)
+								outrow[x * wscale + j] = inrow[x];
+					}
+}
+
+
+static void upsample3dNearestBackward(float * __restrict ingrad, const float * __restrict outgrad,
+									  int32_t ind, int32_t inh, int32_t inw, int32_t dscale, int32_t hscale,
+									  int32_t wscale, int32_t start, int32_t stop)
+{
+	int32_t outd = ind * dscale, outh = inh * hscale, outw = inw * wscale;
+
+	for (int32_t z = start; z < stop; z++)
+		for (int32_t d = 0; d < ind; d++)
+			for (int32_t y = 0; y < inh; y++)
+			{
+				float *inrow = ingrad + ((z * ind + d) * inh + y) * inw;
+
+				for (int32_t x = 0; x < inw; x++)
+					inrow[x] = 0.0f;
+
+				for (int32_t k = 0; k < dscale; k++)
+					for (int32_t i = 0; i < hscale; i++)
+					{
+						const float *outrow = outgrad + ((z * outd + d * dscale + k) * outh + y * hscale + i) * outw;
+
+						for (int32_t x = 0; x < inw; x++)
+							for (int32_t j = 0; j < wscale; j++)
+								inrow[x] += outrow[x * wscale + j];
+					}
+			}
+}
+
+"""
+
+
+upsample3dLinearTmpl = """
+
+static void upsample3dLinear(float * __restrict outdata, const float * __restrict indata,
+							 int32_t ind, int32_t inh, int32_t inw, int32_t outd, int32_t outh, int32_t outw,
+							 float rd, float rh, float rw, int32_t start, int32_t stop)
+{
+	for (int32_t z = start; z < stop; z++)
+		for (int32_t outz = 0; outz < outd; outz++)
+		{
+			float d1r = rd * outz;
+			int32_t d1 = d1r;
+			int32_t d1p = (d1 < ind - 1) ? 1 : 0;
+			float dd1 = d1r - d1, dd0 = 1.0f - dd1;
+
+			for (int32_t outy = 0; outy < outh; outy++)
+			{
+				float h1r = rh * outy;
+				int32_t h1 = h1r;
+				int32_t h1p = (h1 < inh - 1) ? 1 : 0;
+				float dh1 = h1r - h1, dh0 = 1.0f - dh1;
+
+				const float *row00 = indata + ((z * ind + d1) * inh + h1) * inw, *row01 = row00 + h1p * inw;
+				const float *row10 = row00 + d1p * inh * inw, *row11 = row10 + h1p * inw;
+
+				float *outrow = outdata + ((z * outd + outz) * outh + outy) * outw;
+
+				for (int32_t outx = 0; outx < outw; outx++)
+				{
+					float w1r = rw * outx;
+					int32_t w1 = w1r;
+					int32_t w1p = (w1 < inw - 1) ? 1 : 0;
+					float dw1 = w1r - w1, dw0 = 1.0f - dw1;
+
+					outrow[outx] = dd0 * (dh0 * (dw0 * row00[w1] + dw1 * row00[w1 + w1p]) +
+										  dh1 * (dw0 * row01[w1] + dw1 * row01[w1 + w1p])) +
+								   dd1 * (dh0 * (dw0 * row10[w1] + dw1 * row10[w1 + w1p]) +
+										  dh1 * (dw0 * row11[w1] + dw1 * row11[w1 + w1p]));
+				}
+			}
+		}
+}
+
+
+static void upsample3dLinearBackward(float * __restrict ingrad, const float * __restrict outgrad,
+									 int32_t ind, int32_t inh, int32_t inw, int32_t outd, int32_t outh, int32_t outw,
+									 float rd, float rh, float rw, int32_t start, int32_t stop)
+{
+	for (int32_t i = start * ind * inh * inw; i < stop * ind * inh * inw; i++)
+		ingrad[i] = 0.0f;
+
+	for (int32_t z = start; z < stop; z++)
+		for (int32_t outz = 0; outz < outd; outz++)
+		{
+			float d1r = rd * outz;
+			int32_t d1 = d1r;
+			int32_t d1p = (d1 < ind - 1) ? 1 : 0;
+			float dd1 = d1r - d1, dd0 = 1.0f - dd1;
+
+			for (int32_t outy = 0; outy < outh; outy++)
+			{
+				float h1r = rh * outy;
+				int32_t h1 = h1r;
+				int32_t h1p = (h1 < inh - 1) ? 1 : 0;
+				float dh1 = h1r - h1, dh0 = 1.0f - dh1;
+
+				float *row00 = ingrad + ((z * ind + d1) * inh + h1) * inw, *row01 = row00 + h1p * inw;
+				float *row10 = row00 + d1p * inh * inw, *row11 = row10 + h1p * inw;
+
+				const float *outrow = outgrad + ((z * outd + outz) * outh + outy) * outw;
+
+				for (int32_t outx = 0; outx < outw; outx++)
+				{
+					float w1r = rw * outx;
+					int32_t w1 = w1r;
+					int32_t w1p = (w1 < inw - 1) ? 1 : 0;
+					float dw1 = w1r - w1, dw0 = 1.0f - dw1;
+
+					float val = outrow[outx];
+
+					row00[w1] += dd0 * dh0 * dw0 * val;
+					row00[w1 + w1p] += dd0 * dh0 * dw1 * val;
+					row01[w1] += dd0 * dh1 * dw0 * val;
+					row01[w1 + w1p] += dd0 * dh1 * dw1 * val;
+
+					row10[w1] += dd1 * dh0 * dw0 * val;
+					row10[w1 + w1p] += dd1 * dh0 * dw1 * val;
+					row11[w1] += dd1 * dh1 * dw0 * val;
+					row11[w1 + w1p] += dd1 * dh1 * dw1 * val;
+				}
+			}
+		}
+}
+
+"""
+
+
+nearestMod = SourceModule(upsample3dNearestTmpl, functions=[
+	("upsample3dNearest", void_t, [
+		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"),
+		(int32_t, "ind"), (int32_t, "inh"), (int32_t, "inw"), (int32_t, "dscale"), (int32_t, "hscale"),
+		(int32_t, "wscale"), (int32_t, "start"), (int32_t, "stop")
+	], True),
+	("upsample3dNearestBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t, "ind"), (int32_t, "inh"), (int32_t, "inw"), (int32_t, "dscale"), (int32_t, "hscale"),
+		(int32_t, "wscale"), (int32_t, "start"), (int32_t, "stop")
+	], True)
+])
+
+linearMod = SourceModule(upsample3dLinearTmpl, functions=[
+	("upsample3dLinear", void_t, [
+		(float_t.ptr.restrict, "outdata"), (float_t.const.ptr.restrict, "indata"),
+		(int32_t, "ind"), (int32_t, "inh"), (int32_t, "inw"), (int32_t, "outd"), (int32_t, "outh"), (int32_t, "outw"),
+		(float_t, "rd"), (float_t, "rh"), (float_t, "rw"), (int32_t, "start"), (int32_t, "stop")
+	], True),
+	("upsample3dLinearBackward", void_t, [
+		(float_t.ptr.restrict, "ingrad"), (float_t.const.ptr.restrict, "outgrad"),
+		(int32_t, "ind"), (int32_t, "inh"), (int32_t, "inw"), (int32_t, "outd"), (int32_t, "outh"), (int32_t, "outw"),
+		(float_t, "rd"), (float_t, "rh"), (float_t, "rw"), (int32_t, "start"), (int32_t, "stop")
+	], True)
+])
+
+
+def upsample3d(data, scale, mode="nearest"):
+	assert data.dtype == np.float32
+
+	batchsize, maps, ind, inh, inw = data.shape
+	dscale, hscale, wscale = (scale, scale, scale) if isinstance(scale, int) else scale
+
+	outd, outh, outw = dscale * ind, hscale * inh, wscale * inw
+	outdata = CPUArray.empty((batchsize, maps, outd, outh, outw), dtype=data.dtype)
+
+	if mode == "nearest":
+		parallelRange(
+			nearestMod.upsample3dNearest, batchsize * maps, outdata.data, data.data,
+			ind, inh, inw, dscale, hscale, wscale
+		)
+
+	elif mode == "linear":
+		rd, rh, rw = linearRatio(ind, outd), linearRatio(inh, outh), linearRatio(inw, outw)
+
+		parallelRange(
+			linearMod.upsample3dLinear, batchsize * maps, outdata.data, data.data,
+			ind, inh, inw, outd, outh, outw, rd, rh, rw
+		)
+
+	else:
+		raise NotImplementedError(mode)
+
+	return outdata
+
+
+def upsample3dBackward(grad, scale, mode="nearest"):
+	assert grad.dtype == np.float32
+
+	batchsize, maps, outd, outh, outw = grad.shape
+	dscale, hscale, wscale = (scale, scale, scale) if isinstance(scale, int) else scale
+
+	ind, inh, inw = outd // dscale, outh // hscale, outw // wscale
+	ingrad = CPUArray.empty((batchsize, maps, ind, inh, inw), dtype=grad.dtype)
+
+	if mode == "nearest":
+		parallelRange(
+			nearestMod.upsample3dNearestBackward, batchsize * maps, ingrad.data, grad.data,
+			ind, inh, inw, dscale, hscale, wscale
+		)
+
+	elif mode == "linear":
+		rd, rh, rw = linearRatio(ind, outd), linearRatio(inh, outh), linearRatio(inw, outw)
+
+		parallelRange(
+			linearMod.upsample3dLinearBackward, batchsize * maps, ingrad.data, grad.data,
+			ind, inh, inw, outd, outh, outw, rd, rh, rw
+		)
+
+	else:
+		raise NotImplementedError(mode)
+
+	return ingrad
+
+
+def unittest():
+	upsample3dNearestTest()
+	upsample3dLinearTest()
+
+
+def upsample3dNearestTest():
+	batchsize, maps, ind, inh, inw = 4, 2, 3, 5, 3
+	scale = 2
+
+	hostData = np.random.randn(batchsize, maps, ind, inh, inw).astype(np.float32)
+
+	data = CPUArray.toDevice(hostData)
+	outdata = upsample3d(data, scale, mode="nearest")
+
+	hostOutData = np.empty(outdata.shape, dtype=np.float32)
+
+	for b, c, z, y, x in itertools.product(range(batchsize), range(maps), range(ind), range(inh), range(inw)):
+		hostOutData[b, c, z * scale:(z + 1) * scale, y * scale:(y + 1) * scale, x * scale:(x + 1) * scale] = \
+			hostData[b, c, z, y, x]
+
+	assert np.allclose(hostOutData, outdata.get())
+
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = upsample3dBackward(CPUArray.toDevice(hostGrad), scale)
+
+	hostInGrad = np.zeros(data.shape, dtype=np.float32)
+
+	for b, c, z, y, x, dz, dy, dx in itertools.product(
+		range(batchsize), range(maps), range(ind), range(inh), range(inw), range(scale), range(scale), range(scale)
+	):
+		hostInGrad[b, c, z, y, x] += hostGrad[b, c, z * scale + dz, y * scale + dy, x * scale + dx]
+
+	assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+
+
+def upsample3dLinearTest():
+	batchsize, maps, ind, inh, inw = 2, 2, 3, 2, 4
+	dscale, hscale, wscale = 2, 3, 2
+
+	hostData = np.random.randn(batchsize, maps, ind, inh, inw).astype(np.float32)
+
+	data = CPUArray.toDevice(hostData)
+	outdata = upsample3d(data, (dscale, hscale, wscale), mode="linear")
+
+	rd, rh, rw = (ind - 1) / (ind * dscale - 1), (inh - 1) / (inh * hscale - 1), (inw - 1) / (inw * wscale - 1)
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+
+	hostOutData = np.zeros(outdata.shape, dtype=np.float32)
+	hostInGrad = np.zeros(data.shape, dtype=np.float32)
+
+	for b, c, z, y, x in itertools.product(
+		range(batchsize), range(maps), range(ind * dscale), range(inh * hscale), range(inw * wscale)
+	):
+		inz, iny, inx = int(rd * z), int(rh * y), int(rw * x)
+		dz, dy, dx = 1.0 - (rd * z - inz), 1.0 - (rh * y - iny), 1.0 - (rw * x - inx)
+
+		zi = 1 if z < ind * dscale - 1 else 0
+		yi = 1 if y < inh * hscale - 1 else 0
+		xi = 1 if x < inw * wscale - 1 else 0
+
+		for oz, wz in ((0, dz), (zi, 1 - dz)):
+			for oy, wy in ((0, dy), (yi, 1 - dy)):
+				for ox, wx in ((0, dx), (xi, 1 - dx)):
+					hostOutData[b, c, z, y, x] += wz * wy * wx * hostData[b, c, inz + oz, iny + oy, inx + ox]
+					hostInGrad[b, c, inz + oz, iny + oy, inx + ox] += wz * wy * wx * hostGrad[b, c, z, y, x]
+
+	assert np.allclose(hostOutData, outdata.get(), atol=1e-5)
+
+	ingrad = upsample3dBackward(CPUArray.toDevice(hostGrad), (dscale, hscale, wscale), mode="linear")
+	assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+
+
+if __name__ == "__main__":
+	unittest()
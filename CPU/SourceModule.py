@@ -1,4 +1,4 @@
-import sys, os
+import sys, os, re
 from string import Template
 
 import numpy as np
@@ -127,6 +127,129 @@ class Kernel:
 		raise NotImplementedError()
 
 
+	def build(self):
+		if self.module is None:
+			source, functions = self.generateSource()
+			self.module = SourceModule(
+				source, functions, converter=self.paramConverter, finalizer=self.funcFinalizer, debug=self.debug
+			)
+
+		self.module.build()
+		return self
+
+
+storageTmpl = """
+
+#include <stdint.h>
+#include <string.h>
+
+
+static inline float halfToFloat(uint16_t h)
+{
+	uint32_t sign = (uint32_t)(h & 0x8000) << 16, exponent = (h >> 10) & 0x1F, mantissa = h & 0x3FF, bits;
+
+	if (exponent == 0x1F)
+		bits = sign | 0x7F800000 | (mantissa << 13);
+
+	else if (exponent != 0)
+		bits = sign | ((exponent + 112) << 23) | (mantissa << 13);
+
+	else if (mantissa == 0)
+		bits = sign;
+
+	else
+	{
+		for (exponent = 113; !(mantissa & 0x400); exponent--)
+			mantissa <<= 1;
+
+		bits = sign | (exponent << 23) | ((mantissa & 0x3FF) << 13);
+	}
+
+	float f;
+	memcpy(&f, &bits, sizeof(f));
+
+	return f;
+}
+
+
+static inline uint16_t floatToHalf(float f)
+{
+	uint32_t bits;
+	memcpy(&bits, &f, sizeof(bits));
+
+	uint32_t sign = (bits >> 16) & 0x8000, absbits = bits & 0x7FFFFFFF;
+
+	if (absbits >= 0x7F800000)
+		return (uint16_t)(sign | 0x7C00 | (absbits > 0x7F800000 ? 0x200 : 0));
+
+	if (absbits >= 0x477FF000)
+		return (uint16_t)(sign | 0x7C00);
+
+	if (absbits < 0x38800000)
+	{
+		if (absbits < 0x33000000)
+			return (uint16_t)sign;
+
+		uint32_t shift = 126 - (absbits >> 23), mantissa = (absbits & 0x7FFFFF) | 0x800000;
+		uint32_t result = mantissa >> shift, rem = mantissa & ((1U << shift) - 1), half = 1U << (shift - 1);
+
+		result += (rem > half) || (rem == half && (result & 1));
+		return (uint16_t)(sign | result);
+	}
+
+	absbits -= 0x38000000;
+	return (uint16_t)(sign | ((absbits + 0xFFF + ((absbits >> 13) & 1)) >> 13));
+}
+
+
+static inline float bfloat16ToFloat(uint16_t b)
+{
+	uint32_t bits = (uint32_t)b << 16;
+
+	float f;
+	memcpy(&f, &bits, sizeof(f));
+
+	return f;
+}
+
+
+static inline uint16_t floatToBFloat16(float f)
+{
+	uint32_t bits;
+	memcpy(&bits, &f, sizeof(bits));
+
+	if ((bits & 0x7FFFFFFF) > 0x7F800000)
+		return (uint16_t)((bits >> 16) | 0x40);
+
+	return (uint16_t)((bits + 0x7FFF + ((bits >> 16) & 1)) >> 16);
+}
+
+"""
+
+
+storageConverters = {
+	np.float16: ("halfToFloat", "floatToHalf"),
+	np.uint16: ("bfloat16ToFloat", "floatToBFloat16")
+}
+
+
+def fuseStorage(operation, names, load, store):
+	reads = re.compile(r"\b(%s)\[([^\[\]]+)\]" % "|".join(names))
+
+	match = re.match(r"^\s*(\w+)\[([^\[\]]+)\]\s*([-+*/]?)=(?!=)(.*?);?\s*$", operation, re.S)
+	if match is None or ";" in match.group(4):
+		raise NotImplementedError("Cannot fuse storage conversion into operation '%s'" % operation)
+
+	target, index, op, expr = match.groups()
+	expr = reads.sub(r"%s(\1[\2])" % load, expr)
+
+	if target not in names:
+		return "%s[%s] %s= %s" % (target, index, op, expr)
+
+	expr = "%s(%s[%s]) %s (%s)" % (load, target, index, op, expr) if len(op) > 0 else expr
+	return "%s[%s] = %s(%s)" % (target, index, store, expr)
+
+
 class ElementwiseKernel(Kernel):
 	eltwiseTmpl = Template("""
 
@@ -150,19 +273,30 @@ static void ${name}_strided($arguments, ptrdiff_t start, ptrdiff_t stop, ptrdiff
 """)
 
 
-	def __init__(self, arguments, operation, name, debug=False):
+	def __init__(self, arguments, operation, name, storage=np.float32, debug=False):
 		super().__init__(debug)
 
 		self.arguments, self.operation, self.name = arguments, operation, name
+		self.storage = storage
+
 		self.foundArray = False
 
 
 	def generateSource(self):
-		arguments = [(T.restrict if isinstance(T, PointerType) else T, name) for T, name in self.arguments]
+		arguments, operation, header = self.arguments, self.operation, ""
+
+		if self.storage != np.float32:
+			names = [name for T, name in arguments if T.aliasBase is float_t.ptr]
+			load, store = storageConverters[np.dtype(self.storage).type]
+
+			arguments = [(T.basedWith(uint16_t) if name in names else T, name) for T, name in arguments]
+			operation, header = fuseStorage(operation, names, load, store), storageTmpl
+
+		arguments = [(T.restrict if isinstance(T, PointerType) else T, name) for T, name in arguments]
 
-		source = self.eltwiseTmpl.substitute(
+		source = header + self.eltwiseTmpl.substitute(
 			arguments=", ".join(T.typegen(asDecl=True) % name for T, name in arguments),
-			operation=self.operation, name=self.name
+			operation=operation, name=self.name
 		)
 
 		functions = [
@@ -199,14 +333,15 @@ static void ${name}_strided($arguments, ptrdiff_t start, ptrdiff_t stop, ptrdiff
 
 
 	def __call__(self, *args, **kwargs):
-		if self.module is None:
-			source, functions = self.generateSource()
-			self.module = SourceModule(
-				source, functions, converter=self.paramConverter,finalizer=self.funcFinalizer, debug=self.debug
-			)
+		func = getattr(self.build().module, self.name)
+		func(*(self.unpackArg(arg) for arg in args))
+
+
+	def unpackArg(self, arg):
+		if not isinstance(arg, CPUArray):
+			return arg
 
-		func = getattr(self.module, self.name)
-		func(*(arg.data if isinstance(arg, CPUArray) else arg for arg in args))
+		return arg.data.view(np.uint16) if arg.dtype == np.float16 else arg.data
 
 
 class ReductionKernel(Kernel):
@@ -278,13 +413,7 @@ static $outtype reduction($arguments, ptrdiff_t size)
 
 
 	def __call__(self, *args, **kwargs):
-		if self.module is None:
-			source, functions = self.generateSource()
-			self.module = SourceModule(
-				source, functions, converter=self.paramConverter, finalizer=self.funcFinalizer, debug=self.debug
-			)
-
-		acc = self.module.reduction(*(arg.data if isinstance(arg, CPUArray) else arg for arg in args))
+		acc = self.build().module.reduction(*(arg.data if isinstance(arg, CPUArray) else arg for arg in args))
 
 		result = CPUArray.empty((), self.outtype)
 		result.fill(acc)
@@ -295,6 +424,7 @@ static $outtype reduction($arguments, ptrdiff_t size)
 def unittest():
 	moduleTest()
 	eltwiseTest()
+	halfEltwiseTest()
 	reductionTest()
 
 
@@ -338,6 +468,32 @@ def eltwiseTest():
 	assert np.allclose(hostOutData, outdata.get())
 
 
+def halfEltwiseTest():
+	hostInData = np.random.randn(1000).astype(np.float16)
+
+	indata = CPUArray.toDevice(hostInData)
+	outdata = CPUArray.empty(indata.shape, dtype=np.float16)
+
+	sigmoid = ElementwiseKernel(
+		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata"), (float_t, "a")],
+		"outdata[i] = a / (1.0f + expf(-indata[i]))",
+		"sigmoid", storage=np.float16
+	)
+
+	sigmoid(outdata, indata, 2.0)
+
+	hostOutData = (2.0 / (1.0 + np.exp(-hostInData.astype(np.float32)))).astype(np.float16)
+	assert np.allclose(hostOutData, outdata.get(), atol=1e-3)
+
+	accumulate = ElementwiseKernel(
+		[(float_t.ptr, "outdata"), (float_t.const.ptr, "indata")], "outdata[i] += indata[i]", "accumulate",
+		storage=np.float16
+	)
+
+	accumulate(outdata, indata)
+	assert np.allclose(hostOutData + hostInData, outdata.get(), atol=1e-2)
+
+
 def reductionTest():
 	data = CPUArray.toDevice(np.random.randn(10).astype(np.float32))
 
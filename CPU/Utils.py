@@ -1,7 +1,10 @@
-import platform, multiprocessing
+import os, platform, multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 from PuzzleLib import Config
+from PuzzleLib.Memoize import memoize
 from PuzzleLib.CPU.CPUArray import CPUArray
 
 
@@ -13,20 +16,26 @@ if multiprocessing.current_process().name == "MainProcess" or Config.allowMultiC
 	autoinit()
 
 
-def memoize(fn):
-	cache = {}
+threadPool = None
+
+
+def getThreadPool():
+	global threadPool
+
+	if threadPool is None:
+		threadPool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+	return threadPool
 
-	def memoizer(*args):
-		obj = cache.get(args, None)
-		if obj is not None:
-			return obj
 
-		obj = fn(*args)
-		cache[args] = obj
+def parallelRange(fn, length, *args):
+	nchunks = max(min(length, os.cpu_count() or 1), 1)
+	bounds = [length * i // nchunks for i in range(nchunks + 1)]
 
-		return obj
+	futures = [getThreadPool().submit(fn, *args, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
 
-	return memoizer
+	for future in futures:
+		future.result()
 
 
 def dtypesSupported():
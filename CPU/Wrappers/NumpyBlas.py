@@ -1,18 +1,28 @@
 import numpy as np
 
 from PuzzleLib.CPU.CPUArray import CPUArray
-from PuzzleLib.CPU.Kernels import ElementWise
+from PuzzleLib.CPU.Kernels import ElementWise, Half
 
 
 def sumOnMatrix(A, out=None, cols=True, alpha=1.0, beta=0.0):
 	assert A.ndim == 2
 	assert A.flags.c_contiguous
-	assert A.dtype == np.float32
+	assert A.dtype in (np.float32, np.float16, Half.bfloat16)
 
 	if out is None:
-		out = CPUArray.empty((A.shape[1], ) if cols else (A.shape[0], ), dtype=np.float32)
+		out = CPUArray.empty((A.shape[1], ) if cols else (A.shape[0], ), dtype=A.dtype)
 
-	if alpha == 1.0 and beta == 0.0:
+	if A.dtype == Half.bfloat16:
+		s = alpha * np.sum(Half.toFloat32(A).data, axis=0 if cols else 1)
+		s = s + beta * Half.toFloat32(out).data if beta != 0.0 else s
+
+		Half.fromFloat32(CPUArray(s.shape, s.dtype, data=s, acquire=True), dtype=Half.bfloat16, out=out)
+
+	elif A.dtype == np.float16:
+		s = np.sum(A.data, axis=0 if cols else 1, dtype=np.float32)
+		out.data[...] = alpha * s + beta * out.data.astype(np.float32) if beta != 0.0 else alpha * s
+
+	elif alpha == 1.0 and beta == 0.0:
 		np.sum(A.data, axis=0 if cols else 1, out=out.data)
 
 	else:
@@ -28,7 +38,7 @@ def toVectorAddVector(y, x, alpha=1.0):
 	assert y.flags.forc and x.flags.forc
 
 	assert x.dtype == y.dtype
-	assert x.dtype == np.float32
+	assert x.dtype in ElementWise.storageTypes
 
 	ElementWise.toVectorAddVectorKer(y.dtype)(y, x, alpha)
 
@@ -81,11 +91,109 @@ def mulMatrixOnMatrix(A, B, out=None, transpA=False, transpB=False, alpha=1.0, b
 		assert A.shape[1] == B.shape[0]
 		shape = (A.shape[0], B.shape[1])
 
+	if out is None:
+		out = CPUArray.empty(shape, dtype=A.dtype if A.dtype in Half.halfTypes else np.float32)
+
+	if not (A.dtype == B.dtype and B.dtype == out.dtype and out.dtype == np.float32):
+		return mulHalfMatrixOnMatrix(mulMatrixOnMatrix, A, B, out, transpA, transpB)
+
 	A = A.data.T if transpA else A.data
 	B = B.data.T if transpB else B.data
 
+	np.dot(A, B, out=out.data)
+	return out
+
+
+def mulHalfMatrixOnMatrix(gemm, A, B, out, transpA=False, transpB=False, panelsize=1 << 22):
+	assert all(T.dtype == np.float32 or T.dtype in Half.halfTypes for T in (A, B, out))
+	assert out.flags.c_contiguous
+
+	k = A.shape[0] if transpA else A.shape[1]
+	step = max(panelsize // max(out.shape), 1)
+
+	acc = out if out.dtype == np.float32 else CPUArray.empty(out.shape, dtype=np.float32)
+
+	for start in range(0, k, step):
+		panelA = widenPanel(A, start, start + step, rows=transpA)
+		panelB = widenPanel(B, start, start + step, rows=not transpB)
+
+		if start == 0:
+			gemm(panelA, panelB, out=acc, transpA=transpA, transpB=transpB)
+		else:
+			acc.data += gemm(panelA, panelB, transpA=transpA, transpB=transpB).data
+
+	if acc is not out:
+		Half.fromFloat32(acc, dtype=out.dtype, out=out)
+
+	return out
+
+
+def widenPanel(T, start, stop, rows):
+	if start == 0 and stop >= T.shape[0 if rows else 1]:
+		panel = T
+	else:
+		panel = T[start:stop] if rows else CPUArray.toDevice(T.data[:, start:stop])
+
+	return panel if panel.dtype == np.float32 else Half.toFloat32(panel)
+
+
+def mulInt8MatrixOnMatrix(A, B, out=None, transpB=False):
+	assert A.ndim == 2 and B.ndim == 2
+	assert A.dtype == B.dtype and A.dtype == np.int8
+
+	k = A.shape[1]
+	assert k == (B.shape[1] if transpB else B.shape[0])
+	assert k * 128 * 128 <= np.iinfo(np.int32).max
+
+	shape = (A.shape[0], B.shape[0] if transpB else B.shape[1])
+
 	if out is None:
-		out = CPUArray.empty(shape, dtype=np.float32)
+		out = CPUArray.empty(shape, dtype=np.int32)
 
-	np.dot(A, B, out=out.data)
+	A, B = A.data.astype(np.float64), B.data.astype(np.float64)
+
+	# int8 products summed in float64 stay exact integers, so blas reproduces the int32 accumulator bit-for-bit
+	out.data[...] = np.dot(A, B.T if transpB else B)
 	return out
+
+
+def unittest():
+	halfGemmTest()
+
+
+def halfGemmTest():
+	hostA = np.random.randn(37, 19).astype(np.float32)
+	hostB = np.random.randn(19, 11).astype(np.float32)
+
+	A16, B16 = hostA.astype(np.float16), hostB.astype(np.float16)
+	hostC = np.dot(A16.astype(np.float32), B16.astype(np.float32))
+
+	C = mulMatrixOnMatrix(CPUArray.toDevice(A16), CPUArray.toDevice(B16))
+	assert C.dtype == np.float16 and np.allclose(hostC, C.get(), atol=1e-2)
+
+	for transpA, transpB in [(False, False), (True, False), (False, True)]:
+		A = CPUArray.toDevice(np.ascontiguousarray(A16.T) if transpA else A16)
+		B = CPUArray.toDevice(np.ascontiguousarray(B16.T) if transpB else B16)
+
+		out = CPUArray.empty(hostC.shape, dtype=np.float16)
+		mulHalfMatrixOnMatrix(mulMatrixOnMatrix, A, B, out, transpA, transpB, panelsize=3 * 37)
+
+		assert np.allclose(hostC, out.get(), atol=1e-2)
+
+	C = mulMatrixOnMatrix(CPUArray.toDevice(A16), CPUArray.toDevice(np.ascontiguousarray(B16.T)), transpB=True)
+	assert np.allclose(hostC, C.get(), atol=1e-2)
+
+	C = mulMatrixOnMatrix(CPUArray.toDevice(np.ascontiguousarray(A16.T)), CPUArray.toDevice(B16), transpA=True)
+	assert np.allclose(hostC, C.get(), atol=1e-2)
+
+	B = Half.fromFloat32(CPUArray.toDevice(hostB), dtype=np.uint16)
+	out = CPUArray.empty(hostC.shape, dtype=np.float32)
+
+	C = mulMatrixOnMatrix(CPUArray.toDevice(hostA), B, out=out)
+	hostB = Half.toFloat32(B).get()
+
+	assert C.dtype == np.float32 and np.allclose(np.dot(hostA, hostB), C.get(), atol=1e-4)
+
+
+if __name__ == "__main__":
+	unittest()
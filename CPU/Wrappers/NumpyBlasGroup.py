@@ -0,0 +1,238 @@
+import numpy as np
+
+from PuzzleLib.CPU.CPUArray import CPUArray
+
+
+def toGroupMajor(tensor, formatT):
+	if formatT == "bgp":
+		return tensor.transpose(1, 0, 2)
+	elif formatT == "gbp":
+		return tensor
+	else:
+		raise ValueError("Unsupported tensor format")
+
+
+def fromGroupMajor(shape, formatT):
+	if formatT == "bgp":
+		return shape[1], shape[0], shape[2]
+	elif formatT == "gbp":
+		return shape
+	else:
+		raise ValueError("Unsupported out tensor format")
+
+
+def storeResult(result, out, alpha, beta):
+	if beta == 0.0:
+		np.multiply(result, alpha, out=out) if alpha != 1.0 else np.copyto(out, result)
+
+	else:
+		out *= beta
+		out += alpha * result
+
+
+def sumOnTensorGroup(tensor, out=None, formatT="bgp", cols=True, alpha=1.0, beta=0.0):
+	assert tensor.ndim == 3
+	assert tensor.dtype == np.float32
+
+	if formatT == "bgp":
+		axis = 0 if cols else 2
+	elif formatT == "gbp":
+		axis = 1 if cols else 2
+	else:
+		raise ValueError("Unsupported tensor format")
+
+	shape = tensor.shape[:axis] + tensor.shape[axis + 1:]
+
+	if out is None:
+		out, beta = CPUArray.empty(shape, dtype=np.float32), 0.0
+	else:
+		assert out.shape == shape
+
+	storeResult(np.sum(tensor.data, axis=axis), out.data, alpha, beta)
+	return out
+
+
+def mulTensorOnVecGroup(tensor, vecs, out=None, formatT="bgp", transpT=False, alpha=1.0, beta=0.0):
+	assert tensor.ndim == 3 and vecs.ndim == 2
+	assert tensor.dtype == np.float32 and vecs.dtype == np.float32
+
+	mats = toGroupMajor(tensor.data, formatT)
+	mats = mats.transpose(0, 2, 1) if transpT else mats
+
+	assert mats.shape[0] == vecs.shape[0] or vecs.shape[0] == 1
+	assert mats.shape[2] == vecs.shape[1]
+
+	shape = mats.shape[:2]
+
+	if out is None:
+		out, beta = CPUArray.empty(shape, dtype=np.float32), 0.0
+	else:
+		assert out.shape == shape
+
+	storeResult(np.matmul(mats, vecs.data[:, :, np.newaxis])[:, :, 0], out.data, alpha, beta)
+	return out
+
+
+def mulTensorBatch(A, B, formatA="bgp", formatB="bgp", out=None, formatOut="bgp", transpA=False, transpB=False,
+				   alpha=1.0, beta=0.0):
+	assert not (transpA and transpB)
+
+	assert A.ndim == 3 and B.ndim == 3
+	assert A.dtype == B.dtype and B.dtype == np.float32
+
+	mats = toGroupMajor(A.data, formatA)
+	mats = mats.transpose(0, 2, 1) if transpA else mats
+
+	others = toGroupMajor(B.data, formatB)
+	others = others.transpose(0, 2, 1) if transpB else others
+
+	assert mats.shape[0] == others.shape[0] or mats.shape[0] == 1 or others.shape[0] == 1
+	assert mats.shape[2] == others.shape[1]
+
+	shape = (max(mats.shape[0], others.shape[0]), mats.shape[1], others.shape[2])
+
+	if out is None:
+		out, beta = CPUArray.empty(fromGroupMajor(shape, formatOut), dtype=np.float32), 0.0
+	else:
+		assert out.shape == fromGroupMajor(shape, formatOut)
+
+	outdata = toGroupMajor(out.data, formatOut)
+
+	if beta == 0.0 and alpha == 1.0:
+		np.matmul(mats, others, out=outdata)
+	else:
+		storeResult(np.matmul(mats, others), outdata, alpha, beta)
+
+	return out
+
+
+def unittest():
+	vecTest()
+	sumTest()
+	batchTest()
+	oneGroupTest()
+	accumulateTest()
+
+
+def vecTest():
+	groups = 5
+
+	for formatT, shape in (("bgp", (7, groups, 4)), ("gbp", (groups, 6, 4))):
+		hostTensor = np.random.randn(*shape).astype(np.float32)
+		hostMats = hostTensor.transpose(1, 0, 2) if formatT == "bgp" else hostTensor
+
+		tensor = CPUArray.toDevice(hostTensor)
+		x = CPUArray.toDevice(np.random.randn(groups, hostMats.shape[2]).astype(np.float32))
+		y = CPUArray.toDevice(np.random.randn(groups, hostMats.shape[1]).astype(np.float32))
+
+		out = mulTensorOnVecGroup(tensor, x, formatT=formatT)
+
+		hostOut = np.empty(out.shape, dtype=np.float32)
+		for i in range(groups):
+			hostOut[i] = np.dot(hostMats[i], x.get()[i])
+
+		assert np.allclose(hostOut, out.get())
+
+		out = mulTensorOnVecGroup(tensor, y, formatT=formatT, transpT=True)
+
+		hostOut = np.empty(out.shape, dtype=np.float32)
+		for i in range(groups):
+			hostOut[i] = np.dot(hostMats[i].T, y.get()[i])
+
+		assert np.allclose(hostOut, out.get())
+
+
+def sumTest():
+	hostTensor = np.random.randn(4, 3, 5).astype(np.float32)
+	tensor = CPUArray.toDevice(hostTensor)
+
+	assert np.allclose(sumOnTensorGroup(tensor, formatT="bgp").get(), hostTensor.sum(axis=0), atol=1e-5)
+	assert np.allclose(sumOnTensorGroup(tensor, formatT="bgp", cols=False).get(), hostTensor.sum(axis=2), atol=1e-5)
+	assert np.allclose(sumOnTensorGroup(tensor, formatT="gbp").get(), hostTensor.sum(axis=1), atol=1e-5)
+
+
+def batchTest():
+	groups = 3
+
+	for formatA in ("bgp", "gbp"):
+		for formatB in ("bgp", "gbp"):
+			for formatOut in ("bgp", "gbp"):
+				for transpA, transpB in ((False, False), (True, False), (False, True)):
+					m, k, n = 4, 7, 5
+
+					hostA = np.random.randn(groups, *((k, m) if transpA else (m, k))).astype(np.float32)
+					hostB = np.random.randn(groups, *((n, k) if transpB else (k, n))).astype(np.float32)
+
+					A = CPUArray.toDevice(np.ascontiguousarray(toGroupMajor(hostA, formatA)))
+					B = CPUArray.toDevice(np.ascontiguousarray(toGroupMajor(hostB, formatB)))
+
+					out = mulTensorBatch(
+						A, B, formatA=formatA, formatB=formatB, formatOut=formatOut, transpA=transpA, transpB=transpB
+					)
+
+					hostOut = np.empty((groups, m, n), dtype=np.float32)
+					for i in range(groups):
+						hostOut[i] = np.dot(hostA[i].T if transpA else hostA[i], hostB[i].T if transpB else hostB[i])
+
+					assert np.allclose(toGroupMajor(hostOut, formatOut), out.get(), atol=1e-5)
+
+
+def oneGroupTest():
+	groups, batchsize, insize, outsize = 4, 6, 5, 3
+
+	hostData = np.random.randn(batchsize, 1, insize).astype(np.float32)
+	hostW = np.random.randn(groups, insize, outsize).astype(np.float32)
+
+	out = mulTensorBatch(CPUArray.toDevice(hostData), CPUArray.toDevice(hostW), formatA="bgp", formatB="gbp")
+
+	hostOut = np.empty((batchsize, groups, outsize), dtype=np.float32)
+	for i in range(groups):
+		hostOut[:, i, :] = np.dot(hostData[:, 0, :], hostW[i])
+
+	assert np.allclose(hostOut, out.get(), atol=1e-5)
+
+
+def accumulateTest():
+	groups, m, k, n = 3, 4, 5, 6
+	alpha, beta = 0.5, 2.0
+
+	hostA = np.random.randn(groups, m, k).astype(np.float32)
+	hostB = np.random.randn(groups, k, n).astype(np.float32)
+	hostOut = np.random.randn(m, groups, n).astype(np.float32)
+
+	out = CPUArray.toDevice(hostOut)
+	mulTensorBatch(
+		CPUArray.toDevice(hostA), CPUArray.toDevice(hostB), formatA="gbp", formatB="gbp", out=out,
+		alpha=alpha, beta=beta
+	)
+
+	hostOut = beta * hostOut + alpha * np.matmul(hostA, hostB).transpose(1, 0, 2)
+	assert np.allclose(hostOut, out.get(), atol=1e-5)
+
+
+def loopMulTensorBatch(A, B, out):
+	for i in range(A.shape[1]):
+		out[:, i, :] = np.dot(A[:, i, :], B[i])
+
+
+def benchmark():
+	from PuzzleLib.CPU.Benchmarks.Utils import timeKernel
+
+	groups, batchsize, insize, outsize = 256, 32, 32, 32
+
+	A = CPUArray.toDevice(np.random.randn(batchsize, groups, insize).astype(np.float32))
+	B = CPUArray.toDevice(np.random.randn(groups, insize, outsize).astype(np.float32))
+	out = CPUArray.empty((batchsize, groups, outsize), dtype=np.float32)
+
+	hostOut = np.empty(out.shape, dtype=np.float32)
+
+	timeKernel(mulTensorBatch, args=(A, B, "bgp", "gbp", out), looplength=100, logname="batched matmul", normalize=True)
+	timeKernel(
+		loopMulTensorBatch, args=(A.get(), B.get(), hostOut), looplength=100, logname="loop over groups", normalize=True
+	)
+
+	assert np.allclose(hostOut, out.get(), atol=1e-4)
+
+
+if __name__ == "__main__":
+	unittest()
@@ -2,11 +2,13 @@ from enum import Enum
 import numpy as np
 
 from PuzzleLib.CPU.CPUArray import CPUArray
+from PuzzleLib.CPU.Wrappers import NumpyBlas
 
 
 class PoolMode(Enum):
 	max = 0
 	avgWithPad = 1
+	avgNoPad = 2
 
 
 def repeatValue(val, ntimes):
@@ -75,6 +77,16 @@ def linear(data, W, bias):
 	return outdata
 
 
+def halfLinear(data, W, bias):
+	data = CPUArray(data.shape, data.dtype, data=np.ascontiguousarray(data), acquire=True)
+	outdata = NumpyBlas.mulMatrixOnMatrix(data, W, transpB=True).data
+
+	if bias is not None:
+		outdata += bias
+
+	return outdata
+
+
 def conv2d(data, W, bias=None, stride=1, pad=0):
 	assert data.ndim == 4 and W.ndim == 4
 
@@ -85,18 +97,25 @@ def conv2d(data, W, bias=None, stride=1, pad=0):
 	outh, outw = outshape((inh, inw), (hsize, wsize), stride, pad)
 
 	coldata = im2col(data.data, W.shape[2:], stride, pad)
-	W = W.data.reshape(W.shape[0], -1).T
-
 	bias = bias.data.reshape(1, bias.shape[1]) if bias is not None else None
-	outdata = linear(coldata, W, bias)
+
+	if data.dtype == W.dtype and W.dtype == np.float32:
+		outdata = linear(coldata, W.data.reshape(W.shape[0], -1).T, bias)
+	else:
+		outdata = halfLinear(coldata, W.reshape(W.shape[0], -1), bias)
 
 	outdata = col2im(outdata, outmaps, (outh, outw))
 	return CPUArray(outdata.shape, outdata.dtype, data=outdata, acquire=True)
 
 
+def windowCounts(inshape, size, stride, pad):
+	ones = np.ones((1, 1) + tuple(inshape), dtype=np.float32)
+	return np.sum(im2col(ones, size, stride, pad), axis=1).reshape(outshape(inshape, size, stride, pad))
+
+
 def pool2d(data, size=2, stride=2, pad=0, mode=PoolMode.max):
 	assert data.ndim == 4
-	onRow = np.max if mode == PoolMode.max else np.mean
+	onRow = {PoolMode.max: np.max, PoolMode.avgWithPad: np.mean, PoolMode.avgNoPad: np.sum}[mode]
 
 	batchsize, maps, inh, inw = data.shape
 	size, stride, pad = repeatValue(size, 2), repeatValue(stride, 2), repeatValue(pad, 2)
@@ -106,9 +125,153 @@ def pool2d(data, size=2, stride=2, pad=0, mode=PoolMode.max):
 	coldata = im2col(data.data.reshape(batchsize * maps, 1, inh, inw), size, stride, pad)
 	outdata = onRow(coldata, axis=1, keepdims=True).reshape((batchsize, maps, outh, outw))
 
+	if mode == PoolMode.avgNoPad:
+		outdata /= windowCounts((inh, inw), size, stride, pad)
+
+	return CPUArray(outdata.shape, outdata.dtype, data=outdata, acquire=True)
+
+
+def pool2dBackward(indata, outdata, grad, size=2, stride=2, pad=0, mode=PoolMode.max):
+	assert indata.ndim == 4 and grad.shape == outdata.shape
+
+	batchsize, maps, inh, inw = indata.shape
+	_, _, outh, outw = grad.shape
+
+	(hsize, wsize), (hstride, wstride), (hpad, wpad) = repeatValue(size, 2), repeatValue(stride, 2), repeatValue(pad, 2)
+	hostGrad = grad.data
+
+	ingrad = np.zeros((batchsize, maps, inh + 2 * hpad, inw + 2 * wpad), dtype=hostGrad.dtype)
+	def window(arr, dy, dx):
+		return arr[:, :, dy:dy + hstride * (outh - 1) + 1:hstride, dx:dx + wstride * (outw - 1) + 1:wstride]
+
+	if mode == PoolMode.max:
+		padded = np.pad(indata.data, ((0, 0), (0, 0), (hpad, hpad), (wpad, wpad)), mode="constant")
+		found = np.zeros(grad.shape, dtype=np.bool_)
+
+		for dy in range(hsize):
+			for dx in range(wsize):
+				mask = (window(padded, dy, dx) == outdata.data) & ~found
+				window(ingrad, dy, dx)[...] += hostGrad * mask
+
+				found |= mask
+
+	else:
+		counts = hsize * wsize if mode == PoolMode.avgWithPad else windowCounts(
+			(inh, inw), (hsize, wsize), (hstride, wstride), (hpad, wpad)
+		)
+		hostGrad = hostGrad / counts
+
+		for dy in range(hsize):
+			for dx in range(wsize):
+				window(ingrad, dy, dx)[...] += hostGrad
+
+	ingrad = np.ascontiguousarray(ingrad[:, :, hpad:hpad + inh, wpad:wpad + inw])
+	return CPUArray(ingrad.shape, ingrad.dtype, data=ingrad, acquire=True)
+
+
+def windowSum(data, axis, before, after):
+	length = data.shape[axis]
+
+	shape = list(data.shape)
+	shape[axis] = 1
+
+	cumsum = np.cumsum(data, axis=axis, dtype=np.float64)
+	cumsum = np.concatenate((np.zeros(shape, dtype=np.float64), cumsum), axis=axis)
+	idx = np.arange(length)
+
+	hi = np.take(cumsum, np.minimum(idx + after + 1, length), axis=axis)
+	lo = np.take(cumsum, np.maximum(idx - before, 0), axis=axis)
+
+	return hi - lo
+
+
+def lrnWindow(N):
+	lookBehind = (N - 1) // 2
+	return lookBehind, N - lookBehind - 1
+
+
+def boxSum(data, N, transpose=False):
+	before, after = lrnWindow(N)
+	before, after = (after, before) if transpose else (before, after)
+
+	return windowSum(windowSum(data, 2, before, after), 3, before, after)
+
+
+def mapLRNNorms(data, means, N, alpha, K):
+	if means is None:
+		sqsum = boxSum(data**2, N)
+
+	else:
+		count = boxSum(np.ones((1, 1) + data.shape[2:], dtype=data.dtype), N)
+		sqsum = boxSum(data**2, N) - 2.0 * means * boxSum(data, N) + count * means**2
+
+	return K + alpha / N**2 * sqsum
+
+
+def mapLRN(data, means=None, N=5, alpha=1e-4, beta=0.75, K=2.0):
+	assert data.ndim == 4
+	hostData, hostMeans = data.data, None if means is None else means.data
+
+	norms = mapLRNNorms(hostData, hostMeans, N, alpha, K)
+	outdata = (hostData / norms**beta).astype(hostData.dtype)
+
 	return CPUArray(outdata.shape, outdata.dtype, data=outdata, acquire=True)
 
 
+def mapLRNBackward(data, grad, means=None, N=5, alpha=1e-4, beta=0.75, K=2.0):
+	assert data.ndim == 4 and grad.shape == data.shape
+	hostData, hostGrad, hostMeans = data.data, grad.data, None if means is None else means.data
+
+	norms = mapLRNNorms(hostData, hostMeans, N, alpha, K)
+	k = 2.0 * alpha * beta / N**2
+
+	scaled = hostGrad * hostData / norms**(beta + 1)
+
+	if hostMeans is None:
+		ingrad = hostGrad / norms**beta - k * hostData * boxSum(scaled, N, transpose=True)
+	else:
+		ingrad = hostGrad / norms**beta - k * (
+			hostData * boxSum(scaled, N, transpose=True) - boxSum(scaled * hostMeans, N, transpose=True)
+		)
+
+	ingrad = ingrad.astype(hostData.dtype)
+	ingrad = CPUArray(ingrad.shape, ingrad.dtype, data=ingrad, acquire=True)
+
+	if hostMeans is None:
+		return ingrad
+
+	count = boxSum(np.ones((1, 1) + hostData.shape[2:], dtype=hostData.dtype), N)
+	meansGrad = (k * scaled * (boxSum(hostData, N) - count * hostMeans)).astype(hostData.dtype)
+
+	return ingrad, CPUArray(meansGrad.shape, meansGrad.dtype, data=meansGrad, acquire=True)
+
+
+def crossMapLRNNorms(data, N, alpha, K):
+	before, after = lrnWindow(N)
+	return K + alpha / N * windowSum(data**2, 1, before, after)
+
+
+def crossMapLRN(data, N=5, alpha=1e-4, beta=0.75, K=2.0):
+	assert data.ndim == 4
+	hostData = data.data
+
+	outdata = (hostData / crossMapLRNNorms(hostData, N, alpha, K)**beta).astype(hostData.dtype)
+	return CPUArray(outdata.shape, outdata.dtype, data=outdata, acquire=True)
+
+
+def crossMapLRNBackward(data, grad, N=5, alpha=1e-4, beta=0.75, K=2.0):
+	assert data.ndim == 4 and grad.shape == data.shape
+	hostData, hostGrad = data.data, grad.data
+
+	norms = crossMapLRNNorms(hostData, N, alpha, K)
+	before, after = lrnWindow(N)
+
+	scaled = windowSum(hostGrad * hostData / norms**(beta + 1), 1, after, before)
+	ingrad = (hostGrad / norms**beta - 2.0 * alpha * beta / N * hostData * scaled).astype(hostData.dtype)
+
+	return CPUArray(ingrad.shape, ingrad.dtype, data=ingrad, acquire=True)
+
+
 def batchNorm2d(data, scale, bias, mean, var, epsilon=1e-5, test=False, out=None):
 	assert data.ndim == scale.ndim and scale.ndim == bias.ndim and bias.ndim == mean.ndim and mean.ndim == var.ndim
 	assert test
@@ -121,8 +284,12 @@ def batchNorm2d(data, scale, bias, mean, var, epsilon=1e-5, test=False, out=None
 
 def unittest():
 	conv2dTest()
+	halfConv2dTest()
 	maxpool2dTest()
+	pool2dBackwardTest()
 	batchNorm2dTest()
+	mapLRNTest()
+	crossMapLRNTest()
 
 
 def conv2dTest():
@@ -154,6 +321,27 @@ def conv2dTest():
 	assert np.allclose(hostOutData, outdata.get())
 
 
+def halfConv2dTest():
+	batchsize, inmaps, h, w = 4, 3, 9, 7
+	fsize, outmaps = 3, 5
+
+	hostData = np.random.randn(batchsize, inmaps, h, w).astype(np.float16)
+	hostW = np.random.randn(outmaps, inmaps, fsize, fsize).astype(np.float16)
+	hostBias = np.random.randn(1, outmaps, 1, 1).astype(np.float16)
+
+	outdata = conv2d(
+		CPUArray.toDevice(hostData), CPUArray.toDevice(hostW), CPUArray.toDevice(hostBias), stride=2, pad=1
+	)
+	assert outdata.dtype == np.float16
+
+	hostOutData = conv2d(
+		CPUArray.toDevice(hostData.astype(np.float32)), CPUArray.toDevice(hostW.astype(np.float32)),
+		CPUArray.toDevice(hostBias.astype(np.float32)), stride=2, pad=1
+	).get()
+
+	assert np.allclose(hostOutData, outdata.get(), atol=1e-2, rtol=1e-3)
+
+
 def maxpool2dTest():
 	batchsize, maps, h, w = 1, 1, 8, 8
 	data = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
@@ -182,6 +370,43 @@ def maxpool2dTest():
 	assert np.allclose(hostOutData, outdata.get())
 
 
+def pool2dBackwardTest():
+	batchsize, maps, h, w = 2, 3, 7, 6
+	size, stride, pad = 3, 2, 1
+
+	data = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+	hostData = np.pad(data.get(), ((0, 0), (0, 0), (pad, pad), (pad, pad)), mode="constant")
+	hostMask = np.pad(np.ones((h, w), dtype=np.float32), pad, mode="constant")
+
+	for mode in PoolMode:
+		outdata = pool2d(data, size, stride, pad, mode)
+		grad = CPUArray.toDevice(np.random.randn(*outdata.shape).astype(np.float32))
+
+		ingrad = pool2dBackward(data, outdata, grad, size, stride, pad, mode)
+		hostInGrad = np.zeros(hostData.shape, dtype=np.float32)
+
+		for b in range(batchsize):
+			for c in range(maps):
+				for y in range(outdata.shape[2]):
+					for x in range(outdata.shape[3]):
+						window = hostData[b, c, y * stride:y * stride + size, x * stride:x * stride + size]
+
+						if mode == PoolMode.max:
+							dy, dx = np.unravel_index(np.argmax(window), window.shape)
+							hostInGrad[b, c, y * stride + dy, x * stride + dx] += grad.get()[b, c, y, x]
+
+						else:
+							count = size**2 if mode == PoolMode.avgWithPad else np.sum(
+								hostMask[y * stride:y * stride + size, x * stride:x * stride + size]
+							)
+
+							assert np.isclose(np.sum(window) / count, outdata.get()[b, c, y, x], atol=1e-6)
+							hostInGrad[b, c, y * stride:y * stride + size, x * stride:x * stride + size] += \
+								grad.get()[b, c, y, x] / count
+
+		assert np.allclose(hostInGrad[:, :, pad:-pad, pad:-pad], ingrad.get(), atol=1e-6)
+
+
 def batchNorm2dTest():
 	batchsize, maps, h, w = 4, 5, 3, 2
 
@@ -208,5 +433,93 @@ def batchNorm2dTest():
 	assert np.allclose(hostOutData, outdata.get())
 
 
+def mapLRNTest():
+	batchsize, maps, h, w = 2, 2, 7, 6
+	N, alpha, beta, K = 3, 1e-1, 0.75, 2.0
+
+	data = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+	means = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+	grad = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+
+	hostData, hostMeans, hostGrad = data.get(), means.get(), grad.get()
+	lookBehind, lookAhead = (N - 1) // 2, N - (N - 1) // 2
+
+	def window(y, x):
+		for dy in range(max(0, y - lookBehind), min(h, y + lookAhead)):
+			for dx in range(max(0, x - lookBehind), min(w, x + lookAhead)):
+				yield dy, dx
+
+	for withMeans in (False, True):
+		hostMeanData = hostMeans if withMeans else np.zeros(data.shape, dtype=np.float32)
+		norms = np.empty(data.shape, dtype=np.float32)
+
+		for b in range(batchsize):
+			for c in range(maps):
+				for y in range(h):
+					for x in range(w):
+						norms[b, c, y, x] = K + alpha / N**2 * sum(
+							(hostData[b, c, dy, dx] - hostMeanData[b, c, y, x])**2 for dy, dx in window(y, x)
+						)
+
+		outdata = mapLRN(data, means if withMeans else None, N, alpha, beta, K)
+		assert np.allclose(hostData / norms**beta, outdata.get(), atol=1e-5)
+
+		result = mapLRNBackward(data, grad, means if withMeans else None, N, alpha, beta, K)
+		ingrad, meansGrad = result if withMeans else (result, None)
+
+		hostInGrad = hostGrad / norms**beta
+		hostMeansGrad = np.zeros(data.shape, dtype=np.float32)
+		k = 2.0 * alpha * beta / N**2
+
+		for b in range(batchsize):
+			for c in range(maps):
+				for y in range(h):
+					for x in range(w):
+						for dy, dx in window(y, x):
+							hostInGrad[b, c, y, x] -= k * hostGrad[b, c, dy, dx] * (
+								hostData[b, c, y, x] - hostMeanData[b, c, dy, dx]
+							) * hostData[b, c, dy, dx] / norms[b, c, dy, dx]**(beta + 1)
+
+							hostMeansGrad[b, c, y, x] += k * hostGrad[b, c, y, x] * hostData[b, c, y, x] * (
+								hostData[b, c, dy, dx] - hostMeanData[b, c, y, x]
+							) / norms[b, c, y, x]**(beta + 1)
+
+		assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+
+		if withMeans:
+			assert np.allclose(hostMeansGrad, meansGrad.get(), atol=1e-5)
+
+
+def crossMapLRNTest():
+	batchsize, maps, h, w = 2, 10, 3, 2
+	alpha, beta, K = 1e-1, 0.75, 2.0
+
+	data = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+	grad = CPUArray.toDevice(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+
+	hostData, hostGrad = data.get(), grad.get()
+
+	for N in (4, 5):
+		lookBehind, lookAhead = (N - 1) // 2, N - (N - 1) // 2
+		norms = np.empty(data.shape, dtype=np.float32)
+
+		for c in range(maps):
+			window = slice(max(0, c - lookBehind), min(maps, c + lookAhead))
+			norms[:, c] = K + alpha / N * np.sum(hostData[:, window]**2, axis=1)
+
+		outdata = crossMapLRN(data, N, alpha, beta, K)
+		assert np.allclose(hostData / norms**beta, outdata.get(), atol=1e-5)
+
+		ingrad = crossMapLRNBackward(data, grad, N, alpha, beta, K)
+		hostInGrad = hostGrad / norms**beta
+
+		for c in range(maps):
+			window = slice(max(0, c - lookBehind), min(maps, c + lookAhead))
+			hostInGrad[:, window] -= 2.0 * alpha * beta / N * hostGrad[:, c:c + 1] * hostData[:, c:c + 1] * \
+									 hostData[:, window] / norms[:, c:c + 1]**(beta + 1)
+
+		assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+
+
 if __name__ == "__main__":
 	unittest()
@@ -0,0 +1,197 @@
+import numpy as np
+
+from PuzzleLib.CPU.CPUArray import CPUArray
+
+
+def baseGrid(outh, outw, dtype):
+	base = np.empty((outh, outw, 3), dtype=dtype)
+
+	base[..., 0] = np.linspace(-1.0, 1.0, outw, dtype=dtype)[np.newaxis, :]
+	base[..., 1] = np.linspace(-1.0, 1.0, outh, dtype=dtype)[:, np.newaxis]
+	base[..., 2] = 1.0
+
+	return base
+
+
+def sampleCorners(grid, inh, inw):
+	nx, ny = (grid[..., 0] + 1.0) * ((inw - 1) / 2.0), (grid[..., 1] + 1.0) * ((inh - 1) / 2.0)
+	srcx, srcy = np.floor(nx), np.floor(ny)
+
+	dx, dy = (nx - srcx).reshape(grid.shape[0], -1), (ny - srcy).reshape(grid.shape[0], -1)
+	srcx, srcy = srcx.astype(np.int64).reshape(grid.shape[0], -1), srcy.astype(np.int64).reshape(grid.shape[0], -1)
+
+	corners = []
+	for offy, offx in ((0, 0), (1, 0), (0, 1), (1, 1)):
+		y, x = srcy + offy, srcx + offx
+		mask = (y >= 0) & (y < inh) & (x >= 0) & (x < inw)
+
+		corners.append((np.where(mask, y * inw + x, 0), mask))
+
+	return corners, dx, dy
+
+
+def gatherCorners(data, corners):
+	batchsize, maps = data.shape[:2]
+	flatdata = data.reshape(batchsize, maps, -1)
+
+	return [
+		np.take_along_axis(flatdata, idx[:, np.newaxis, :], axis=2) * mask[:, np.newaxis, :]
+		for idx, mask in corners
+	]
+
+
+def cornerWeights(dx, dy):
+	return (1.0 - dy) * (1.0 - dx), dy * (1.0 - dx), (1.0 - dy) * dx, dy * dx
+
+
+def spatialTf(data, transform, outshape=None, getGrid=False):
+	assert data.ndim == 4 and transform.shape == (data.shape[0], 2, 3)
+
+	batchsize, maps, inh, inw = data.shape
+
+	if outshape is None:
+		outshape = data.shape
+	elif len(outshape) == 3:
+		outshape = (batchsize, ) + tuple(outshape)
+
+	assert outshape[:2] == data.shape[:2]
+	outh, outw = outshape[2:]
+
+	hostData, hostTf = data.get(copy=False), transform.get(copy=False)
+
+	grid = np.einsum("hwk,bik->bhwi", baseGrid(outh, outw, hostData.dtype), hostTf).astype(hostData.dtype)
+	corners, dx, dy = sampleCorners(grid, inh, inw)
+
+	values = gatherCorners(hostData, corners)
+	weights = cornerWeights(dx, dy)
+
+	outdata = sum(value * weight[:, np.newaxis, :] for value, weight in zip(values, weights))
+	outdata = CPUArray.toDevice(outdata.reshape(outshape).astype(hostData.dtype, copy=False))
+
+	return (outdata, CPUArray.toDevice(grid)) if getGrid else outdata
+
+
+def spatialTfBackward(grad, data, grid, getDGrid=False):
+	assert grad.ndim == 4 and data.ndim == 4 and grid.shape == (grad.shape[0], grad.shape[2], grad.shape[3], 2)
+
+	batchsize, maps, inh, inw = data.shape
+	outh, outw = grad.shape[2:]
+
+	hostGrad, hostData, hostGrid = grad.get(copy=False), data.get(copy=False), grid.get(copy=False)
+	hostGrad = hostGrad.reshape(batchsize, maps, -1)
+
+	corners, dx, dy = sampleCorners(hostGrid, inh, inw)
+	weights = cornerWeights(dx, dy)
+
+	offsets = (np.arange(batchsize * maps, dtype=np.int64) * (inh * inw)).reshape(batchsize, maps, 1)
+
+	indices = np.concatenate([(offsets + idx[:, np.newaxis, :]).ravel() for idx, _ in corners])
+	contribs = np.concatenate([
+		(hostGrad * (weight * mask)[:, np.newaxis, :]).ravel() for (_, mask), weight in zip(corners, weights)
+	])
+
+	ingrad = np.bincount(indices, weights=contribs, minlength=batchsize * maps * inh * inw)
+	ingrad = ingrad.reshape(data.shape).astype(hostData.dtype)
+
+	ul, bl, ur, br = (np.sum(hostGrad * value, axis=1) for value in gatherCorners(hostData, corners))
+
+	dgrid = np.empty(hostGrid.shape, dtype=hostData.dtype)
+	dgrid[..., 0] = ((ur - ul) * (1.0 - dy) + (br - bl) * dy).reshape(batchsize, outh, outw) * ((inw - 1) / 2.0)
+	dgrid[..., 1] = ((bl - ul) * (1.0 - dx) + (br - ur) * dx).reshape(batchsize, outh, outw) * ((inh - 1) / 2.0)
+
+	dtransform = np.einsum("bhwi,hwk->bik", dgrid, baseGrid(outh, outw, hostData.dtype)).astype(hostData.dtype)
+	ingrad, dtransform = CPUArray.toDevice(ingrad), CPUArray.toDevice(dtransform)
+
+	return (ingrad, dtransform, CPUArray.toDevice(dgrid)) if getDGrid else (ingrad, dtransform)
+
+
+def unittest():
+	spatialTfTest()
+	outshapeTest()
+
+
+def spatialTfTest():
+	import itertools, math
+
+	batchsize, maps, inh, inw = 2, 3, 5, 4
+	outh, outw = 4, 6
+
+	hostData = np.random.randn(batchsize, maps, inh, inw).astype(np.float32)
+	hostTf = np.array([
+		[[1.0, 0.1, -0.001], [0.0, 0.9, -0.001]],
+		[[0.8, -0.2, 0.1], [0.3, 1.1, -0.2]]
+	], dtype=np.float32)
+
+	data, transform = CPUArray.toDevice(hostData), CPUArray.toDevice(hostTf)
+	outdata, grid = spatialTf(data, transform, outshape=(batchsize, maps, outh, outw), getGrid=True)
+
+	hostGrid = np.empty((batchsize, outh, outw, 2), dtype=np.float32)
+	xstep, ystep = 2.0 / (outw - 1), 2.0 / (outh - 1)
+
+	for b, y, x in itertools.product(range(batchsize), range(outh), range(outw)):
+		hostGrid[b, y, x] = np.dot(hostTf[b], np.array([-1.0 + x * xstep, -1.0 + y * ystep, 1.0], dtype=np.float32))
+
+	assert np.allclose(hostGrid, grid.get(), atol=1e-5)
+
+	def corners(b, y, x):
+		dstx, dsty = hostGrid[b, y, x]
+		ny, nx = (dsty + 1.0) / (2.0 / (inh - 1)), (dstx + 1.0) / (2.0 / (inw - 1))
+
+		srcy, srcx = int(math.floor(ny)), int(math.floor(nx))
+		dy, dx = ny - srcy, nx - srcx
+
+		for offy, offx, wy, wx in ((0, 0, 1 - dy, 1 - dx), (1, 0, dy, 1 - dx), (0, 1, 1 - dy, dx), (1, 1, dy, dx)):
+			if 0 <= srcy + offy < inh and 0 <= srcx + offx < inw:
+				yield srcy + offy, srcx + offx, wy, wx, (2 * offy - 1) * wx, (2 * offx - 1) * wy
+
+	hostOutData = np.zeros(outdata.shape, dtype=np.float32)
+
+	for b, c, y, x in itertools.product(range(batchsize), range(maps), range(outh), range(outw)):
+		for sy, sx, wy, wx, _, _ in corners(b, y, x):
+			hostOutData[b, c, y, x] += hostData[b, c, sy, sx] * wy * wx
+
+	assert np.allclose(hostOutData, outdata.get(), atol=1e-5)
+
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad, dtransform, dgrid = spatialTfBackward(CPUArray.toDevice(hostGrad), data, grid, getDGrid=True)
+
+	hostInGrad = np.zeros(data.shape, dtype=np.float32)
+	hostDGrid = np.zeros(dgrid.shape, dtype=np.float32)
+
+	for b, c, y, x in itertools.product(range(batchsize), range(maps), range(outh), range(outw)):
+		for sy, sx, wy, wx, dwy, dwx in corners(b, y, x):
+			hostInGrad[b, c, sy, sx] += hostGrad[b, c, y, x] * wy * wx
+
+			hostDGrid[b, y, x, 0] += hostGrad[b, c, y, x] * hostData[b, c, sy, sx] * dwx * (inw - 1) / 2.0
+			hostDGrid[b, y, x, 1] += hostGrad[b, c, y, x] * hostData[b, c, sy, sx] * dwy * (inh - 1) / 2.0
+
+	assert np.allclose(hostInGrad, ingrad.get(), atol=1e-5)
+	assert np.allclose(hostDGrid, dgrid.get(), atol=1e-4)
+
+	hostDTransform = np.zeros(dtransform.shape, dtype=np.float32)
+
+	for b, y, x in itertools.product(range(batchsize), range(outh), range(outw)):
+		hostDTransform[b] += np.outer(
+			hostDGrid[b, y, x], np.array([-1.0 + x * xstep, -1.0 + y * ystep, 1], dtype=np.float32)
+		)
+
+	assert np.allclose(hostDTransform, dtransform.get(), atol=1e-4)
+
+
+def outshapeTest():
+	batchsize, maps, inh, inw = 2, 2, 6, 6
+
+	data = CPUArray.toDevice(np.random.randn(batchsize, maps, inh, inw).astype(np.float32))
+	transform = CPUArray.toDevice(
+		np.tile(np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32), reps=(batchsize, 1, 1))
+	)
+
+	assert np.allclose(spatialTf(data, transform).get(), data.get(), atol=1e-5)
+
+	outdata = spatialTf(data, transform, outshape=(maps, 11, 11))
+	assert outdata.shape == (batchsize, maps, 11, 11)
+	assert np.allclose(outdata.get()[:, :, ::2, ::2], data.get(), atol=1e-5)
+
+
+if __name__ == "__main__":
+	unittest()
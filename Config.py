@@ -18,10 +18,12 @@ deviceIdx = 0
 
 allowMultiContext = False
 systemLog = False
+lazyBackendInit = False
 
 
 libname = "PuzzleLib"
 cachepath = None
+kernelCacheCapacity = 256
 
 
 globalEvalMode = False
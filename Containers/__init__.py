@@ -1,4 +1,9 @@
-from PuzzleLib.Containers.Container import Container
-from PuzzleLib.Containers.Graph import Graph
-from PuzzleLib.Containers.Parallel import Parallel
-from PuzzleLib.Containers.Sequential import Sequential
+from PuzzleLib.Backend.Lazy import lazyPackage
+
+
+__all__ = lazyPackage(__name__, {
+	"Container": ["Container"],
+	"Graph": ["Graph"],
+	"Parallel": ["Parallel"],
+	"Sequential": ["Sequential"]
+})
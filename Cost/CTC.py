@@ -1,15 +1,18 @@
-import math, random
+import math, random, time, heapq
 
 import numpy as np
 
 from PuzzleLib.Backend import gpuarray
 from PuzzleLib.Backend.Kernels.Costs import ctcLoss, ctcLossTest
+from PuzzleLib.Backend.Kernels.MatVec import argmax
 
 from PuzzleLib.Cost.Cost import Cost
+from PuzzleLib.Statistics import EditDistanceAccumulator
 
 
 class CTC(Cost):
-	def __init__(self, blank, vocabsize=None, normalized=False):
+	def __init__(self, blank, vocabsize=None, normalized=False, beamWidth=1, lm=None, lmWeight=0.5, lmBonus=0.0):
+		self.edits = EditDistanceAccumulator()
 		super().__init__()
 		self.normalized = normalized
 
@@ -19,6 +22,9 @@ class CTC(Cost):
 		self.vocabsize = vocabsize
 		self.blank = blank
 
+		self.beamWidth = beamWidth
+		self.lm, self.lmWeight, self.lmBonus = lm, lmWeight, lmBonus
+
 
 	def calcGrad(self, pred, target):
 		data, datalen = pred
@@ -35,7 +41,32 @@ class CTC(Cost):
 
 
 	def calcVal(self, pred, target):
-		raise NotImplementedError()
+		labels, lengths = target
+
+		labels = labels.get() if isinstance(labels, gpuarray.GPUArray) else labels
+		lengths = lengths.get() if isinstance(lengths, gpuarray.GPUArray) else lengths
+
+		edits, symbols = self.edits.edits, self.edits.symbols
+		self.edits.update(*self.decode(pred), labels, lengths)
+
+		return (self.edits.edits - edits) / max(self.edits.symbols - symbols, 1)
+
+
+	def decode(self, pred):
+		data, datalen = pred
+
+		if self.beamWidth <= 1 and self.lm is None:
+			return ctcGreedyDecode(data, datalen, self.blank)
+
+		return ctcBeamSearch(
+			data, datalen, self.blank, beamWidth=self.beamWidth, normalized=self.normalized, lm=self.lm,
+			lmWeight=self.lmWeight, lmBonus=self.lmBonus
+		)
+
+
+	def resetAccumulator(self):
+		super().resetAccumulator()
+		self.edits.reset()
 
 
 	def checkDataShape(self, pred, target):
@@ -57,10 +88,98 @@ class CTC(Cost):
 		return pred[0].shape[1]
 
 
+def ctcGreedyDecode(data, datalen, blank):
+	T, batchsize, vocabsize = data.shape
+	datalen = datalen.get() if isinstance(datalen, gpuarray.GPUArray) else np.asarray(datalen)
+
+	path = argmax(data.reshape(T * batchsize, vocabsize), axis=1).get().reshape(T, batchsize).T
+
+	mask = (path != blank) & (np.arange(T) < datalen[:, np.newaxis])
+	mask[:, 1:] &= path[:, 1:] != path[:, :-1]
+
+	return path[mask].astype(np.int32), np.sum(mask, axis=1, dtype=np.int32)
+
+
+def logSumExp(a, b):
+	if a < b:
+		a, b = b, a
+
+	return a if b == -math.inf else a + math.log1p(math.exp(b - a))
+
+
+def ctcBeamSearch(data, datalen, blank, beamWidth=16, normalized=False, lm=None, lmWeight=0.5, lmBonus=0.0,
+				  prune=None):
+	data = data.get() if isinstance(data, gpuarray.GPUArray) else np.asarray(data)
+	datalen = datalen.get() if isinstance(datalen, gpuarray.GPUArray) else np.asarray(datalen)
+
+	if normalized:
+		with np.errstate(divide="ignore"):
+			logprobs = np.log(data)
+	else:
+		logprobs = data - np.amax(data, axis=-1, keepdims=True)
+		logprobs -= np.log(np.sum(np.exp(logprobs), axis=-1, keepdims=True))
+
+	T, batchsize, vocabsize = logprobs.shape
+	prune = min(vocabsize, min(max(beamWidth, 2), 16) if prune is None else prune)
+
+	candidates = np.argsort(-logprobs, axis=-1, kind="stable")[:, :, :prune]
+	decoded = [beamSearchSequence(
+		logprobs[:datalen[b], b], candidates[:datalen[b], b], blank, beamWidth, lm, lmWeight, lmBonus
+	) for b in range(batchsize)]
+
+	lengths = np.array([len(prefix) for prefix in decoded], dtype=np.int32)
+	labels = np.array([label for prefix in decoded for label in prefix], dtype=np.int32)
+
+	return labels, lengths
+
+
+def beamSearchSequence(logprobs, candidates, blank, beamWidth, lm, lmWeight, lmBonus):
+	beams = {(): (0.0, -math.inf)}
+
+	for t in range(logprobs.shape[0]):
+		frame, chars = logprobs[t].tolist(), candidates[t].tolist()
+		nextBeams = {}
+
+		def extend(prefix, pb, pnb):
+			oldpb, oldpnb = nextBeams.get(prefix, (-math.inf, -math.inf))
+			nextBeams[prefix] = (logSumExp(oldpb, pb), logSumExp(oldpnb, pnb))
+
+		for prefix, (pb, pnb) in beams.items():
+			total = logSumExp(pb, pnb)
+			extend(prefix, total + frame[blank], -math.inf)
+
+			last = prefix[-1] if len(prefix) > 0 else None
+
+			if last is not None and last not in chars:
+				extend(prefix, -math.inf, pnb + frame[last])
+
+			for char in chars:
+				if char == blank:
+					continue
+
+				score = frame[char]
+				if lm is not None:
+					score += lmWeight * lm(prefix, char) + lmBonus
+
+				if char == last:
+					extend(prefix, -math.inf, pnb + frame[char])
+					extend(prefix + (char, ), -math.inf, pb + score)
+
+				else:
+					extend(prefix + (char, ), -math.inf, total + score)
+
+		beams = dict(heapq.nlargest(beamWidth, nextBeams.items(), key=lambda item: logSumExp(*item[1])))
+
+	return max(beams.items(), key=lambda item: logSumExp(*item[1]))[0]
+
+
 def unittest():
 	smallTest()
 	mediumTest()
 	randomTest()
+	decodeTest()
+	beamSearchTest()
+	validateTest()
 
 
 def smallTest():
@@ -156,6 +275,82 @@ def randomTest():
 	assert np.allclose(hostGrad, grad.get(), atol=1e-5)
 
 
+def decodeTest():
+	blank = 0
+	hostPath = np.array([
+		[0, 1, 1, 0, 1, 2, 2, 0],
+		[3, 3, 0, 0, 3, 0, 0, 0]
+	], dtype=np.int32).T
+
+	hostData = np.full(hostPath.shape + (4, ), fill_value=-5.0, dtype=np.float32)
+	np.put_along_axis(hostData, hostPath[..., np.newaxis], 5.0, axis=-1)
+
+	data, datalen = gpuarray.to_gpu(hostData), np.array([8, 4], dtype=np.int32)
+	labels, lengths = ctcGreedyDecode(data, datalen, blank)
+
+	assert labels.tolist() == [1, 1, 2, 3] and lengths.tolist() == [3, 1]
+
+	beamLabels, beamLengths = ctcBeamSearch(data, datalen, blank, beamWidth=4)
+	assert beamLabels.tolist() == labels.tolist() and beamLengths.tolist() == lengths.tolist()
+
+
+def beamSearchTest():
+	blank = 0
+
+	hostData = np.array([[[0.6, 0.4, 0.0]], [[0.6, 0.4, 0.0]]], dtype=np.float32)
+	datalen = np.array([2], dtype=np.int32)
+
+	labels, _ = ctcGreedyDecode(gpuarray.to_gpu(hostData), datalen, blank)
+	assert labels.tolist() == []
+
+	labels, lengths = ctcBeamSearch(hostData, datalen, blank, beamWidth=8, normalized=True)
+	assert labels.tolist() == [1] and lengths.tolist() == [1]
+
+	hostData = np.array([[[0.1, 0.5, 0.4]], [[0.1, 0.5, 0.4]]], dtype=np.float32)
+
+	labels, _ = ctcBeamSearch(hostData, datalen, blank, beamWidth=8, normalized=True)
+	assert labels.tolist() == [1]
+
+	lm = lambda prefix, char: 0.0 if char == 2 else math.log(0.1)
+	labels, _ = ctcBeamSearch(hostData, datalen, blank, beamWidth=8, normalized=True, lm=lm, lmWeight=1.0)
+
+	assert labels.tolist() == [2]
+
+
+def validateTest():
+	times, batchsize, vocabsize = 16, 4, 5
+	hostData, hostDataLen, hostLabels, lengths = createData(times, batchsize, vocabsize)
+
+	ctc = CTC(blank=0, vocabsize=vocabsize)
+	pred = [gpuarray.to_gpu(hostData), gpuarray.to_gpu(hostDataLen)]
+
+	error = ctc.validate(pred, [gpuarray.to_gpu(hostLabels), lengths])
+	labels, declengths = ctcGreedyDecode(pred[0], hostDataLen, 0)
+
+	edits = EditDistanceAccumulator()
+	edits.update(labels, declengths, hostLabels, lengths)
+
+	assert np.isclose(error, edits.errorRate) and ctc.edits.edits == edits.edits
+
+
+def beamBenchmark():
+	times, batchsize, vocabsize = 100, 8, 29
+	hostData, hostDataLen, hostLabels, lengths = createData(times, batchsize, vocabsize)
+
+	data, datalen = gpuarray.to_gpu(hostData), gpuarray.to_gpu(hostDataLen)
+
+	start = time.perf_counter()
+	ctcGreedyDecode(data, datalen, 0)
+
+	print("Greedy decoding: %.2f ms" % ((time.perf_counter() - start) * 1e3))
+
+	for beamWidth in (1, 4, 16, 64):
+		start = time.perf_counter()
+		ctcBeamSearch(data, datalen, 0, beamWidth=beamWidth)
+
+		print("Beam search (width %d): %.2f ms" % (beamWidth, (time.perf_counter() - start) * 1e3))
+
+
 def createData(times, batchsize, vocabsize):
 	data = np.random.randn(times, batchsize, vocabsize).astype(np.float32)
 	datalen = np.array([times] * batchsize, dtype=np.int32)
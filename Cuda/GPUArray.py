@@ -1,32 +1,14 @@
 import numpy as np
 
 from PuzzleLib.Config import deviceIdx
+from PuzzleLib.Memoize import memoize
 
 from PuzzleLib.Cuda import Driver
 from PuzzleLib.Cuda.Driver import GPUArray
 
 
-def memoizeOnCtx(fn):
-	cache = {}
-
-	def memoizer(*args):
-		ordinal = Driver.Device.getCurrent()
-		deviceCache = cache.get(ordinal, None)
-
-		if deviceCache is None:
-			deviceCache = {}
-			cache[ordinal] = deviceCache
-
-		obj = deviceCache.get(args, None)
-		if obj is not None:
-			return obj
-
-		obj = fn(*args)
-		deviceCache[args] = obj
-
-		return obj
-
-	return memoizer
+def memoizeOnCtx(fn=None, capacity=None):
+	return memoize(fn, capacity, keyfn=lambda args: (Driver.Device.getCurrent(), ) + args)
 
 
 @memoizeOnCtx
@@ -617,6 +617,28 @@ def adamKer(dtype):
 		return ElementwiseKernel(arguments, operation, name)
 
 
+@memoizeOnCtx
+def adamRowKer(dtype):
+	assert dtype.type == np.float32
+
+	return ElementwiseKernel(
+		[
+			(float_t.ptr, "param"), (float_t.const.ptr, "grad"), (float_t.ptr, "mg"), (float_t.ptr, "ms"),
+			(float_t.const.ptr, "steps"), (int_t, "rowsize"), (float_t, "alpha"), (float_t, "beta1"),
+			(float_t, "beta2"), (float_t, "epsilon")
+		],
+		"""
+		float t = steps[i / rowsize];
+		float learnRate = alpha * sqrtf(1.0f - powf(beta2, t)) / (1.0f - powf(beta1, t));
+
+		mg[i] += (1.0f - beta1) * (grad[i] - mg[i]);
+		ms[i] += (1.0f - beta2) * (grad[i] * grad[i] - ms[i]);
+		param[i] += learnRate * mg[i] / (sqrtf(ms[i]) + epsilon);
+		""",
+		"adamRowKer"
+	)
+
+
 @memoizeOnCtx
 def classicMomSGDKer(dtype):
 	assert dtype.type in {np.float32, np.float16}
@@ -0,0 +1,132 @@
+import numpy as np
+
+from PuzzleLib.Cuda.GPUArray import GPUArray
+from PuzzleLib.Cuda.SourceModule import SourceModule
+from PuzzleLib.Cuda.Utils import device, warpSize, roundUpDiv, memoryPool as memPool
+
+
+topkTmpl = """
+
+extern "C"
+__global__ void topk(float *outdata, int *indices, const float *indata, int outer, int size, int inner, int k)
+{
+	int index = blockIdx.x * blockDim.x + threadIdx.x;
+	if (index >= outer * inner) return;
+
+	int o = index / inner, i = index % inner;
+	const float *row = indata + o * size * inner + i;
+
+	float *outrow = outdata + o * k * inner + i;
+	int *idxrow = indices + o * k * inner + i;
+
+	for (int t = 0; t < size; t++)
+	{
+		float value = row[t * inner];
+		int j = 0;
+
+		if (t < k)
+		{
+			for (j = t; j > 0 && outrow[(j - 1) * inner] > value; j--)
+			{
+				outrow[j * inner] = outrow[(j - 1) * inner];
+				idxrow[j * inner] = idxrow[(j - 1) * inner];
+			}
+		}
+		else
+		{
+			if (!(value > outrow[0]))
+				continue;
+
+			for (j = 0; j + 1 < k && outrow[(j + 1) * inner] < value; j++)
+			{
+				outrow[j * inner] = outrow[(j + 1) * inner];
+				idxrow[j * inner] = idxrow[(j + 1) * inner];
+			}
+		}
+
+		outrow[j * inner] = value, idxrow[j * inner] = t;
+	}
+}
+
+extern "C"
+__global__ void topkBackward(float *ingrad, const float *outgrad, const int *indices, int outer, int size, int inner,
+							 int k)
+{
+	int index = blockIdx.x * blockDim.x + threadIdx.x;
+	if (index >= outer * k * inner) return;
+
+	int o = index / (k * inner), i = index % inner;
+	ingrad[(o * size + indices[index]) * inner + i] = outgrad[index];
+}
+
+"""
+
+
+if device is not None:
+	mod = SourceModule(topkTmpl)
+
+
+def splitAxis(shape, axis):
+	return int(np.prod(shape[:axis])), shape[axis], int(np.prod(shape[axis + 1:]))
+
+
+def topk(data, k, axis, allocator=memPool):
+	assert data.dtype == np.float32 and 0 < k <= data.shape[axis]
+
+	outer, size, inner = splitAxis(data.shape, axis)
+	outshape = data.shape[:axis] + (k, ) + data.shape[axis + 1:]
+
+	outdata = GPUArray.empty(outshape, dtype=np.float32, allocator=allocator)
+	indices = GPUArray.empty(outshape, dtype=np.int32, allocator=allocator)
+
+	block = (warpSize, 1, 1)
+	grid = (roundUpDiv(outer * inner, warpSize), 1, 1)
+
+	mod.topk(
+		outdata, indices, data, np.int32(outer), np.int32(size), np.int32(inner), np.int32(k), block=block, grid=grid
+	)
+	return outdata, indices
+
+
+def topkBackward(grad, indices, axis, size, allocator=memPool):
+	assert grad.dtype == np.float32 and indices.dtype == np.int32 and grad.shape == indices.shape
+
+	outer, k, inner = splitAxis(grad.shape, axis)
+	ingrad = GPUArray.zeros(grad.shape[:axis] + (size, ) + grad.shape[axis + 1:], dtype=np.float32, allocator=allocator)
+
+	block = (warpSize, 1, 1)
+	grid = (roundUpDiv(outer * k * inner, warpSize), 1, 1)
+
+	mod.topkBackward(
+		ingrad, grad, indices, np.int32(outer), np.int32(size), np.int32(inner), np.int32(k), block=block, grid=grid
+	)
+	return ingrad
+
+
+def unittest():
+	for axis in range(3):
+		topkTest(axis)
+
+
+def topkTest(axis):
+	shape, k = (6, 10, 16), 5
+
+	hostData = np.random.randn(*shape).astype(np.float32)
+	outdata, indices = topk(GPUArray.toGpu(hostData), k, axis)
+
+	hostOutData = np.sort(np.partition(hostData, -k, axis=axis).take(range(shape[axis] - k, shape[axis]), axis), axis)
+
+	assert np.allclose(hostOutData, outdata.get())
+	assert np.allclose(np.take_along_axis(hostData, indices.get(), axis), hostOutData)
+
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = topkBackward(GPUArray.toGpu(hostGrad), indices, axis, shape[axis])
+
+	hostInGrad = np.zeros(shape, dtype=np.float32)
+	np.put_along_axis(hostInGrad, indices.get(), hostGrad, axis)
+
+	assert np.allclose(hostInGrad, ingrad.get())
+
+
+if __name__ == "__main__":
+	unittest()
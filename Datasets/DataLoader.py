@@ -17,3 +17,35 @@ class DataLoader:
 	def clear(self):
 		if os.path.exists(self.cachename):
 			os.remove(self.cachename)
+
+
+	def loadShards(self, *args, shardsize=1 << 14, nodeinfo=None, **kwargs):
+		from PuzzleLib.Datasets.ShardedCache import ShardedCache
+
+		path = "%s.shards" % os.path.splitext(self.cachename)[0]
+
+		if nodeinfo is None or nodeinfo.index == 0:
+			self.writeShards(path, shardsize, *args, **kwargs)
+
+		if nodeinfo is not None:
+			nodeinfo.meanValue(0.0)
+
+		return ShardedCache(path, nodeinfo)
+
+
+	def writeShards(self, path, shardsize, *args, **kwargs):
+		from PuzzleLib.Datasets.ShardedCache import ShardedCache, writeShardedCache
+
+		arrays = self.load(*args, **kwargs)
+		arrays = arrays if isinstance(arrays, tuple) else (arrays, )
+
+		try:
+			indexname = os.path.join(path, ShardedCache.indexname)
+
+			if not os.path.exists(indexname) or os.path.getmtime(indexname) < os.path.getmtime(self.cachename):
+				writeShardedCache(path, dict(zip(self.datanames, arrays)), shardsize)
+
+		finally:
+			for array in arrays:
+				if hasattr(array, "file"):
+					array.file.close()
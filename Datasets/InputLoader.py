@@ -1,4 +1,5 @@
-import os
+import os, io
+from multiprocessing import Pool
 
 import h5py
 import numpy as np
@@ -7,18 +8,30 @@ from PIL import Image
 from PuzzleLib.Datasets.DataLoader import DataLoader
 
 
+def decodeImage(f):
+	img = np.array(Image.open(f), dtype=np.float32) * 2.0 / 255.0 - 1.0
+	img = np.rollaxis(img, 2)
+
+	return img.reshape(1, *img.shape)
+
+
+decoder = None
+
+
+def initDecoder(onFile):
+	global decoder
+	decoder = onFile
+
+
+def decodeFile(raw):
+	return decoder(io.BytesIO(raw) if isinstance(raw, bytes) else raw)
+
+
 class InputLoader(DataLoader):
 	def __init__(self, onFile=None, exts=None, dataname=None, cachename=None, onFileList=None):
 		super().__init__(dataname, cachename)
 
-		if onFile is None:
-			def onFile(f):
-				img = np.array(Image.open(f), dtype=np.float32) * 2.0 / 255.0 - 1.0
-				img = np.rollaxis(img, 2)
-
-				return img.reshape(1, *img.shape)
-
-		self.onFile = onFile
+		self.onFile = decodeImage if onFile is None else onFile
 		self.onFileList = onFileList
 
 		if exts is None:
@@ -27,17 +40,25 @@ class InputLoader(DataLoader):
 			self.exts = ["." + ext if not ext.startswith(".") else ext for ext in exts]
 
 		self.resizeFactor = 1.5
+		self.chunkBytes = 1 << 16
 
 		self.log = True
 
 		self.hdf = None
 		self.compress = None
 		self.dataset = None
+		self.pool = None
+		self.numofprocs = 1
 
 		self.maxsamples = 0
 		self.samples = 0
 
 
+	@staticmethod
+	def inputKey(inputname):
+		return os.path.normpath(inputname).replace("/", "\\")
+
+
 	def checkNeedToLoad(self, log=True):
 		if os.path.exists(self.cachename):
 			with h5py.File(self.cachename, "r") as hdf:
@@ -49,22 +70,48 @@ class InputLoader(DataLoader):
 							print("[%s] Archive %s has newer time stamp" % (self.__class__.__name__, inputname))
 
 						return True
+
+				if not hdf.attrs.get("complete", True):
+					if log:
+						print("[%s] Cache %s is incomplete" % (self.__class__.__name__, self.cachename))
+
+					return True
 		else:
 			return True
 
 		return False
 
 
-	def createDataset(self, unpacked):
-		dataset = self.hdf.create_dataset(self.datanames[0], shape=unpacked.shape,
-										  maxshape=(None, ) + unpacked.shape[1:], dtype=unpacked.dtype,
+	def checkCanResume(self, inputnames):
+		if not os.path.exists(self.cachename):
+			return False
+
+		with h5py.File(self.cachename, "r") as hdf:
+			if hdf.attrs.get("complete", True) or "progress" not in hdf:
+				return False
+
+			mtimes = hdf["timestamps"]
+			if set(mtimes.keys()) != set(self.inputKey(inputname) for inputname in inputnames):
+				return False
+
+			return all(
+				mtime[()] >= os.path.getmtime(inputname.replace("\\", "/")) for inputname, mtime in mtimes.items()
+			)
+
+
+	def createDataset(self, unpacked, capacity=0):
+		chunkrows = max(1, min(unpacked.shape[0], self.chunkBytes // max(unpacked[0].nbytes, 1)))
+
+		dataset = self.hdf.create_dataset(self.datanames[0], shape=(max(capacity, unpacked.shape[0]), ) +
+										  unpacked.shape[1:], maxshape=(None, ) + unpacked.shape[1:],
+										  chunks=(chunkrows, ) + unpacked.shape[1:], dtype=unpacked.dtype,
 										  compression=self.compress)
 
-		dataset[:] = unpacked
+		dataset[:unpacked.shape[0]] = unpacked
 		return dataset
 
 
-	def load(self, inputnames, maxsamples=None, filepacksize=5000, compress="gzip", log=True):
+	def load(self, inputnames, maxsamples=None, filepacksize=5000, compress="gzip", log=True, numofprocs=1):
 		self.log = log
 
 		if isinstance(inputnames, str):
@@ -75,33 +122,57 @@ class InputLoader(DataLoader):
 
 		needsToLoad = self.checkNeedToLoad(log)
 		if needsToLoad:
+			resume = self.checkCanResume(inputnames)
+
 			if log:
-				print("[%s] Creating cache file %s ..." % (self.__class__.__name__, self.cachename))
+				print("[%s] %s cache file %s ..." % (
+					self.__class__.__name__, "Resuming" if resume else "Creating", self.cachename
+				))
 
-			timestamps = {}
-			for inputname in inputnames:
-				timestamps[inputname] = os.path.getmtime(inputname)
+			self.numofprocs = numofprocs
+			self.pool = Pool(numofprocs, initializer=initDecoder, initargs=(self.onFile, )) if numofprocs > 1 else None
 
-			with h5py.File(self.cachename, "w") as hdf:
-				timeGrp = hdf.create_group("timestamps")
-				for name, attr in timestamps.items():
-					timeGrp.create_dataset(os.path.normpath(name).replace("/", "\\"), data=attr)
+			try:
+				with h5py.File(self.cachename, "a" if resume else "w") as hdf:
+					if resume:
+						self.dataset = hdf[self.datanames[0]] if self.datanames[0] in hdf else None
+						self.samples = int(hdf.attrs["samples"])
 
-				self.hdf = hdf
-				self.compress = compress
-				self.dataset = None
+					else:
+						timeGrp = hdf.create_group("timestamps")
+						for inputname in inputnames:
+							timeGrp.create_dataset(self.inputKey(inputname), data=os.path.getmtime(inputname))
 
-				self.maxsamples = maxsamples
-				self.samples = 0
+						hdf.create_group("progress")
+						hdf.attrs["complete"], hdf.attrs["samples"] = False, 0
 
-				for i, inputname in enumerate(inputnames):
-					if log:
-						print("[%s] Unpacking archive %s (%d out of %d) ..." %
-							  (self.__class__.__name__, inputname, i + 1, len(inputnames)))
+						self.dataset = None
+						self.samples = 0
+
+					self.hdf = hdf
+					self.compress = compress
+					self.maxsamples = maxsamples
+
+					for i, inputname in enumerate(inputnames):
+						if log:
+							print("[%s] Unpacking archive %s (%d out of %d) ..." %
+								  (self.__class__.__name__, inputname, i + 1, len(inputnames)))
 
-					self.unpack(inputname, filepacksize)
-					if self.maxsamples is not None and self.samples == self.maxsamples:
-						print("[%s] Reached max limit of samples (%d)" % (self.__class__.__name__, self.maxsamples))
+						self.unpack(inputname, filepacksize)
+						if self.maxsamples is not None and self.samples == self.maxsamples:
+							print("[%s] Reached max limit of samples (%d)" % (self.__class__.__name__, self.maxsamples))
+
+					if self.dataset is not None and self.dataset.shape[0] != self.samples:
+						self.dataset.resize((self.samples, ) + self.dataset.shape[1:])
+
+					hdf.attrs["complete"] = True
+
+			finally:
+				if self.pool is not None:
+					self.pool.close()
+					self.pool.join()
+
+				self.pool, self.hdf, self.dataset = None, None, None
 
 		else:
 			if log:
@@ -113,6 +184,9 @@ class InputLoader(DataLoader):
 	def unpack(self, inputname, filepacksize):
 		self.checkInput(inputname)
 
+		progress = self.hdf["progress"]
+		key = self.inputKey(inputname)
+
 		with self.openInput(inputname) as inp:
 			files = self.getFilelist(inp)
 
@@ -126,29 +200,66 @@ class InputLoader(DataLoader):
 			if resid:
 				packs.append(files[numofpacks * filepacksize:])
 
+			done = int(progress[key][()]) if key in progress else 0
+			if key not in progress:
+				progress.create_dataset(key, data=0)
+
 			for idx, pack in enumerate(packs):
+				if idx < done:
+					continue
+
 				if self.log:
 					print("[%s] Started unpacking pack %d out of %d ..." %
 						  (self.__class__.__name__, idx + 1, len(packs)))
 
-				self.cacheFilepack(inp, pack)
+				self.cacheFilepack(inp, pack, capacity=self.samples + sum(len(p) for p in packs[idx:]))
+
+				progress[key][()] = idx + 1
+				self.hdf.attrs["samples"] = self.samples
+				self.hdf.flush()
+
 				if self.maxsamples is not None and self.samples == self.maxsamples:
 					break
 
 
-	def cacheFilepack(self, inp, pack):
+	def decodeFilepack(self, inp, pack):
+		if self.pool is None:
+			for i, file in enumerate(pack):
+				if self.log:
+					print("[%s] Unpacking file %s (%d out of %d)" % (self.__class__.__name__, file, i + 1, len(pack)))
+
+				yield self.onFile(self.openFile(inp, file))
+
+		else:
+			raws = (self.readFile(inp, file) for file in pack)
+			yield from self.pool.imap(decodeFile, raws, chunksize=max(1, len(pack) // (8 * self.numofprocs)))
+
+
+	def readFile(self, inp, file):
+		f = self.openFile(inp, file)
+
+		if not hasattr(f, "read"):
+			return f
+
+		with f:
+			return f.read()
+
+
+	def cacheFilepack(self, inp, pack, capacity=0):
 		data = None
 		nsamples = 0
 
-		for i, file in enumerate(pack):
-			try:
-				if self.log:
-					print("[%s] Unpacking file %s (%d out of %d)" % (self.__class__.__name__, file, i + 1, len(pack)))
+		batches = self.decodeFilepack(inp, pack)
 
-				batch = self.onFile(self.openFile(inp, file))
+		while True:
+			try:
+				batch = next(batches, None)
 			except Exception as e:
 				raise RuntimeError("Unpacking failure: %s" % e)
 
+			if batch is None:
+				break
+
 			if data is None:
 				data = np.empty((len(pack)-1 + batch.shape[0], ) + batch.shape[1:], dtype=batch.dtype)
 
@@ -167,6 +278,7 @@ class InputLoader(DataLoader):
 				nsamples = self.maxsamples - self.samples
 				break
 
+		batches.close()
 		data = data[:nsamples]
 
 		if self.log:
@@ -174,16 +286,17 @@ class InputLoader(DataLoader):
 			print("[%s] Saving unpacked data ... (shape=%s, size=%s mbytes)" %
 				  (self.__class__.__name__, data.shape, size))
 
+		if self.maxsamples is not None:
+			capacity = min(capacity, self.maxsamples)
+
 		if self.dataset is None:
-			self.dataset = self.createDataset(data)
+			self.dataset = self.createDataset(data, capacity)
 
 		else:
 			if self.samples + nsamples > self.dataset.shape[0]:
-				self.dataset.resize((self.samples + nsamples, ) + self.dataset.shape[1:])
-				self.dataset[self.samples:] = data
+				self.dataset.resize((max(self.samples + nsamples, capacity), ) + self.dataset.shape[1:])
 
-			else:
-				self.dataset[self.samples:self.samples + nsamples] = data
+			self.dataset[self.samples:self.samples + nsamples] = data
 
 		self.samples += nsamples
 		print("[%s] Samples ready: %d (max: %s)" % (self.__class__.__name__, self.samples, self.maxsamples))
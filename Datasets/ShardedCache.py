@@ -0,0 +1,250 @@
+import os, json
+
+import numpy as np
+
+
+class ShardedCacheError(Exception):
+	pass
+
+
+class ShardedCache:
+	indexname = "index.json"
+
+
+	def __init__(self, path, nodeinfo=None):
+		if not self.exists(path):
+			raise ShardedCacheError("No sharded cache found in '%s'" % path)
+
+		with open(os.path.join(path, self.indexname)) as file:
+			index = json.load(file)
+
+		self.path = path
+		self.names, self.shardsizes = index["names"], index["shards"]
+
+		self.extras = {name: np.load(os.path.join(path, "%s.npy" % name), mmap_mode="r") for name in index["extras"]}
+
+		shardids = range(len(self.shardsizes))
+
+		if nodeinfo is not None and nodeinfo.index >= len(shardids):
+			raise ShardedCacheError(
+				"Node %s of %s gets no shards (cache has %s shards); write it with a smaller shardsize" % (
+					nodeinfo.index, nodeinfo.gridsize, len(shardids)
+				)
+			)
+
+		self.shardids = list(shardids if nodeinfo is None else shardids[nodeinfo.index::nodeinfo.gridsize])
+
+		self.shards = [
+			{name: np.load(self.shardFile(path, name, shardid), mmap_mode="r") for name in self.names}
+			for shardid in self.shardids
+		]
+
+		self.offsets = np.cumsum([0] + [self.shardsizes[shardid] for shardid in self.shardids])
+
+
+	@classmethod
+	def exists(cls, path):
+		return os.path.exists(os.path.join(path, cls.indexname))
+
+
+	@staticmethod
+	def shardFile(path, name, shardid):
+		return os.path.join(path, "%s-%05d.npy" % (name, shardid))
+
+
+	def __len__(self):
+		return int(self.offsets[-1])
+
+
+	@property
+	def totalSamples(self):
+		return sum(self.shardsizes)
+
+
+	def getShard(self, idx):
+		shard = self.shards[idx]
+		return tuple(shard[name] for name in self.names)
+
+
+	def materialize(self, name=None):
+		if name is None:
+			return tuple(self.materialize(nm) for nm in self.names)
+
+		if name in self.extras:
+			return np.array(self.extras[name])
+
+		return np.concatenate([shard[name] for shard in self.shards])
+
+
+	def take(self, indices, names=None):
+		names = self.names if names is None else names
+		indices = np.asarray(indices)
+
+		shardidx = np.searchsorted(self.offsets, indices, side="right") - 1
+		if len(indices) > 0 and (indices.min() < 0 or shardidx.max() >= len(self.shards)):
+			raise ShardedCacheError("Sample index out of range (local samples: %s)" % len(self))
+
+		outdata = tuple(
+			np.empty((indices.shape[0], ) + self.shards[0][name].shape[1:], dtype=self.shards[0][name].dtype)
+			for name in names
+		)
+
+		for idx in np.unique(shardidx):
+			positions = np.flatnonzero(shardidx == idx)
+			rows = indices[positions] - self.offsets[idx]
+
+			order = np.argsort(rows, kind="stable")
+			positions, rows = positions[order], rows[order]
+
+			for out, name in zip(outdata, names):
+				out[positions] = self.shards[idx][name][rows]
+
+		return outdata
+
+
+	def sample(self, size, names=None):
+		return self.take(np.random.randint(0, len(self), size=size), names)
+
+
+def writeShardedCache(path, arrays, shardsize=1 << 14):
+	names = list(arrays.keys())
+	nsamples = arrays[names[0]].shape[0]
+
+	extras = [name for name in names if arrays[name].shape[0] != nsamples]
+	names = [name for name in names if name not in extras]
+
+	if not os.path.exists(path):
+		os.makedirs(path)
+
+	shards = []
+	for shardid, start in enumerate(range(0, nsamples, shardsize)):
+		stop = min(start + shardsize, nsamples)
+
+		for name in names:
+			saveAtomic(ShardedCache.shardFile(path, name, shardid), arrays[name][start:stop])
+
+		shards.append(stop - start)
+
+	for name in extras:
+		saveAtomic(os.path.join(path, "%s.npy" % name), arrays[name][:])
+
+	tmpname = os.path.join(path, "%s.%s.tmp" % (ShardedCache.indexname, os.getpid()))
+
+	with open(tmpname, "w") as file:
+		json.dump({"names": names, "extras": extras, "shardsize": shardsize, "shards": shards}, file)
+
+	os.replace(tmpname, os.path.join(path, ShardedCache.indexname))
+
+
+def saveAtomic(filename, array):
+	tmpname = "%s.%s.tmp" % (filename, os.getpid())
+
+	with open(tmpname, "wb") as file:
+		np.save(file, np.asarray(array))
+
+	os.replace(tmpname, filename)
+
+
+def unittest():
+	shardTest()
+	loaderTest()
+	gridLoaderTest()
+
+
+def shardTest():
+	import shutil
+	from PuzzleLib.Grid import NodeInfo
+
+	data = np.random.randn(50, 3, 4).astype(np.float32)
+	labels = np.arange(50, dtype=np.int32)
+	vocabulary = np.arange(7, dtype=np.int32)
+
+	path = "../TestData/shards"
+
+	try:
+		writeShardedCache(path, {"data": data, "labels": labels, "vocabulary": vocabulary}, shardsize=8)
+
+		cache = ShardedCache(path)
+		assert len(cache) == 50 and len(cache.shards) == 7 and cache.names == ["data", "labels"]
+
+		indices = np.array([49, 3, 17, 3, 0])
+		outdata, outlabels = cache.take(indices)
+
+		assert np.allclose(outdata, data[indices]) and np.all(outlabels == indices)
+		assert np.all(cache.materialize("vocabulary") == vocabulary)
+
+		outdata, outlabels = cache.sample(16)
+		assert np.allclose(outdata, data[outlabels])
+
+		nodes = [ShardedCache(path, NodeInfo(index, 2, None, None)) for index in range(2)]
+		assert sum(len(node) for node in nodes) == 50 and len(nodes[0]) == 26
+
+		nodelabels = np.concatenate([node.materialize("labels") for node in nodes])
+		assert np.all(np.sort(nodelabels) == labels)
+
+		try:
+			ShardedCache(path, NodeInfo(7, 8, None, None))
+			assert False
+
+		except ShardedCacheError:
+			pass
+
+	finally:
+		shutil.rmtree(path, ignore_errors=True)
+
+
+def loaderTest():
+	import shutil
+	from PuzzleLib.Datasets.ZipLoader import ZipLoader
+
+	loader = ZipLoader(cachename="../TestData/sharded.hdf")
+
+	try:
+		cache = loader.loadShards("../TestData/test.zip", shardsize=4, log=False)
+		assert len(cache) == 10 and len(cache.shards) == 3
+
+		data = loader.load("../TestData/test.zip", log=False)
+		assert np.allclose(cache.materialize("data"), data[:])
+
+		data.file.close()
+
+	finally:
+		loader.clear()
+		shutil.rmtree("../TestData/sharded.shards", ignore_errors=True)
+
+
+def gridLoaderTest():
+	import shutil
+	from multiprocessing import Process
+	from PuzzleLib.Grid import generateGridInfo
+
+	nodes = [Process(target=gridLoaderNode, args=(nodeinfo, )) for nodeinfo in generateGridInfo(2, None)]
+
+	try:
+		for node in nodes:
+			node.start()
+
+		for node in nodes:
+			node.join()
+
+		assert all(node.exitcode == 0 for node in nodes)
+		assert not any(file.endswith(".tmp") for file in os.listdir("../TestData/grid.shards"))
+
+	finally:
+		if os.path.exists("../TestData/grid.hdf"):
+			os.remove("../TestData/grid.hdf")
+
+		shutil.rmtree("../TestData/grid.shards", ignore_errors=True)
+
+
+def gridLoaderNode(nodeinfo):
+	from PuzzleLib.Datasets.ZipLoader import ZipLoader
+
+	cache = ZipLoader(cachename="../TestData/grid.hdf").loadShards(
+		"../TestData/test.zip", shardsize=4, nodeinfo=nodeinfo, log=False
+	)
+	assert len(cache) == (6 if nodeinfo.index == 0 else 4) and cache.totalSamples == 10
+
+
+if __name__ == "__main__":
+	unittest()
@@ -6,15 +6,18 @@ from PuzzleLib.Handlers.Calculator import Calculator
 from PuzzleLib import Statistics
 
 
-def validate(net, valData, valLabels, dim=0, batchsize=128, log=False):
+def validate(net, valData, valLabels, dim=0, batchsize=128, log=False, macroBatchSize=10000):
 	if dim == 0:
 		dim = getDim(valLabels)
 
-	confMat = np.zeros(shape=(dim, dim))
-	predictions = Calculator(net, batchsize=batchsize).calcFromHost(valData)
+	calculator = Calculator(net, batchsize=batchsize)
+	accumulator = Statistics.ConfusionAccumulator(dim)
 
-	for i in range(predictions.shape[0]):
-		confMat[valLabels[i], np.argmax(predictions[i])] += 1
+	for start in range(0, len(valLabels), macroBatchSize):
+		predictions = calculator.calcFromHost(valData[start:start + macroBatchSize], macroBatchSize=macroBatchSize)
+		accumulator.updateFromScores(labelArray(valLabels[start:start + macroBatchSize]), predictions)
+
+	confMat = accumulator.cm
 
 	if log:
 		print("Confusion matrix:\n" + str(confMat))
@@ -30,95 +33,77 @@ def splitData(data, labels=None, dim=0, validation=0.1, permutation=True, unifor
 	if len(data) == 0:
 		return None
 
-	if permutation:
-		data, labels = permutateData(data, labels)
+	order = np.random.permutation(len(data)) if permutation else np.arange(len(data))
 
 	if labels is None:
 		splitter = int(validation * len(data))
-		return data[splitter:], data[:splitter]
+		return gatherSamples(data, order[splitter:]), gatherSamples(data, order[:splitter])
 
 	if dim < 1:
 		dim = getDim(labels)
 
-	counter = [0] * dim
-	coe = [0] * dim
-	for label in labels:
-		coe[label] += 1
+	lbls = labelArray(labels)[order]
+	coe = np.bincount(lbls, minlength=dim)
 
 	if uniformVal:
-		size = int(validation * min(coe))
-		for i in range(len(coe)):
-			coe[i] = size
-		valSize = dim * size
+		coe = np.full(dim, int(validation * coe.min()), dtype=np.int64)
 	else:
-		for i in range(len(coe)):
-			coe[i] = int(coe[i] * validation)
-		valSize = sum(coe)
+		coe = (coe * validation).astype(np.int64)
 
-	trainSize = len(data) - valSize
+	isVal = classRanks(lbls, dim) < coe[lbls]
+	valIdx, trainIdx = order[isVal], order[~isVal]
 
-	valLabels = np.empty((valSize, ), labels.dtype) if isinstance(labels, np.ndarray) else [labels[0]] * valSize
-	valData = np.empty((valSize, ) + data.shape[1:], data.dtype) if isinstance(data, np.ndarray) else \
-		[data[0]] * valSize
+	return gatherSamples(data, trainIdx), gatherSamples(data, valIdx), \
+		   gatherSamples(labels, trainIdx), gatherSamples(labels, valIdx)
 
-	trainLabels = np.empty((trainSize, ), labels.dtype) if isinstance(labels, np.ndarray) else [labels[0]] * trainSize
-	trainData = np.empty((trainSize, ) + data.shape[1:], data.dtype) if isinstance(data, np.ndarray) else \
-		[data[0]] * trainSize
 
-	valIdx, trainIdx = 0, 0
-	for i in range(len(data)):
-		if counter[labels[i]] < coe[labels[i]]:
-			valData[valIdx] = data[i]
-			valLabels[valIdx] = labels[i]
+def replicateData(data, labels, dim=0, permutation=True):
+	checkShape(data, labels)
 
-			valIdx += 1
-			counter[labels[i]] += 1
-		else:
-			trainData[trainIdx] = data[i]
-			trainLabels[trainIdx] = labels[i]
+	if dim < 1:
+		dim = getDim(labels)
 
-			trainIdx += 1
+	lbls = labelArray(labels)
+	coe = np.bincount(lbls, minlength=dim)
 
-	return trainData, valData, trainLabels, valLabels
+	top = coe.max()
+	reps = top // coe[lbls] + (classRanks(lbls, dim) < top % coe[lbls])
 
+	indices = np.repeat(np.arange(len(lbls)), reps)
+	if permutation:
+		indices = indices[np.random.permutation(len(indices))]
 
-def replicateData(data, labels, dim=0, permutation=True):
-	checkShape(data, labels)
+	return gatherSamples(data, indices), gatherSamples(labels, indices)
 
-	if dim < 1:
-		dim = getDim(labels)
 
-	coe = [0] * dim
-	for label in labels:
-		coe[label] += 1
+def labelArray(labels):
+	return np.asarray(labels if isinstance(labels, list) else labels[:], dtype=np.int64)
 
-	top = max(coe)
-	for i in range(dim):
-		if coe[i] > 0:
-			coe[i] = top / coe[i]
 
-	cur = [0] * dim
-	res = [0] * dim
+def classRanks(labels, dim):
+	order = np.argsort(labels, kind="stable")
+	starts = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=dim))[:-1]))
 
-	length = dim * top
+	ranks = np.empty(len(labels), dtype=np.int64)
+	ranks[order] = np.arange(len(labels)) - starts[labels[order]]
 
-	newData = np.empty((length, ) + data.shape[1:], data.dtype) if isinstance(data, np.ndarray) else [data[0]] * length
-	newLabels = np.empty((length, ), labels.dtype) if isinstance(labels, np.ndarray) else [labels[0]] * length
+	return ranks
 
-	idx = 0
-	for i in range(len(data)):
-		cur[labels[i]] += coe[labels[i]]
 
-		while res[labels[i]] < cur[labels[i]] - 0.1:
-			newData[idx] = data[i]
-			newLabels[idx] = labels[i]
-			idx += 1
-			res[labels[i]] += 1
+def gatherSamples(data, indices, chunksize=1 << 16):
+	if isinstance(data, list):
+		return [data[i] for i in indices]
 
-	if permutation:
-		newData, newLabels = permutateData(newData, newLabels)
+	if isinstance(data, np.ndarray):
+		return np.asarray(data[indices])
 
-	return newData, newLabels
+	outdata = np.empty((len(indices), ) + data.shape[1:], dtype=data.dtype)
+
+	for start in range(0, len(indices), chunksize):
+		uniq, inverse = np.unique(indices[start:start + chunksize], return_inverse=True)
+		outdata[start:start + len(inverse)] = data[uniq.tolist()][inverse]
+
+	return outdata
 
 
 def permutateData(data, labels=None, constantMemory=False):
@@ -126,13 +111,10 @@ def permutateData(data, labels=None, constantMemory=False):
 
 	if not constantMemory:
 		if labels is not None:
-			tmp = labels.copy()
-			for i in range(checkShape(data, labels)):
-				labels[i] = tmp[perm[i]]
+			checkShape(data, labels)
+			labels[:] = labels[perm] if isinstance(labels, np.ndarray) else [labels[i] for i in perm]
 
-		tmp = data.copy()
-		for i in range(len(data)):
-			data[i] = tmp[perm[i]]
+		data[:] = data[perm] if isinstance(data, np.ndarray) else [data[i] for i in perm]
 
 	else:
 		while True:
@@ -175,17 +157,15 @@ def getDim(labels, log=False):
 	assert len(labels) > 0
 	assert (isinstance(labels[0], np.int32) or isinstance(labels[0], int))
 
-	dim = np.max(labels) + 1
+	lbls = labelArray(labels)
+	dim = lbls.max() + 1
 
 	if log:
-		coe = [0] * dim
-
-		for label in labels:
-			coe[label] += 1
+		coe = np.bincount(lbls, minlength=dim)
 
 		print("Labels count:")
 		for i in range(dim):
-			print("%d: %d (~%d%%)" % (i, coe[i], 100 * coe[i] // labels.shape[0]))
+			print("%d: %d (~%d%%)" % (i, coe[i], 100 * coe[i] // len(lbls)))
 
 	return int(dim)
 
@@ -237,6 +217,8 @@ def unittest():
 	mergeTest()
 	numpyInterfaceTest()
 	pyInterfaceTest()
+	hdfInterfaceTest()
+	validateTest()
 
 
 def mergeTest():
@@ -281,6 +263,44 @@ def pyInterfaceTest():
 	interfaceTest(tData, tLabels, list)
 
 
+def hdfInterfaceTest():
+	import h5py
+
+	data = np.random.randn(10000, 4).astype(np.float32)
+	labels = np.random.randint(0, 10, size=(10000, ), dtype=np.int32)
+
+	with h5py.File("hdfInterfaceTest.hdf", "w", driver="core", backing_store=False) as hdf:
+		hdfData, hdfLabels = hdf.create_dataset("data", data=data), hdf.create_dataset("labels", data=labels)
+
+		tData, vData, tLabels, vLabels = splitData(hdfData, hdfLabels, validation=0.1)
+		size = int(0.1 * np.bincount(labels).min())
+
+		assert np.all(np.bincount(vLabels, minlength=10) == size) and len(tData) == 10000 - 10 * size
+		assert np.allclose(np.sort(np.concatenate((tData, vData)), axis=0), np.sort(data, axis=0))
+
+		rData, rLabels = replicateData(hdfData, hdfLabels, permutation=False)
+
+		assert np.all(np.bincount(rLabels) == np.bincount(labels).max())
+		assert all(np.any(np.all(data[labels == rLabels[i]] == rData[i], axis=1)) for i in range(0, len(rData), 97))
+
+
+def validateTest():
+	from PuzzleLib.Modules import Linear
+
+	data = np.random.randn(1000, 16).astype(np.float32)
+	labels = np.random.randint(0, 4, size=(1000, ), dtype=np.int32)
+
+	net = Linear(16, 4)
+	precision, recall, accuracy = validate(net, data, labels, batchsize=100, macroBatchSize=300)
+
+	predictions = Calculator(net, batchsize=100).calcFromHost(data)
+	cm = Statistics.confusion(labels, np.argmax(predictions, axis=1), dim=4, log=False)
+
+	assert np.isclose(accuracy, Statistics.accuracy(cm, log=False))
+	assert np.isclose(precision, Statistics.precision(cm, log=False)[0])
+	assert np.isclose(recall, Statistics.recall(cm, log=False)[0])
+
+
 def interfaceTest(data, labels, typ):
 	data, labels = replicateData(data, labels, permutation=True)
 
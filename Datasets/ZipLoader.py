@@ -1,5 +1,7 @@
 import zipfile
 
+import numpy as np
+
 from PuzzleLib.Datasets.InputLoader import InputLoader
 
 
@@ -22,10 +24,75 @@ class ZipLoader(InputLoader):
 
 
 def unittest():
+	limitTest()
+	parallelTest()
+	resumeTest()
+
+
+def limitTest():
 	loader = ZipLoader()
 	loader.load("../TestData/test.zip", maxsamples=5, filepacksize=3)
 	loader.clear()
 
 
+def parallelTest():
+	loader = ZipLoader(cachename="../TestData/serial.hdf")
+	data = loader.load("../TestData/test.zip", filepacksize=4)
+
+	parLoader = ZipLoader(cachename="../TestData/parallel.hdf")
+	parData = parLoader.load("../TestData/test.zip", filepacksize=4, numofprocs=2)
+
+	try:
+		assert parData.shape == data.shape and np.allclose(parData[:], data[:])
+
+	finally:
+		data.file.close()
+		parData.file.close()
+
+		loader.clear()
+		parLoader.clear()
+
+
+def resumeTest():
+	from PuzzleLib.Datasets.InputLoader import decodeImage
+
+	decoded = []
+
+	def onFile(f):
+		if len(decoded) == 6:
+			raise RuntimeError("Interrupted")
+
+		decoded.append(f)
+		return decodeImage(f)
+
+	cachename = "../TestData/resume.hdf"
+	loader = ZipLoader(onFile=onFile, cachename=cachename)
+
+	try:
+		loader.load("../TestData/test.zip", filepacksize=4)
+		assert False
+
+	except RuntimeError:
+		pass
+
+	decoded.clear()
+	loader.onFile = lambda f: decoded.append(f) or decodeImage(f)
+
+	data = loader.load("../TestData/test.zip", filepacksize=4)
+	refloader = ZipLoader(cachename="../TestData/reference.hdf")
+
+	try:
+		refdata = refloader.load("../TestData/test.zip", filepacksize=4)
+		assert len(decoded) == refdata.shape[0] - 4 and np.allclose(data[:], refdata[:])
+
+		refdata.file.close()
+
+	finally:
+		data.file.close()
+
+		loader.clear()
+		refloader.clear()
+
+
 if __name__ == "__main__":
 	unittest()
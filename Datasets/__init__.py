@@ -2,6 +2,7 @@ from PuzzleLib.Datasets.Cifar10Loader import Cifar10Loader
 from PuzzleLib.Datasets.IMDBLoader import IMDBLoader
 from PuzzleLib.Datasets.MnistLoader import MnistLoader
 from PuzzleLib.Datasets.PathLoader import PathLoader
+from PuzzleLib.Datasets.ShardedCache import ShardedCache
 from PuzzleLib.Datasets.SmallNorbLoader import SmallNorbLoader
 from PuzzleLib.Datasets.TarLoader import TarLoader
 from PuzzleLib.Datasets.ZipLoader import ZipLoader
@@ -24,7 +24,7 @@ class Calculator(Handler):
 
 
 	def onMacroBatchStart(self, idx, macroBatchSize, state):
-		state["devSize"] = macroBatchSize
+		state["devSize"] = min(macroBatchSize, state["hostSize"] - idx * macroBatchSize)
 
 
 	def onMacroBatchFinish(self, idx, macroBatchSize, state):
@@ -0,0 +1,263 @@
+import os, glob, shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import h5py
+
+from PuzzleLib import Config
+
+from PuzzleLib.Backend import gpuarray
+from PuzzleLib.Containers.Container import Container
+
+
+class CheckpointError(Exception):
+	pass
+
+
+class Checkpointer:
+	def __init__(self, mod, optimizer, path, keep=3, prefix="checkpoint", batchInterval=None, macroBatchInterval=1):
+		self.module = mod
+		self.optimizer = optimizer
+
+		self.path = path
+		self.prefix = prefix
+		self.keep = keep
+
+		self.batchInterval = batchInterval
+		self.macroBatchInterval = macroBatchInterval
+
+		self.batches, self.macroBatches = 0, 0
+
+		if not os.path.exists(self.path):
+			os.makedirs(self.path)
+
+		self.files = sorted(glob.glob(os.path.join(self.path, "%s-*.hdf" % self.prefix)))
+
+		self.executor = ThreadPoolExecutor(max_workers=1)
+		self.pending = None
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+
+	def close(self):
+		self.wait()
+		self.executor.shutdown()
+
+
+	def onBatchFinish(self, trainer):
+		self.batches += 1
+
+		if self.batchInterval is not None and self.batches % self.batchInterval == 0:
+			self.save()
+
+
+	def onMacroBatchFinish(self, trainer):
+		self.macroBatches += 1
+
+		if self.macroBatchInterval is not None and self.macroBatches % self.macroBatchInterval == 0:
+			self.save()
+
+
+	def save(self, tag=None):
+		self.wait()
+
+		tag = self.optimizer.t if tag is None else tag
+		snapshot = self.snapshot()
+
+		self.pending = self.executor.submit(self.write, snapshot, tag)
+
+
+	def wait(self):
+		if self.pending is None:
+			return None
+
+		pending, self.pending = self.pending, None
+
+		try:
+			return pending.result()
+
+		except Exception as e:
+			raise CheckpointError("Checkpoint write error: %s" % e)
+
+
+	def snapshot(self):
+		entries = self.getEntries()
+
+		params = {name: data.get() for name, data, _ in entries}
+		states = {
+			"%s.%s" % (name, entityName): entity.get()
+			for name, _, state in entries for entityName, entity in state.items()
+		}
+
+		attrs = {
+			name: attr.get() if isinstance(attr, gpuarray.GPUArray) else np.copy(attr)
+			for name, attr in self.getAttrTable(self.module).items()
+		}
+
+		return params, states, attrs, self.optimizer.getAttrDict()
+
+
+	def write(self, snapshot, tag):
+		params, states, attrs, optattrs = snapshot
+
+		filename = os.path.join(self.path, "%s-%08d.hdf" % (self.prefix, tag))
+		tmpname = "%s.tmp" % filename
+
+		with h5py.File(tmpname, "w") as hdf:
+			paramGrp, stateGrp = hdf.create_group("params"), hdf.create_group("states")
+			attrGrp, optGrp = hdf.create_group("attrs"), hdf.create_group("optimizer")
+
+			for name, param in params.items():
+				paramGrp.create_dataset(name, data=param)
+
+			for name, entity in states.items():
+				stateGrp.create_dataset(name, data=entity)
+
+			for name, attr in attrs.items():
+				attrGrp.create_dataset(name, data=attr)
+
+			for name, attr in optattrs.items():
+				optGrp.create_dataset(name, data=attr)
+
+			hdf.flush()
+
+		os.replace(tmpname, filename)
+
+		if filename in self.files:
+			self.files.remove(filename)
+
+		self.files.append(filename)
+
+		while len(self.files) > self.keep:
+			os.remove(self.files.pop(0))
+
+		return filename
+
+
+	def latest(self):
+		self.wait()
+		return self.files[-1] if len(self.files) > 0 else None
+
+
+	def restore(self, filename=None):
+		filename = self.latest() if filename is None else filename
+
+		if filename is None:
+			raise CheckpointError("No checkpoints found in '%s'" % self.path)
+
+		optimizer, entries = self.optimizer, self.getEntries()
+
+		with h5py.File(filename, "r") as hdf:
+			paramGrp, stateGrp = hdf["params"], hdf["states"]
+			attrGrp, optGrp = hdf["attrs"], hdf["optimizer"]
+
+			for name, data, state in entries:
+				data.set(np.array(paramGrp[name]))
+
+				for entityName, entity in state.items():
+					entity.set(np.array(stateGrp["%s.%s" % (name, entityName)]))
+
+			for name, attr in self.getAttrTable(self.module).items():
+				attrVal = np.array(attrGrp[name])
+
+				if isinstance(attr, gpuarray.GPUArray):
+					attr.set(attrVal.astype(attr.dtype, copy=False))
+				else:
+					np.copyto(attr, attrVal.astype(attr.dtype, copy=False))
+
+			for attrName, attr in optGrp.items():
+				T = type(getattr(optimizer, attrName))
+				optimizer.setAttr(attrName, T(np.array(attr)))
+
+		if Config.showWarnings and len(optimizer.customVars) > 0:
+			print("[%s] Warning: variables with custom updaters were not restored: %s" % (
+				Config.libname, optimizer.customVars
+			))
+
+		return filename
+
+
+	def getEntries(self):
+		optimizer = self.optimizer
+
+		if len(optimizer.states) == 0:
+			raise CheckpointError("Optimizer is not set up on module")
+
+		if optimizer.globalState:
+			return [
+				(np.dtype(dtype).name, globalVar.data, optimizer.states[dtype])
+				for dtype, globalVar in optimizer.globalVar.items()
+			] + [(name, self.module.getVar(name).data, optimizer.states[name]) for name in optimizer.sparseVars]
+
+		return [(name, self.module.getVar(name).data, state) for name, state in optimizer.states.items()]
+
+
+	@classmethod
+	def getAttrTable(cls, mod, table=None, name=None):
+		table = {} if table is None else table
+		name = "" if name is None else name
+
+		if isinstance(mod, Container):
+			for child in mod.modules.values():
+				cls.getAttrTable(child, table, "%s%s." % (name, child.name))
+
+		else:
+			table.update(("%s%s" % (name, attrName), attr) for attrName, attr in mod.attrs.items())
+
+		return table
+
+
+def unittest():
+	trainTest()
+
+
+def trainTest():
+	from PuzzleLib.Modules import Linear
+
+	from PuzzleLib.Cost.MSE import MSE
+	from PuzzleLib.Optimizers.Adam import Adam
+	from PuzzleLib.Handlers.Trainer import Trainer
+
+	linear = Linear(16, 4)
+
+	optimizer = Adam(alpha=1e-3)
+	optimizer.setupOn(linear, useGlobalState=True)
+
+	data = gpuarray.to_gpu(np.random.randn(256, 16).astype(np.float32))
+	target = gpuarray.to_gpu(np.random.randn(256, 4).astype(np.float32))
+
+	path = "../TestData/checkpoints"
+
+	try:
+		with Checkpointer(linear, optimizer, path, keep=2, batchInterval=2, macroBatchInterval=None) as checkpointer:
+			trainer = Trainer(linear, MSE(), optimizer, onBatchFinish=checkpointer.onBatchFinish, batchsize=32)
+			trainer.train(data, target)
+
+			filename = checkpointer.latest()
+			assert len(checkpointer.files) == 2 and len(os.listdir(path)) == 2
+
+			hostW = linear.W.get()
+			hostMg = optimizer.states[np.float32]["mg"].get()
+			t = optimizer.t
+
+			Trainer(linear, MSE(), optimizer, batchsize=32).train(data, target)
+			assert not np.allclose(hostW, linear.W.get())
+
+			assert checkpointer.restore(filename) == filename
+
+		assert optimizer.t == t
+		assert np.allclose(hostW, linear.W.get())
+		assert np.allclose(hostMg, optimizer.states[np.float32]["mg"].get())
+
+	finally:
+		shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+	unittest()
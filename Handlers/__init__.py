@@ -1,3 +1,4 @@
 from PuzzleLib.Handlers.Calculator import Calculator
+from PuzzleLib.Handlers.Checkpointer import Checkpointer
 from PuzzleLib.Handlers.Trainer import Trainer
 from PuzzleLib.Handlers.Validator import Validator
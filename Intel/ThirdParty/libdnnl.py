@@ -1229,3 +1229,16 @@ _libdnnl.dnnl_sgemm.argtypes = [
 def dnnl_sgemm(transA, transB, M, N, K, alpha, A, lda, B, ldb, beta, C, ldc):
 	status = _libdnnl.dnnl_sgemm(ord(transA), ord(transB), M, N, K, alpha, A, lda, B, ldb, beta, C, ldc)
 	dnnlCheckStatus(status)
+
+
+_libdnnl.dnnl_gemm_s8s8s32.restype = int
+_libdnnl.dnnl_gemm_s8s8s32.argtypes = [
+	ctypes.c_char, ctypes.c_char, ctypes.c_char, dnnl_dim_t, dnnl_dim_t, dnnl_dim_t, ctypes.c_float, ctypes.c_void_p,
+	dnnl_dim_t, ctypes.c_int8, ctypes.c_void_p, dnnl_dim_t, ctypes.c_int8, ctypes.c_float, ctypes.c_void_p,
+	dnnl_dim_t, ctypes.c_void_p
+]
+def dnnl_gemm_s8s8s32(transA, transB, offsetC, M, N, K, alpha, A, lda, ao, B, ldb, bo, beta, C, ldc, co):
+	status = _libdnnl.dnnl_gemm_s8s8s32(
+		ord(transA), ord(transB), ord(offsetC), M, N, K, alpha, A, lda, ao, B, ldb, bo, beta, C, ldc, co
+	)
+	dnnlCheckStatus(status)
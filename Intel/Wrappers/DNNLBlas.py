@@ -1,6 +1,8 @@
 import numpy as np
 
 from PuzzleLib.CPU.CPUArray import CPUArray
+from PuzzleLib.CPU.Kernels import Half
+from PuzzleLib.CPU.Wrappers import NumpyBlas
 from PuzzleLib.Intel.ThirdParty import libdnnl
 
 
@@ -8,7 +10,6 @@ def mulMatrixOnMatrix(A, B, out=None, transpA=False, transpB=False, alpha=1.0, b
 	assert not (transpA and transpB)
 	assert A.ndim == 2 and B.ndim == 2
 
-	assert A.dtype == B.dtype and A.dtype == np.float32
 	assert A.flags.c_contiguous and B.flags.c_contiguous
 
 	if transpA:
@@ -22,7 +23,11 @@ def mulMatrixOnMatrix(A, B, out=None, transpA=False, transpB=False, alpha=1.0, b
 		shape = (A.shape[0], B.shape[1])
 
 	if out is None:
-		out = CPUArray.empty(shape, dtype=np.float32)
+		out = CPUArray.empty(shape, dtype=A.dtype if A.dtype in Half.halfTypes else np.float32)
+
+	if not (A.dtype == B.dtype and B.dtype == out.dtype and out.dtype == np.float32):
+		assert alpha == 1.0 and beta == 0.0
+		return NumpyBlas.mulHalfMatrixOnMatrix(mulMatrixOnMatrix, A, B, out, transpA, transpB)
 
 	if transpA:
 		k, m = A.shape
@@ -40,6 +45,30 @@ def mulMatrixOnMatrix(A, B, out=None, transpA=False, transpB=False, alpha=1.0, b
 	return out
 
 
+def mulInt8MatrixOnMatrix(A, B, out=None, transpB=False):
+	assert A.ndim == 2 and B.ndim == 2
+
+	assert A.dtype == B.dtype and A.dtype == np.int8
+	assert A.flags.c_contiguous and B.flags.c_contiguous
+
+	m, k = A.shape
+	n = B.shape[0] if transpB else B.shape[1]
+
+	assert k == (B.shape[1] if transpB else B.shape[0])
+
+	if out is None:
+		out = CPUArray.empty((m, n), dtype=np.int32)
+
+	offset = np.zeros((1, ), dtype=np.int32)
+
+	libdnnl.dnnl_gemm_s8s8s32(
+		'n', 't' if transpB else 'n', 'F', m, n, k, 1.0, A.ptr, k, 0, B.ptr, k if transpB else n, 0, 0.0,
+		out.ptr, n, offset.ctypes.data
+	)
+
+	return out
+
+
 def unittest():
 	A = CPUArray.toDevice(np.random.randn(5, 3).astype(np.float32))
 	B = CPUArray.toDevice(np.random.randn(3, 4).astype(np.float32))
@@ -53,6 +82,24 @@ def unittest():
 	G = mulMatrixOnMatrix(F, B, transpA=True)
 	assert np.allclose(np.dot(F.get().T, B.get()), G.get())
 
+	hostA = np.random.randn(9, 17).astype(np.float16)
+	hostB = np.random.randn(5, 17).astype(np.float32)
+
+	C = mulMatrixOnMatrix(CPUArray.toDevice(hostA), CPUArray.toDevice(hostB.astype(np.float16)), transpB=True)
+	assert C.dtype == np.float16
+
+	hostC = np.dot(hostA.astype(np.float32), hostB.astype(np.float16).astype(np.float32).T)
+	assert np.allclose(hostC, C.get(), atol=1e-2)
+
+	hostA = np.random.randint(-127, 128, size=(7, 33), dtype=np.int8)
+	hostB = np.random.randint(-127, 128, size=(5, 33), dtype=np.int8)
+
+	C = mulInt8MatrixOnMatrix(CPUArray.toDevice(hostA), CPUArray.toDevice(hostB), transpB=True)
+	assert (np.dot(hostA.astype(np.int32), hostB.astype(np.int32).T) == C.get()).all()
+
+	C = mulInt8MatrixOnMatrix(CPUArray.toDevice(hostA), CPUArray.toDevice(np.ascontiguousarray(hostB.T)))
+	assert (np.dot(hostA.astype(np.int32), hostB.astype(np.int32).T) == C.get()).all()
+
 
 if __name__ == "__main__":
 	unittest()
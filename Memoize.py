@@ -0,0 +1,196 @@
+import time, weakref, threading
+from collections import OrderedDict
+from functools import update_wrapper
+
+from PuzzleLib import Config
+
+
+caches = weakref.WeakSet()
+
+
+class MemoizeCache:
+	def __init__(self, fn, capacity=None, keyfn=None):
+		assert capacity is None or capacity > 0
+		update_wrapper(self, fn)
+
+		self.fn, self.capacity, self.keyfn = fn, capacity, keyfn
+
+		self.cache = OrderedDict()
+		self.lock = threading.RLock()
+
+		self.hits, self.misses, self.evictions = 0, 0, 0
+		self.compileTime = 0.0
+
+		caches.add(self)
+
+
+	@property
+	def limit(self):
+		return self.capacity if self.capacity is not None else Config.kernelCacheCapacity
+
+
+	def __call__(self, *args):
+		key = args if self.keyfn is None else self.keyfn(args)
+
+		with self.lock:
+			obj = self.cache.get(key, None)
+			if obj is None:
+				self.misses += 1
+				return self.insert(key, args)
+
+			self.hits += 1
+			self.cache.move_to_end(key)
+
+			return obj
+
+
+	def insert(self, key, args):
+		with self.lock:
+			start = time.perf_counter()
+			obj = self.fn(*args)
+
+			self.compileTime += time.perf_counter() - start
+			self.cache[key] = obj
+
+			limit = self.limit
+
+			while limit is not None and len(self.cache) > limit:
+				self.cache.popitem(last=False)
+				self.evictions += 1
+
+			return obj
+
+
+	def populate(self, *argsets):
+		for args in argsets:
+			args = args if isinstance(args, tuple) else (args, )
+			key = args if self.keyfn is None else self.keyfn(args)
+
+			with self.lock:
+				if key not in self.cache:
+					self.insert(key, args)
+
+
+	def clear(self):
+		with self.lock:
+			self.cache.clear()
+
+			self.hits, self.misses, self.evictions = 0, 0, 0
+			self.compileTime = 0.0
+
+
+	def stats(self):
+		with self.lock:
+			return {
+				"entries": len(self.cache), "capacity": self.limit, "hits": self.hits, "misses": self.misses,
+				"evictions": self.evictions, "compileTime": self.compileTime
+			}
+
+
+	def __len__(self):
+		return len(self.cache)
+
+
+	def __contains__(self, args):
+		args = args if isinstance(args, tuple) else (args, )
+		return (args if self.keyfn is None else self.keyfn(args)) in self.cache
+
+
+def memoize(fn=None, capacity=None, keyfn=None):
+	if fn is None:
+		return lambda func: MemoizeCache(func, capacity, keyfn)
+
+	return MemoizeCache(fn, capacity, keyfn)
+
+
+def cacheStats():
+	return {"%s.%s" % (cache.__module__, cache.__qualname__): cache.stats() for cache in caches}
+
+
+def clearCaches():
+	for cache in caches:
+		cache.clear()
+
+
+def unittest():
+	lruTest()
+	populateTest()
+	defaultCapacityTest()
+	threadTest()
+
+
+def lruTest():
+	calls = []
+
+	@memoize(capacity=2)
+	def square(x):
+		calls.append(x)
+		return x * x
+
+	assert square(2) == 4 and square(3) == 9 and square(2) == 4
+	assert calls == [2, 3]
+
+	square(4)
+	assert 3 not in square and 2 in square and 4 in square
+
+	stats = square.stats()
+	assert stats["entries"] == 2 and stats["hits"] == 1 and stats["misses"] == 3 and stats["evictions"] == 1
+	assert stats["compileTime"] > 0.0
+
+	assert "%s.%s" % (square.__module__, square.__qualname__) in cacheStats()
+
+	square.clear()
+	assert len(square) == 0 and square.stats()["misses"] == 0
+
+
+def populateTest():
+	@memoize
+	def add(x, y):
+		return x + y
+
+	add.populate((1, 2), (3, 4))
+	assert len(add) == 2 and (1, 2) in add
+
+	assert add(1, 2) == 3
+	assert add.stats()["hits"] == 1 and add.stats()["misses"] == 0
+
+	clearCaches()
+	assert len(add) == 0
+
+
+def defaultCapacityTest():
+	@memoize
+	def identity(x):
+		return x
+
+	capacity = Config.kernelCacheCapacity
+	Config.kernelCacheCapacity = 4
+
+	try:
+		for i in range(10):
+			identity(i)
+
+		assert len(identity) == 4 and identity.stats()["evictions"] == 6 and identity.stats()["capacity"] == 4
+
+	finally:
+		Config.kernelCacheCapacity = capacity
+
+
+def threadTest():
+	from concurrent.futures import ThreadPoolExecutor
+
+	@memoize(capacity=8)
+	def square(x):
+		return x * x
+
+	with ThreadPoolExecutor(max_workers=8) as pool:
+		results = list(pool.map(lambda i: square(i % 16), range(10000)))
+
+	assert results == [(i % 16)**2 for i in range(10000)]
+
+	stats = square.stats()
+	assert stats["entries"] == 8 and stats["hits"] + stats["misses"] == 10000
+
+
+if __name__ == "__main__":
+	unittest()
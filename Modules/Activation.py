@@ -85,7 +85,11 @@ class Activation(Module):
 
 
 	def calcMode(self, T):
-		if Config.backend == Config.Backend.cuda:
+		if Config.isCPUBased(Config.backend):
+			if T not in (np.float16, np.float32, np.uint16):
+				raise ModuleError("Unsupported dtype %s" % T)
+
+		elif Config.backend == Config.Backend.cuda:
 			if T not in {np.float16, np.float32}:
 				raise ModuleError("Unsupported dtype %s" % T)
 
@@ -137,6 +141,11 @@ def unittest():
 		for acttype, hostAct in actFuncs.items():
 			actTest(acttype, hostAct, dtype, atol)
 
+	if Config.isCPUBased(Config.backend):
+		for acttype, hostAct in actFuncs.items():
+			actTest(acttype, hostAct, np.float16, 1e-2)
+			bfloat16Test(acttype, hostAct)
+
 
 def actTest(devAct, hostAct, dtype, atol):
 	act = Activation(devAct)
@@ -161,5 +170,27 @@ def actTest(devAct, hostAct, dtype, atol):
 	assert np.allclose(hostInGrad, act.grad.get(), atol=atol)
 
 
+def bfloat16Test(devAct, hostAct):
+	from PuzzleLib.CPU.Kernels.Half import bfloat16, cast
+
+	act = Activation(devAct)
+	act.calcMode(bfloat16)
+
+	data = cast(gpuarray.to_gpu(np.random.randn(11, 51).astype(np.float32)), bfloat16)
+	act(data)
+
+	grad = cast(gpuarray.to_gpu(np.random.randn(*act.data.shape).astype(np.float32)), bfloat16)
+	act.backward(grad)
+
+	assert act.data.dtype == bfloat16 and act.grad.dtype == bfloat16
+	hostData, hostGrad = cast(data, np.float32).get(), cast(grad, np.float32).get()
+
+	hostActFwd, hostActBwd = hostAct
+	outdata = cast(act.data, np.float32).get()
+
+	assert np.allclose(hostActFwd(hostData), outdata, atol=2e-2, rtol=1e-2)
+	assert np.allclose(hostActBwd(hostGrad, outdata), cast(act.grad, np.float32).get(), atol=2e-2, rtol=1e-2)
+
+
 if __name__ == "__main__":
 	unittest()
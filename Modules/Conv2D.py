@@ -81,6 +81,9 @@ class Conv2D(ConvND):
 
 
 def unittest():
+	if Config.backend == Config.Backend.cpu:
+		halfTest()
+
 	oneMapTest()
 	multiOutMapsTest()
 	multiInMapsTest()
@@ -178,6 +181,27 @@ def multiInMapsTest():
 	assert np.allclose(hostOutData, conv.data.get())
 
 
+def halfTest():
+	batchsize, inmaps, h, w = 2, 3, 8, 8
+	outmaps, size = 4, 3
+
+	hostData = np.random.randn(batchsize, inmaps, h, w).astype(np.float32)
+
+	conv = Conv2D(inmaps, outmaps, size, pad=1, initscheme="gaussian")
+	conv.b.set(np.random.randn(*conv.b.shape).astype(np.float32))
+
+	conv(gpuarray.to_gpu(hostData))
+	hostOutData = conv.data.get()
+
+	conv.calcMode(np.float16)
+	assert conv.W.dtype == np.float16
+
+	conv(gpuarray.to_gpu(hostData.astype(np.float16)))
+
+	assert conv.data.dtype == np.float16
+	assert np.allclose(hostOutData, conv.data.get(), atol=5e-2, rtol=1e-2)
+
+
 def multiMapsWithPadsTest():
 	batchsize, inmaps, h, w = 3, 4, 3, 3
 	outmaps, size, stride, pad, dilation = 4, 3, 2, 2, 2
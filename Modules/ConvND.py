@@ -104,7 +104,7 @@ class ConvND(Module):
 
 
 	def calcMode(self, T):
-		if Config.backend == Config.Backend.cuda:
+		if Config.backend in {Config.Backend.cuda, Config.Backend.cpu}:
 			if self.calctype == T:
 				return
 
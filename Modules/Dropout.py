@@ -21,7 +21,9 @@ class Dropout(Module):
 		self.partition = None
 
 		self.rng = rng
+
 		self.rands = None
+		self.offset = None
 
 		self.slice = slicing
 
@@ -45,17 +47,23 @@ class Dropout(Module):
 				np.float16: np.uint16
 			}[data.dtype.type]
 
-			intsize = np.dtype(np.uint32).itemsize
+			p = 1.0 - self.p
+			self.partition = int(p * np.iinfo(parttype).max)
 
-			nbytes = (data.nbytes + intsize - 1) // intsize * intsize
-			self.rands = gpuarray.empty((nbytes // np.dtype(parttype).itemsize, ), dtype=parttype, allocator=memPool)
+			if Config.isCPUBased(Config.backend):
+				self.offset = self.rng.reserve(data.size)
+				self.rng.dropout(self.data, data, self.offset, self.partition, p, slice=self.slice)
 
-			self.rng.fillInteger(self.rands.view(np.uint32))
+			else:
+				intsize = np.dtype(np.uint32).itemsize
 
-			p = 1.0 - self.p
-			self.partition = int(p * np.iinfo(parttype).max)
+				nbytes = (data.nbytes + intsize - 1) // intsize * intsize
+				self.rands = gpuarray.empty(
+					(nbytes // np.dtype(parttype).itemsize, ), dtype=parttype, allocator=memPool
+				)
 
-			dropoutKer(data.dtype)(self.data, data, self.rands, self.partition, np.float32(p), slice=self.slice)
+				self.rng.fillInteger(self.rands.view(np.uint32))
+				dropoutKer(data.dtype)(self.data, data, self.rands, self.partition, np.float32(p), slice=self.slice)
 
 		else:
 			self.data = data
@@ -71,7 +79,10 @@ class Dropout(Module):
 				else:
 					self.grad = gpuarray.empty(grad.shape, dtype=grad.dtype, allocator=memPool)
 
-			dropoutKer(grad.dtype)(self.grad, grad, self.rands, self.partition, 1.0 - self.p, slice=self.slice)
+			if Config.isCPUBased(Config.backend):
+				self.rng.dropout(self.grad, grad, self.offset, self.partition, 1.0 - self.p, slice=self.slice)
+			else:
+				dropoutKer(grad.dtype)(self.grad, grad, self.rands, self.partition, 1.0 - self.p, slice=self.slice)
 
 		else:
 			self.grad = grad
@@ -88,7 +99,7 @@ class Dropout(Module):
 
 	def reset(self):
 		super().reset()
-		self.rands = None
+		self.rands, self.offset = None, None
 
 
 	def calcMode(self, T):
@@ -116,7 +127,14 @@ def dropoutTest(dtype):
 
 	dropout(data)
 
-	hostRands = dropout.rands.get()[:data.size].reshape(data.shape)
+	if Config.isCPUBased(Config.backend):
+		rands = gpuarray.empty(data.shape, dtype=np.uint32)
+		dropout.rng.fillInteger(rands, offset=dropout.offset)
+
+		hostRands = rands.get()
+
+	else:
+		hostRands = dropout.rands.get()[:data.size].reshape(data.shape)
 
 	hostOutData = hostData * (hostRands < dropout.partition) / (1.0 - dropout.p)
 	assert np.allclose(hostOutData, dropout.data.get())
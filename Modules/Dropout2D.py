@@ -1,5 +1,7 @@
 import numpy as np
 
+from PuzzleLib import Config
+
 from PuzzleLib.Backend import gpuarray
 from PuzzleLib.Backend.Utils import dtypesSupported, globalRng, copy, memoryPool as memPool
 from PuzzleLib.Backend.Kernels.ElementWise import dropout2dKer
@@ -31,18 +33,26 @@ class Dropout2D(Dropout):
 				np.float16: np.uint16
 			}[data.dtype.type]
 
-			intsize = np.dtype(np.uint32).itemsize
-			itemsize = np.dtype(parttype).itemsize
+			p = 1.0 - self.p
+			self.partition = int(p * np.iinfo(parttype).max)
 
-			nbytes = (batchsize * maps * itemsize + intsize - 1) // intsize * intsize
-			self.rands = gpuarray.empty((nbytes // itemsize, ), dtype=parttype, allocator=memPool)
+			if Config.isCPUBased(Config.backend):
+				self.offset = self.rng.reserve(batchsize * maps)
+				self.rng.dropout(
+					self.data, data, self.offset, self.partition, p, mapsize=self.mapsize, slice=self.slice
+				)
 
-			self.rng.fillInteger(self.rands.view(np.uint32))
+			else:
+				intsize = np.dtype(np.uint32).itemsize
+				itemsize = np.dtype(parttype).itemsize
 
-			p = 1.0 - self.p
-			self.partition = int(p * np.iinfo(parttype).max)
+				nbytes = (batchsize * maps * itemsize + intsize - 1) // intsize * intsize
+				self.rands = gpuarray.empty((nbytes // itemsize, ), dtype=parttype, allocator=memPool)
 
-			dropout2dKer(data.dtype)(self.data, data, self.rands, self.partition, p, self.mapsize, slice=self.slice)
+				self.rng.fillInteger(self.rands.view(np.uint32))
+				dropout2dKer(data.dtype)(
+					self.data, data, self.rands, self.partition, p, self.mapsize, slice=self.slice
+				)
 
 		else:
 			self.data = data
@@ -58,7 +68,10 @@ class Dropout2D(Dropout):
 				else:
 					self.grad = gpuarray.empty(grad.shape, dtype=grad.dtype, allocator=memPool)
 
-			dropout2dKer(grad.dtype)(self.grad, grad, self.rands, self.partition, 1.0 - self.p, self.mapsize)
+			if Config.isCPUBased(Config.backend):
+				self.rng.dropout(self.grad, grad, self.offset, self.partition, 1.0 - self.p, mapsize=self.mapsize)
+			else:
+				dropout2dKer(grad.dtype)(self.grad, grad, self.rands, self.partition, 1.0 - self.p, self.mapsize)
 
 		else:
 			self.grad = grad
@@ -80,7 +93,14 @@ def dropout2dTest(dtype):
 
 	dropout2d(data)
 
-	hostRands = dropout2d.rands.get()[:batchsize * maps].reshape(batchsize, maps)[:, :, np.newaxis, np.newaxis]
+	if Config.isCPUBased(Config.backend):
+		rands = gpuarray.empty((batchsize, maps, 1, 1), dtype=np.uint32)
+		dropout2d.rng.fillInteger(rands, offset=dropout2d.offset)
+
+		hostRands = rands.get()
+
+	else:
+		hostRands = dropout2d.rands.get()[:batchsize * maps].reshape(batchsize, maps)[:, :, np.newaxis, np.newaxis]
 
 	hostOutData = hostData * (hostRands < dropout2d.partition) / (1.0 - dropout2d.p)
 	assert np.allclose(hostOutData, dropout2d.data.get())
@@ -14,7 +14,7 @@ from PuzzleLib.Modules.Module import ModuleError, Module
 
 class Embedder(Module):
 	def __init__(self, vocabulary, sentlength, embsize, onVocabulary=None, initscheme="uniform", wscale=1.0,
-				 learnable=True, name=None):
+				 learnable=True, sparseUpdates=False, name=None):
 		super().__init__(name)
 		args = dict(locals())
 
@@ -25,6 +25,9 @@ class Embedder(Module):
 		self.learnable = learnable
 		self.outgrad = None
 
+		self.sparseUpdates = sparseUpdates
+		self.gradRows = None
+
 		dt = h5py.special_dtype(vlen=str)
 
 		if isinstance(vocabulary, dict):
@@ -56,7 +59,7 @@ class Embedder(Module):
 			onVocabulary(W)
 
 		self.W = None
-		self.setVar("W", Variable(gpuarray.to_gpu(W)))
+		self.setVar("W", Variable(gpuarray.to_gpu(W), rowSparse=sparseUpdates))
 
 		self.loadVarHook = self.checkVarOnLoad
 		self.loadAttrHook = self.checkAttrOnLoad
@@ -67,7 +70,7 @@ class Embedder(Module):
 			if dataset.shape[1] != self.embsize:
 				raise ModuleError("Expected embedding size %s, was given %s" % (self.embsize, dataset.shape[1]))
 
-			self.setVar("W", Variable(gpuarray.to_gpu(dataset)))
+			self.setVar("W", Variable(gpuarray.to_gpu(dataset), rowSparse=self.sparseUpdates))
 
 		else:
 			raise ModuleError("Unknown parameter name '%s' for embedder" % paramName)
@@ -114,10 +117,30 @@ class Embedder(Module):
 
 	def accGradParams(self, grad, scale=1.0, momentum=0.0):
 		self.outgrad = grad
-		self.vars["W"].grad.fill(0.0)
+		var = self.vars["W"]
+
+		self.zeroGradRows(var)
 
 		if self.learnable:
-			embedBackwardParams(self.inData, grad, self.vars["W"].grad, scale)
+			embedBackwardParams(self.inData, grad, var.grad, scale)
+
+			if self.sparseUpdates:
+				rows = np.unique(self.inData.get())
+				self.gradRows = rows[rows != -1].astype(np.int32)
+
+				if var.rowSparse:
+					var.rows = self.gradRows
+
+
+	def zeroGradRows(self, var):
+		if self.gradRows is None:
+			var.grad.fill(0.0)
+
+		elif self.gradRows.shape[0] > 0:
+			indices = gpuarray.to_gpu(self.gradRows.reshape(1, -1))
+			embedBackwardParams(indices, embed(indices, var.grad), var.grad, -1.0)
+
+		self.gradRows = None
 
 
 	def updateParams(self, learnRate):
@@ -1,7 +1,7 @@
 import numpy as np
 
 from PuzzleLib.Backend import gpuarray
-from PuzzleLib.Backend.Utils import memoryPool as memPool
+from PuzzleLib.Backend.Kernels.TopK import topk, topkBackward
 
 from PuzzleLib.Modules.Module import ModuleError, Module
 
@@ -16,58 +16,12 @@ class KMaxPool(Module):
 		self.indices = None
 
 
-	@staticmethod
-	def sliceAlongAxis(ary, axis, start, end):
-		ary = np.rollaxis(ary, axis)[start:end]
-		return np.rollaxis(ary, 0, axis + 1)
-
-
-	@staticmethod
-	def getIndicesSlice(ary, axis, indices):
-		tup = ()
-
-		for i in range(ary.ndim):
-			if i == axis:
-				tup += (indices, )
-			else:
-				shape = tuple([None] * i + [slice(None)] + [None] * (ary.ndim - 1 - i))
-				r = np.arange(ary.shape[i])[shape]
-
-				tup += (r, )
-
-		return tup
-
-
-	def sliceWithIndicesAlongAxis(self, ary, axis, indices):
-		return ary[self.getIndicesSlice(ary, axis, indices)]
-
-
-	def fillSliceWithIndicesAlongAxis(self, ary, axis, indices, data):
-		ary[self.getIndicesSlice(ary, axis, indices)] = data
-
-
 	def updateData(self, data):
-		data = data.get()
-
-		indices = np.argpartition(data, -self.topk, axis=self.axis)
-		indices = self.sliceAlongAxis(indices, self.axis, -self.topk, None)
-
-		topkData = self.sliceWithIndicesAlongAxis(data, self.axis, indices)
-
-		topkIndices = np.argsort(topkData, axis=self.axis)
-		topkData = self.sliceWithIndicesAlongAxis(topkData, self.axis, topkIndices)
-
-		self.indices = self.sliceWithIndicesAlongAxis(indices, self.axis, topkIndices)
-		self.data = gpuarray.to_gpu(topkData, allocator=memPool)
+		self.data, self.indices = topk(data, self.topk, self.axis)
 
 
 	def updateGrad(self, grad):
-		grad = grad.get()
-
-		ingrad = np.zeros(self.inData.shape, dtype=np.float32)
-		self.fillSliceWithIndicesAlongAxis(ingrad, self.axis, self.indices, grad)
-
-		self.grad = gpuarray.to_gpu(ingrad, allocator=memPool)
+		self.grad = topkBackward(grad, self.indices, self.axis, self.inData.shape[self.axis])
 
 
 	def checkDataShape(self, shape):
@@ -92,7 +46,7 @@ class KMaxPool(Module):
 
 
 	def gradShapeFrom(self, shape):
-		return shape[:self.axis] + self.inData.shape[self.axis] + shape[self.axis + 1:]
+		return shape[:self.axis] + (self.inData.shape[self.axis], ) + shape[self.axis + 1:]
 
 
 def unittest():
@@ -127,6 +81,7 @@ def unittest():
 	hostInGrad[tup] = hostGrad
 
 	assert np.allclose(hostInGrad, kmaxpool.grad.get())
+	assert np.all(kmaxpool.indices.get() == hostIndices)
 
 
 if __name__ == "__main__":
@@ -22,7 +22,7 @@ class LCN(LRN):
 
 		self.includePad = includePad
 
-		if Config.backend != Config.Backend.cuda:
+		if Config.backend == Config.Backend.opencl:
 			assert includePad == True
 			self.mode = PoolMode.avg
 			self.gradUsesOutData = True
@@ -62,6 +62,11 @@ class LCN(LRN):
 
 
 def unittest():
+	padTest()
+	noPadTest()
+
+
+def padTest():
 	batchsize, maps, h, w = 1, 1, 5, 5
 	data = gpuarray.to_gpu(np.random.randn(batchsize, maps, h, w).astype(np.float32))
 
@@ -146,5 +151,26 @@ def unittest():
 	assert np.allclose(hostInGrad[:, :, hpad:-hpad, wpad:-wpad], lcn.grad.get(), atol=1e-4)
 
 
+def noPadTest():
+	if Config.backend == Config.Backend.opencl:
+		return
+
+	batchsize, maps, h, w = 2, 3, 6, 7
+	data = gpuarray.to_gpu(np.random.randn(batchsize, maps, h, w).astype(np.float32))
+
+	lcn = LCN(N=3, includePad=False)
+	lcn(data)
+
+	hostData = data.get()
+	hostMeans = np.empty(hostData.shape, dtype=np.float32)
+
+	for y in range(h):
+		for x in range(w):
+			window = hostData[:, :, max(0, y - 1):y + 2, max(0, x - 1):x + 2]
+			hostMeans[:, :, y, x] = np.mean(window, axis=(2, 3))
+
+	assert np.allclose(hostMeans, lcn.means.get(), atol=1e-6)
+
+
 if __name__ == "__main__":
 	unittest()
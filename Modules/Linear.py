@@ -88,15 +88,24 @@ class Linear(Module):
 
 
 	def calcMode(self, T):
-		if Config.backend == Config.Backend.cuda:
+		if Config.backend == Config.Backend.cuda or Config.isCPUBased(Config.backend):
 			if self.calctype == T:
 				return
 
+			if Config.isCPUBased(Config.backend):
+				from PuzzleLib.CPU.Kernels.Half import cast
+
+			elif T == np.uint16:
+				raise ModuleError("Unsupported dtype %s" % T)
+
+			else:
+				cast = lambda tensor, dtype: tensor.astype(dtype)
+
 			variables = self.vars
 			self.vars = {}
 
 			for varName, var in variables.items():
-				self.setVar(varName, Variable(var.data.astype(T), name=var.name, grad=var.grad.astype(T)))
+				self.setVar(varName, Variable(cast(var.data, T), name=var.name, grad=cast(var.grad, T)))
 
 			self.calctype = T
 
@@ -109,6 +118,12 @@ def unittest():
 		calcTest(dtype, atol)
 		trainTest(dtype)
 
+	if Config.isCPUBased(Config.backend):
+		calcTest(np.float16, 1e-2)
+		trainTest(np.float16)
+
+		bfloat16Test()
+
 
 def calcTest(dtype, atol):
 	insize, outsize = 5, 1
@@ -170,5 +185,40 @@ def trainTest(dtype):
 			print("Iteration #%d error: %s" % (i + 1, error))
 
 
+def bfloat16Test():
+	from PuzzleLib.CPU.Kernels.Half import bfloat16, cast
+
+	insize, outsize = 20, 10
+
+	data = gpuarray.to_gpu(np.random.randn(8, insize).astype(np.float32))
+	grad = gpuarray.to_gpu(np.random.randn(8, outsize).astype(np.float32))
+
+	linear = Linear(insize, outsize)
+	linear.b.set(np.random.randn(outsize).astype(np.float32))
+
+	linear.calcMode(bfloat16)
+	assert linear.W.dtype == bfloat16 and linear.b.dtype == bfloat16
+
+	linear(cast(data, bfloat16))
+	linear.backward(cast(grad, bfloat16))
+
+	hostData, hostGrad = cast(cast(data, bfloat16), np.float32).get(), cast(cast(grad, bfloat16), np.float32).get()
+	hostW, hostBias = cast(linear.W, np.float32).get(), cast(linear.b, np.float32).get()
+
+	assert linear.data.dtype == bfloat16 and linear.grad.dtype == bfloat16
+
+	outdata, ingrad = cast(linear.data, np.float32).get(), cast(linear.grad, np.float32).get()
+	hostOutData, hostInGrad = np.dot(hostData, hostW) + hostBias, np.dot(hostGrad, hostW.T)
+
+	assert np.allclose(hostOutData, outdata, atol=5e-2, rtol=1e-2)
+	assert np.allclose(hostInGrad, ingrad, atol=5e-2, rtol=1e-2)
+
+	hostBiasGrad = cast(linear.vars["b"].grad, np.float32).get()
+	assert np.allclose(np.sum(hostGrad, axis=0), hostBiasGrad, atol=5e-2, rtol=1e-2)
+
+	linear.updateParams(1e-1)
+	assert np.allclose(hostBias + 1e-1 * hostBiasGrad, cast(linear.b, np.float32).get(), atol=5e-2, rtol=1e-2)
+
+
 if __name__ == "__main__":
 	unittest()
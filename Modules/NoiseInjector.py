@@ -36,6 +36,7 @@ class NoiseInjector(Module):
 		self.slice = slicing
 
 		self.rands = None
+		self.offset = None
 
 		self.inplace = inplace
 		if inplace and Config.showWarnings:
@@ -44,22 +45,25 @@ class NoiseInjector(Module):
 
 	def updateData(self, data):
 		if self.train:
-			size = data.size if data.size % 2 == 0 else data.size + 1
-			rands = gpuarray.empty((size, ), dtype=np.float32, allocator=memPool)
+			if Config.isCPUBased(Config.backend):
+				self.offset = self.rng.reserve(data.size)
+			else:
+				size = data.size if data.size % 2 == 0 else data.size + 1
+				rands = gpuarray.empty((size, ), dtype=np.float32, allocator=memPool)
 
-			if self.type == NoiseType.uniform:
-				a, b = self.params
-				fillUniform(rands, a, b, self.rng)
+				if self.type == NoiseType.uniform:
+					a, b = self.params
+					fillUniform(rands, a, b, self.rng)
 
-			elif self.type == NoiseType.gaussian:
-				mean, sigma = self.params
-				fillNormal(rands, mean, sigma, self.rng)
+				elif self.type == NoiseType.gaussian:
+					mean, sigma = self.params
+					fillNormal(rands, mean, sigma, self.rng)
 
-			else:
-				raise NotImplementedError(self.type)
+				else:
+					raise NotImplementedError(self.type)
 
-			self.rands = rands if data.dtype == np.float32 else rands.astype(data.dtype)
-			self.rands = self.rands[:data.size].reshape(data.shape)
+				self.rands = rands if data.dtype == np.float32 else rands.astype(data.dtype)
+				self.rands = self.rands[:data.size].reshape(data.shape)
 
 			if self.inplace:
 				self.data = data
@@ -69,7 +73,10 @@ class NoiseInjector(Module):
 				else:
 					self.data = gpuarray.empty(data.shape, dtype=data.dtype, allocator=memPool)
 
-			if self.mode == InjectMode.add:
+			if Config.isCPUBased(Config.backend):
+				self.inject(self.data, data, slice=self.slice)
+
+			elif self.mode == InjectMode.add:
 				addKer(data.dtype)(self.data, data, 1, self.rands, 1, slice=self.slice)
 			elif self.mode == InjectMode.mul:
 				mulKer(data.dtype)(self.data, data, self.rands, slice=self.slice)
@@ -80,6 +87,13 @@ class NoiseInjector(Module):
 			self.data = data
 
 
+	def inject(self, outdata, indata, slice=None):
+		a, b = self.params
+		normal, mul = self.type == NoiseType.gaussian, self.mode == InjectMode.mul
+
+		self.rng.inject(outdata, indata, self.offset, a, b, normal, mul, slice=slice)
+
+
 	def updateGrad(self, grad):
 		if self.mode == InjectMode.mul:
 			if self.inplace:
@@ -90,7 +104,10 @@ class NoiseInjector(Module):
 				else:
 					self.grad = gpuarray.empty(grad.shape, dtype=grad.dtype, allocator=memPool)
 
-			mulKer(grad.dtype)(self.grad, grad, self.rands, slice=self.slice)
+			if Config.isCPUBased(Config.backend):
+				self.inject(self.grad, grad, slice=self.slice)
+			else:
+				mulKer(grad.dtype)(self.grad, grad, self.rands, slice=self.slice)
 
 		elif self.mode == InjectMode.add:
 			if self.inplace:
@@ -112,7 +129,7 @@ class NoiseInjector(Module):
 
 	def reset(self):
 		super().reset()
-		self.rands = None
+		self.rands, self.offset = None, None
 
 
 	def calcMode(self, T):
@@ -139,23 +156,33 @@ def noiseInjectorTest(dtype):
 	injector.calcMode(dtype)
 
 	injector(data)
-	assert np.allclose(injector.data.get(), hostData * injector.rands.get())
+	assert np.allclose(injector.data.get(), hostData * hostNoise(injector, data.shape))
 
 	hostGrad = np.random.randn(*data.shape).astype(dtype)
 	grad = gpuarray.to_gpu(hostGrad)
 
 	injector.backward(grad)
-	assert np.allclose(injector.grad.get(), hostGrad * injector.rands.get())
+	assert np.allclose(injector.grad.get(), hostGrad * hostNoise(injector, data.shape))
 
 	injector = NoiseInjector(mode="add", noisetype="gaussian", params=(0.0, 1.0))
 	injector.calcMode(dtype)
 
 	injector(data)
-	assert np.allclose(injector.data.get(), hostData + injector.rands.get())
+	assert np.allclose(injector.data.get(), hostData + hostNoise(injector, data.shape))
 
 	injector.backward(grad)
 	assert np.allclose(injector.grad.get(), hostGrad)
 
 
+def hostNoise(injector, shape):
+	if Config.isCPUBased(Config.backend):
+		rands = gpuarray.empty(shape, dtype=np.float32)
+		injector.rng.fill(rands, *injector.params, injector.type == NoiseType.gaussian, injector.offset)
+
+		return rands.get()
+
+	return injector.rands.get()
+
+
 if __name__ == "__main__":
 	unittest()
@@ -1,59 +1,64 @@
-from PuzzleLib.Modules.Activation import Activation, ActivationType, sigmoid, tanh, relu, leakyRelu, elu, softPlus, clip
-from PuzzleLib.Modules.Add import Add
-from PuzzleLib.Modules.AvgPool1D import AvgPool1D
-from PuzzleLib.Modules.AvgPool2D import AvgPool2D
-from PuzzleLib.Modules.AvgPool3D import AvgPool3D
-from PuzzleLib.Modules.BatchNorm import BatchNorm
-from PuzzleLib.Modules.BatchNorm1D import BatchNorm1D
-from PuzzleLib.Modules.BatchNorm2D import BatchNorm2D
-from PuzzleLib.Modules.BatchNorm3D import BatchNorm3D
-from PuzzleLib.Modules.Cast import Cast, DataType
-from PuzzleLib.Modules.Concat import Concat
-from PuzzleLib.Modules.Conv1D import Conv1D
-from PuzzleLib.Modules.Conv2D import Conv2D
-from PuzzleLib.Modules.Conv3D import Conv3D
-from PuzzleLib.Modules.CrossMapLRN import CrossMapLRN
-from PuzzleLib.Modules.Deconv1D import Deconv1D
-from PuzzleLib.Modules.Deconv2D import Deconv2D
-from PuzzleLib.Modules.Deconv3D import Deconv3D
-from PuzzleLib.Modules.DepthConcat import DepthConcat
-from PuzzleLib.Modules.Dropout import Dropout
-from PuzzleLib.Modules.Dropout2D import Dropout2D
-from PuzzleLib.Modules.Embedder import Embedder
-from PuzzleLib.Modules.Flatten import Flatten
-from PuzzleLib.Modules.Glue import Glue
-from PuzzleLib.Modules.GroupLinear import GroupLinear, GroupMode
-from PuzzleLib.Modules.Identity import Identity
-from PuzzleLib.Modules.InstanceNorm2D import InstanceNorm2D
-from PuzzleLib.Modules.KMaxPool import KMaxPool
-from PuzzleLib.Modules.LCN import LCN
-from PuzzleLib.Modules.Linear import Linear
-from PuzzleLib.Modules.MapLRN import MapLRN
-from PuzzleLib.Modules.MaxPool1D import MaxPool1D
-from PuzzleLib.Modules.MaxPool2D import MaxPool2D
-from PuzzleLib.Modules.MaxPool3D import MaxPool3D
-from PuzzleLib.Modules.MaxUnpool2D import MaxUnpool2D
-from PuzzleLib.Modules.Module import Module, ModuleError, InitScheme, MemoryUnit
-from PuzzleLib.Modules.MoveAxis import MoveAxis
-from PuzzleLib.Modules.Mul import Mul
-from PuzzleLib.Modules.MulAddConst import MulAddConst
-from PuzzleLib.Modules.NoiseInjector import NoiseInjector, InjectMode, NoiseType
-from PuzzleLib.Modules.Pad1D import Pad1D
-from PuzzleLib.Modules.Pad2D import Pad2D, PadMode
-from PuzzleLib.Modules.Penalty import Penalty, PenaltyMode
-from PuzzleLib.Modules.PRelu import PRelu
-from PuzzleLib.Modules.Replicate import Replicate
-from PuzzleLib.Modules.Reshape import Reshape
-from PuzzleLib.Modules.RNN import RNN, RNNMode, DirectionMode, WeightModifier
-from PuzzleLib.Modules.Slice import Slice
-from PuzzleLib.Modules.SoftMax import SoftMax
-from PuzzleLib.Modules.SpatialTf import SpatialTf
-from PuzzleLib.Modules.Split import Split
-from PuzzleLib.Modules.SubtractMean import SubtractMean
-from PuzzleLib.Modules.Sum import Sum
-from PuzzleLib.Modules.SwapAxes import SwapAxes
-from PuzzleLib.Modules.Tile import Tile
-from PuzzleLib.Modules.ToList import ToList
-from PuzzleLib.Modules.Transpose import Transpose
-from PuzzleLib.Modules.Upsample2D import Upsample2D, UpsampleMode
-from PuzzleLib.Modules.Upsample3D import Upsample3D
+from PuzzleLib.Backend.Lazy import lazyPackage
+
+
+__all__ = lazyPackage(__name__, {
+	"Activation": ["Activation", "ActivationType", "sigmoid", "tanh", "relu", "leakyRelu", "elu", "softPlus", "clip"],
+	"Add": ["Add"],
+	"AvgPool1D": ["AvgPool1D"],
+	"AvgPool2D": ["AvgPool2D"],
+	"AvgPool3D": ["AvgPool3D"],
+	"BatchNorm": ["BatchNorm"],
+	"BatchNorm1D": ["BatchNorm1D"],
+	"BatchNorm2D": ["BatchNorm2D"],
+	"BatchNorm3D": ["BatchNorm3D"],
+	"Cast": ["Cast", "DataType"],
+	"Concat": ["Concat"],
+	"Conv1D": ["Conv1D"],
+	"Conv2D": ["Conv2D"],
+	"Conv3D": ["Conv3D"],
+	"CrossMapLRN": ["CrossMapLRN"],
+	"Deconv1D": ["Deconv1D"],
+	"Deconv2D": ["Deconv2D"],
+	"Deconv3D": ["Deconv3D"],
+	"DepthConcat": ["DepthConcat"],
+	"Dropout": ["Dropout"],
+	"Dropout2D": ["Dropout2D"],
+	"Embedder": ["Embedder"],
+	"Flatten": ["Flatten"],
+	"Glue": ["Glue"],
+	"GroupLinear": ["GroupLinear", "GroupMode"],
+	"Identity": ["Identity"],
+	"InstanceNorm2D": ["InstanceNorm2D"],
+	"KMaxPool": ["KMaxPool"],
+	"LCN": ["LCN"],
+	"Linear": ["Linear"],
+	"MapLRN": ["MapLRN"],
+	"MaxPool1D": ["MaxPool1D"],
+	"MaxPool2D": ["MaxPool2D"],
+	"MaxPool3D": ["MaxPool3D"],
+	"MaxUnpool2D": ["MaxUnpool2D"],
+	"Module": ["Module", "ModuleError", "InitScheme", "MemoryUnit"],
+	"MoveAxis": ["MoveAxis"],
+	"Mul": ["Mul"],
+	"MulAddConst": ["MulAddConst"],
+	"NoiseInjector": ["NoiseInjector", "InjectMode", "NoiseType"],
+	"Pad1D": ["Pad1D"],
+	"Pad2D": ["Pad2D", "PadMode"],
+	"Penalty": ["Penalty", "PenaltyMode"],
+	"PRelu": ["PRelu"],
+	"Replicate": ["Replicate"],
+	"Reshape": ["Reshape"],
+	"RNN": ["RNN", "RNNMode", "DirectionMode", "WeightModifier"],
+	"Slice": ["Slice"],
+	"SoftMax": ["SoftMax"],
+	"SpatialTf": ["SpatialTf"],
+	"Split": ["Split"],
+	"SubtractMean": ["SubtractMean"],
+	"Sum": ["Sum"],
+	"SwapAxes": ["SwapAxes"],
+	"Tile": ["Tile"],
+	"ToList": ["ToList"],
+	"Transpose": ["Transpose"],
+	"Upsample2D": ["Upsample2D", "UpsampleMode"],
+	"Upsample3D": ["Upsample3D"]
+})
@@ -1,21 +1,7 @@
 import numpy as np
-from PuzzleLib.OpenCL.Kernels.Templates import ElementwiseKernel
-
-
-def memoize(fn):
-	cache = {}
-
-	def memoizer(*args):
-		obj = cache.get(args, None)
-		if obj is not None:
-			return obj
-
-		obj = fn(*args)
-		cache[args] = obj
 
-		return obj
-
-	return memoizer
+from PuzzleLib.Memoize import memoize
+from PuzzleLib.OpenCL.Kernels.Templates import ElementwiseKernel
 
 
 @memoize
@@ -228,6 +214,24 @@ def adamKer(dtype):
 	)
 
 
+@memoize
+def adamRowKer(dtype):
+	assert dtype == np.float32
+	return ElementwiseKernel(
+		"float *param, const float *grad, float *mg, float *ms, const float *steps, int rowsize, float alpha, "
+		"float beta1, float beta2, float epsilon",
+		"""
+		float t = steps[i / rowsize];
+		float learnRate = alpha * sqrt(1.0f - pow(beta2, t)) / (1.0f - pow(beta1, t));
+
+		mg[i] += (1.0f - beta1) * (grad[i] - mg[i]);
+		ms[i] += (1.0f - beta2) * (grad[i] * grad[i] - ms[i]);
+		param[i] += learnRate * mg[i] / (sqrt(ms[i]) + epsilon);
+		""",
+		"adamRowKer"
+	)
+
+
 @memoize
 def classicMomSGDKer(dtype):
 	assert dtype == np.float32
@@ -0,0 +1,142 @@
+import numpy as np
+
+from PuzzleLib.OpenCL.Driver import Driver
+
+from PuzzleLib.OpenCL.Kernels.Utils import warpSize, roundUp
+from PuzzleLib.OpenCL.Utils import memoryPool as memPool, context, queue
+
+
+topkTmpl = """
+
+__kernel void topk(__global float *outdata, int outoffset, __global int *indices, int idxoffset,
+				   __global const float *indata, int inoffset, int outer, int size, int inner, int k)
+{
+	int index = get_global_id(0);
+	if (index >= outer * inner) return;
+
+	int o = index / inner, i = index % inner;
+	__global const float *row = indata + inoffset + o * size * inner + i;
+
+	__global float *outrow = outdata + outoffset + o * k * inner + i;
+	__global int *idxrow = indices + idxoffset + o * k * inner + i;
+
+	for (int t = 0; t < size; t++)
+	{
+		float value = row[t * inner];
+		int j = 0;
+
+		if (t < k)
+		{
+			for (j = t; j > 0 && outrow[(j - 1) * inner] > value; j--)
+			{
+				outrow[j * inner] = outrow[(j - 1) * inner];
+				idxrow[j * inner] = idxrow[(j - 1) * inner];
+			}
+		}
+		else
+		{
+			if (!(value > outrow[0]))
+				continue;
+
+			for (j = 0; j + 1 < k && outrow[(j + 1) * inner] < value; j++)
+			{
+				outrow[j * inner] = outrow[(j + 1) * inner];
+				idxrow[j * inner] = idxrow[(j + 1) * inner];
+			}
+		}
+
+		outrow[j * inner] = value, idxrow[j * inner] = t;
+	}
+}
+
+__kernel void topkBackward(__global float *ingrad, int ingradoffset, __global const float *outgrad, int outgradoffset,
+						   __global const int *indices, int idxoffset, int outer, int size, int inner, int k)
+{
+	int index = get_global_id(0);
+	if (index >= outer * k * inner) return;
+
+	int o = index / (k * inner), i = index % inner;
+	ingrad[ingradoffset + (o * size + indices[idxoffset + index]) * inner + i] = outgrad[outgradoffset + index];
+}
+
+"""
+
+
+if context:
+	mod = Driver.Program(context, topkTmpl).build()
+
+
+def splitAxis(shape, axis):
+	return int(np.prod(shape[:axis])), shape[axis], int(np.prod(shape[axis + 1:]))
+
+
+def topk(data, k, axis):
+	assert data.dtype == np.float32 and 0 < k <= data.shape[axis]
+
+	outer, size, inner = splitAxis(data.shape, axis)
+	outshape = data.shape[:axis] + (k, ) + data.shape[axis + 1:]
+
+	outdata = Driver.empty(queue, outshape, dtype=np.float32, allocator=memPool)
+	indices = Driver.empty(queue, outshape, dtype=np.int32, allocator=memPool)
+
+	block = (warpSize, 1, 1)
+	grid = (roundUp(outer * inner, warpSize), 1, 1)
+
+	mod.topk(
+		queue, grid, block, outdata.base_data, np.int32(outdata.item_offset), indices.base_data,
+		np.int32(indices.item_offset), data.base_data, np.int32(data.item_offset),
+		np.int32(outer), np.int32(size), np.int32(inner), np.int32(k)
+	)
+	return outdata, indices
+
+
+def topkBackward(grad, indices, axis, size):
+	assert grad.dtype == np.float32 and indices.dtype == np.int32 and grad.shape == indices.shape
+
+	outer, k, inner = splitAxis(grad.shape, axis)
+	ingrad = Driver.zeros(queue, grad.shape[:axis] + (size, ) + grad.shape[axis + 1:], dtype=np.float32,
+						  allocator=memPool)
+
+	block = (warpSize, 1, 1)
+	grid = (roundUp(outer * k * inner, warpSize), 1, 1)
+
+	mod.topkBackward(
+		queue, grid, block, ingrad.base_data, np.int32(ingrad.item_offset), grad.base_data,
+		np.int32(grad.item_offset), indices.base_data, np.int32(indices.item_offset),
+		np.int32(outer), np.int32(size), np.int32(inner), np.int32(k)
+	)
+	return ingrad
+
+
+def unittest():
+	for axis in range(3):
+		topkTest(axis)
+
+
+def topkTest(axis):
+	shape, k = (6, 10, 16), 5
+
+	hostData = np.random.randn(*shape).astype(np.float32)
+	outdata, indices = topk(offsetView(hostData), k, axis)
+
+	hostOutData = np.sort(np.partition(hostData, -k, axis=axis).take(range(shape[axis] - k, shape[axis]), axis), axis)
+
+	assert np.allclose(hostOutData, outdata.get())
+	assert np.allclose(np.take_along_axis(hostData, indices.get(), axis), hostOutData)
+
+	hostGrad = np.random.randn(*outdata.shape).astype(np.float32)
+	ingrad = topkBackward(offsetView(hostGrad), offsetView(indices.get()), axis, shape[axis])
+
+	hostInGrad = np.zeros(shape, dtype=np.float32)
+	np.put_along_axis(hostInGrad, indices.get(), hostGrad, axis)
+
+	assert np.allclose(hostInGrad, ingrad.get())
+
+
+def offsetView(hostData):
+	padded = np.concatenate((np.zeros((1, ) + hostData.shape[1:], dtype=hostData.dtype), hostData))
+	return Driver.to_device(queue, padded)[1:]
+
+
+if __name__ == "__main__":
+	unittest()
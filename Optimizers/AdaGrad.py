@@ -6,7 +6,7 @@ from PuzzleLib.Backend import gpuarray
 from PuzzleLib.Backend.Utils import dtypesSupported
 from PuzzleLib.Backend.Kernels.ElementWise import adagradKer
 
-from PuzzleLib.Optimizers.Optimizer import Optimizer, trainSimpleTest, trainHardTest
+from PuzzleLib.Optimizers.Optimizer import Optimizer, trainSimpleTest, trainHardTest, sparseRowsTest
 
 
 class AdaGrad(Optimizer):
@@ -37,6 +37,8 @@ def unittest():
 		if Config.backend == Config.Backend.cuda:
 			trainHardTest(AdaGrad, dtype, learnRate=1e-2)
 
+	sparseRowsTest(AdaGrad, learnRate=1e-2, steps=3)
+
 
 def calcTest(dtype, atol):
 	lr, epsilon = 0.01, 1e-8
@@ -6,9 +6,10 @@ from PuzzleLib import Config
 
 from PuzzleLib.Backend import gpuarray
 from PuzzleLib.Backend.Utils import dtypesSupported
-from PuzzleLib.Backend.Kernels.ElementWise import adamKer
+from PuzzleLib.Backend.Kernels.ElementWise import adamKer, adamRowKer
+from PuzzleLib.Backend.Kernels.Embedder import embed, embedBackwardParams
 
-from PuzzleLib.Optimizers.Optimizer import Optimizer, trainSimpleTest, trainHardTest
+from PuzzleLib.Optimizers.Optimizer import Optimizer, trainSimpleTest, trainHardTest, sparseRowsTest
 
 
 class Adam(Optimizer):
@@ -27,23 +28,44 @@ class Adam(Optimizer):
 
 
 	def setupState(self, var):
-		return {
+		state = {
 			"mg": gpuarray.zeros(var.data.shape, dtype=np.float32),
 			"ms": gpuarray.zeros(var.data.shape, dtype=np.float32)
 		}
 
+		if var.rowSparse:
+			state["steps"] = gpuarray.zeros((var.data.shape[0], 1), dtype=np.float32)
 
-	def updateVar(self, var, state, stream=None):
-		fix1, fix2 = 1.0 - self.beta1**self.t, 1.0 - self.beta2**self.t
-		self.learnRate = self.alpha * math.sqrt(fix2) / fix1
+		return state
+
+
+	def updateVar(self, var, state, stream=None, learnRate=None):
+		if learnRate is None:
+			fix1, fix2 = 1.0 - self.beta1**self.t, 1.0 - self.beta2**self.t
+			self.learnRate = learnRate = self.alpha * math.sqrt(fix2) / fix1
 
 		fix1, fix2 = 1.0 - self.beta1, 1.0 - self.beta2
 		adamKer(var.data.dtype)(
-			var.data, var.grad, state["mg"], state["ms"], self.learnRate * var.learnRate, fix1, fix2, self.epsilon,
+			var.data, var.grad, state["mg"], state["ms"], learnRate * var.learnRate, fix1, fix2, self.epsilon,
 			stream=stream
 		)
 
 
+	def updateRowVar(self, var, state, indices, fullState, stream=None):
+		nrows, rowsize = var.data.shape
+		steps = fullState["steps"]
+
+		ones = gpuarray.empty((1, nrows, 1), dtype=np.float32)
+		ones.fill(1.0)
+
+		embedBackwardParams(indices, ones, steps, 1.0)
+
+		adamRowKer(var.data.dtype)(
+			var.data, var.grad, state["mg"], state["ms"], embed(indices, steps), rowsize,
+			self.alpha * var.learnRate, self.beta1, self.beta2, self.epsilon, stream=stream
+		)
+
+
 def unittest():
 	for dtype, atol in dtypesSupported():
 		calcTest(dtype, atol)
@@ -52,6 +74,9 @@ def unittest():
 		if Config.backend == Config.Backend.cuda:
 			trainHardTest(Adam, dtype, alpha=1e-2)
 
+	sparseRowsTest(Adam, alpha=1e-2)
+	lazyStepsTest()
+
 
 def calcTest(dtype, atol):
 	alpha, beta1, beta2, epsilon = 0.01, 0.9, 0.999, 1e-8
@@ -82,5 +107,48 @@ def calcTest(dtype, atol):
 	assert np.allclose(hostW, w.get(), atol=atol)
 
 
+def lazyStepsTest():
+	from PuzzleLib.Modules.Embedder import Embedder
+
+	alpha, beta1, beta2, epsilon = 1e-2, 0.9, 0.999, 1e-8
+	embedder = Embedder(10, 3, 4, sparseUpdates=True)
+
+	optimizer = Adam(alpha=alpha, beta1=beta1, beta2=beta2, epsilon=epsilon)
+	optimizer.setupOn(embedder, useGlobalState=True)
+
+	hostW = embedder.W.get()
+	hostMg, hostMs, hostSteps = np.zeros_like(hostW), np.zeros_like(hostW), np.zeros((10, ), dtype=np.float32)
+
+	for hostData in ([[0, 1, 1]], [[1, 2, -1]]):
+		hostGrad = np.random.randn(1, 3, 4).astype(np.float32)
+		data = gpuarray.to_gpu(np.array(hostData, dtype=np.int32))
+
+		embedder(data)
+
+		optimizer.zeroGradParams()
+		embedder.backward(gpuarray.to_gpu(hostGrad))
+		optimizer.update()
+
+		hostDw = np.zeros_like(hostW)
+		for word, wordGrad in zip(hostData[0], hostGrad[0]):
+			if word != -1:
+				hostDw[word] += wordGrad
+
+		rows = np.unique([word for word in hostData[0] if word != -1])
+		hostSteps[rows] += 1
+
+		t = hostSteps[rows, np.newaxis]
+		rates = alpha * np.sqrt(1.0 - beta2**t) / (1.0 - beta1**t)
+
+		hostMg[rows] += (1.0 - beta1) * (hostDw[rows] - hostMg[rows])
+		hostMs[rows] += (1.0 - beta2) * (hostDw[rows]**2 - hostMs[rows])
+		hostW[rows] += rates * hostMg[rows] / (np.sqrt(hostMs[rows]) + epsilon)
+
+	steps = optimizer.states["W"]["steps"].get().ravel()
+	assert np.all(steps == [1, 2, 1, 0, 0, 0, 0, 0, 0, 0])
+
+	assert np.allclose(hostW, embedder.W.get(), atol=1e-6)
+
+
 if __name__ == "__main__":
 	unittest()
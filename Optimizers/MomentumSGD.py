@@ -6,7 +6,7 @@ from PuzzleLib.Backend import gpuarray
 from PuzzleLib.Backend.Utils import dtypesSupported
 from PuzzleLib.Backend.Kernels.ElementWise import classicMomSGDKer
 
-from PuzzleLib.Optimizers.Optimizer import trainSimpleTest, trainHardTest
+from PuzzleLib.Optimizers.Optimizer import trainSimpleTest, trainHardTest, sparseRowsTest
 from PuzzleLib.Optimizers.SGD import SGD
 
 
@@ -36,6 +36,8 @@ def unittest():
 		if Config.backend == Config.Backend.cuda:
 			trainHardTest(MomentumSGD, dtype, learnRate=1e-1, momRate=0.9)
 
+	sparseRowsTest(MomentumSGD, learnRate=1e-1, momRate=0.9)
+
 
 def calcTest(dtype, atol):
 	lr, mr = 0.01, 0.9
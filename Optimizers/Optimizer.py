@@ -7,6 +7,8 @@ from PuzzleLib import Config
 
 from PuzzleLib.Backend import gpuarray
 from PuzzleLib.Backend.Utils import SharedArray, streamManager
+from PuzzleLib.Backend.Kernels.Embedder import embed, embedBackwardParams
+from PuzzleLib.Backend.Kernels.ElementWise import addKer
 
 from PuzzleLib.Variable import Variable
 
@@ -28,6 +30,8 @@ class Optimizer:
 		self.globalVar = OrderedDict()
 
 		self.customVars = []
+		self.sparseVars = []
+
 		self.nodeinfo = nodeinfo
 
 
@@ -76,6 +80,11 @@ class Optimizer:
 				self.customVars.append(names[0])
 				continue
 
+			if var.rowSparse and self.nodeinfo is None:
+				self.sparseVars.append(names[0])
+				self.states[names[0]] = self.setupState(var)
+				continue
+
 			shape, dtype = var.data.shape, var.data.dtype.type
 
 			shParams = self.shParams.get(dtype, SharedArray(dtype))
@@ -94,7 +103,7 @@ class Optimizer:
 			self.globalVar[shParams.dtype] = Variable(shParams.ary, grad=shGrads.ary)
 
 		for names, var in variables:
-			if var.hasUpdater:
+			if var.hasUpdater or names[0] in self.sparseVars:
 				continue
 
 			dtype = var.data.dtype.type
@@ -135,7 +144,7 @@ class Optimizer:
 		for i, (name, state) in enumerate(self.states.items()):
 			var = self.module.getVar(name)
 
-			if var.hasUpdater:
+			if var.hasUpdater or var.rowSparse:
 				continue
 
 			var.grad.fill(0)
@@ -171,6 +180,14 @@ class Optimizer:
 			if globalVar.learnRate > 0.0:
 				self.updateVar(globalVar, state)
 
+		for name in self.sparseVars:
+			var = self.module.getVar(name)
+
+			if var.learnRate > 0.0 and var.rows is not None:
+				self.updateRows(var, self.states[name])
+
+			var.rows = None
+
 
 	def updateLocalStates(self, useStreams, sync):
 		streams = streamManager.borrow(len(self.states)) if useStreams else None
@@ -183,6 +200,13 @@ class Optimizer:
 
 			stream = streams[i] if useStreams else None
 
+			if var.rowSparse:
+				if var.learnRate > 0.0 and var.rows is not None:
+					self.updateRows(var, state, stream)
+
+				var.rows = None
+				continue
+
 			for hook in self.hooks:
 				hook(var, state, stream)
 
@@ -201,6 +225,39 @@ class Optimizer:
 		raise NotImplementedError()
 
 
+	def updateRows(self, var, state, stream=None):
+		nrows, rowsize = var.rows.shape[0], var.data.shape[1]
+		if nrows == 0:
+			return
+
+		indices = gpuarray.to_gpu(var.rows.reshape(1, nrows))
+		entities = [name for name, entity in state.items() if entity.shape == var.data.shape]
+
+		gather = lambda ary: embed(indices, ary).reshape(nrows, rowsize)
+
+		rowVar = Variable(gather(var.data), name=var.name, grad=gather(var.grad))
+		rowVar.learnRate, rowVar.momRate, rowVar.wc = var.learnRate, var.momRate, var.wc
+
+		rowState = {name: gather(state[name]) for name in entities}
+
+		targets = [var.data] + [state[name] for name in entities]
+		rows = [rowVar.data] + [rowState[name] for name in entities]
+		olds = [ary.copy() for ary in rows]
+
+		for hook in self.hooks:
+			hook(rowVar, rowState, stream)
+
+		self.updateRowVar(rowVar, rowState, indices, state, stream)
+
+		for target, ary, old in zip(targets, rows, olds):
+			addKer(ary.dtype)(ary, ary, 1.0, old, -1.0, stream=stream)
+			embedBackwardParams(indices, ary.reshape(1, nrows, rowsize), target, 1.0)
+
+
+	def updateRowVar(self, var, state, indices, fullState, stream=None):
+		self.updateVar(var, state, stream)
+
+
 	def save(self, hdf, name=None):
 		hdf = self.ensureHdf(hdf, "w")
 
@@ -287,6 +344,54 @@ def trainSimpleTest(optCls, dtype, *args, **kwargs):
 			print("Iteration #%d error: %s" % (i + 1, error))
 
 
+def sparseRowsTest(optCls, *args, steps=1, **kwargs):
+	from PuzzleLib.Modules.Embedder import Embedder
+
+	batchsize, sentlength, embsize = 4, 5, 8
+	vocabsize = 100
+
+	for useGlobalState in (False, True):
+		sparse = Embedder(vocabsize, sentlength, embsize, sparseUpdates=True)
+		assert sparse.vars["W"].rowSparse
+
+		hostW = sparse.W.get()
+
+		dense = Embedder(vocabsize, sentlength, embsize)
+		assert not dense.vars["W"].rowSparse
+
+		dense.setVar("W", Variable(gpuarray.to_gpu(hostW)))
+
+		optimizers = [optCls(*args, **kwargs) for _ in range(2)]
+		for optimizer, mod in zip(optimizers, (sparse, dense)):
+			optimizer.setupOn(mod, useGlobalState=useGlobalState)
+
+		touched = np.zeros((vocabsize, ), dtype=np.bool_)
+
+		for _ in range(steps):
+			hostData = np.random.randint(low=-1, high=vocabsize // 2, size=(batchsize, sentlength), dtype=np.int32)
+			touched[hostData[hostData != -1]] = True
+
+			data = gpuarray.to_gpu(hostData)
+			grad = gpuarray.to_gpu(np.random.randn(batchsize, sentlength, embsize).astype(np.float32))
+
+			for optimizer, mod in zip(optimizers, (sparse, dense)):
+				mod(data)
+
+				optimizer.zeroGradParams()
+				mod.backward(grad)
+				optimizer.update()
+
+		assert len(optimizers[0].sparseVars) == (1 if useGlobalState else 0)
+
+		sparseW = sparse.W.get()
+
+		assert np.allclose(sparseW, dense.W.get(), atol=1e-6)
+		assert np.all(sparseW[~touched] == hostW[~touched]) and not np.allclose(sparseW[touched], hostW[touched])
+
+		optimizers[0].update()
+		assert sparse.vars["W"].rows is None and np.all(sparse.W.get() == sparseW)
+
+
 def trainHardTest(optCls, dtype, *args, **kwargs):
 	from PuzzleLib.Containers.Sequential import Sequential
 
@@ -0,0 +1,205 @@
+import numpy as np
+
+from PuzzleLib import Config
+from PuzzleLib.Backend import gpuarray
+
+from PuzzleLib.Containers.Graph import Graph
+from PuzzleLib.Containers.Node import Node
+from PuzzleLib.Passes.ConvertToGraph import toGraph
+
+
+class MemoryPlan:
+	def __init__(self, graph, order, nbytes, aliases, lifetimes):
+		self.graph = graph
+		self.order = order
+
+		self.nbytes, self.aliases = nbytes, aliases
+		self.lifetimes = lifetimes
+
+		self.releases = self.buildReleases()
+
+
+	def buildReleases(self):
+		releases = [[] for _ in range(len(self.order))]
+		outputs = set(output.name for output in self.graph.outputs)
+
+		for node in self.order:
+			if node.name in outputs:
+				continue
+
+			_, last = self.lifetimes[node.name]
+			releases[last].append(node)
+
+		return releases
+
+
+	@property
+	def naiveBytes(self):
+		return sum(self.nbytes[node.name] for node in self.order if node.name not in self.aliases)
+
+
+	@property
+	def peakBytes(self):
+		return max((
+			sum(
+				self.nbytes[node.name] for node in self.order
+				if node.name not in self.aliases and self.lifetimes[node.name][0] <= i <= self.lifetimes[node.name][1]
+			) for i in range(len(self.order))
+		), default=0)
+
+
+	def __call__(self, data):
+		graph = self.graph
+		data = data if isinstance(data, list) else [data]
+
+		inputs = {inp.name: data[i] for i, inp in enumerate(graph.inputs)}
+		graph.reset()
+
+		for i, node in enumerate(self.order):
+			node.updateData(inputs.get(node.name, None))
+			node.module.inData = None
+
+			for released in self.releases[i]:
+				released.data = None
+				released.module.data = None
+
+		outdata = [output.data for output in graph.outputs]
+		return outdata[0] if len(outdata) == 1 else outdata
+
+
+	def report(self, log=True):
+		naive, peak = self.naiveBytes, self.peakBytes
+
+		if log:
+			print("[%s] Memory plan: %d tensors, %.2f mb peak live with early release vs %.2f mb retained (%.1fx)" % (
+				Config.libname, len(self.order) - len(self.aliases), peak / 1024**2, naive / 1024**2,
+				naive / max(peak, 1)
+			))
+
+		return naive, peak
+
+
+def planMemory(mod, shape, dtype=np.float32):
+	mod.evalMode()
+	graph = mod if isinstance(mod, Graph) else toGraph(mod, nodesOnly=True)
+
+	shape = shape if isinstance(shape, list) else [shape]
+	inshapes = {inp.name: shape[i] for i, inp in enumerate(graph.inputs)}
+
+	order, shapes = [], {}
+
+	def onNode(node, *args):
+		Node.dataShapeFrom(node, *args)
+		order.append(node)
+
+	for inp in graph.inputs:
+		inp.traverseForward(inp, onNode, inshapes, shapes, None)
+
+	graph.clearTraverse()
+	itemsize = np.dtype(dtype).itemsize
+
+	nbytes = {
+		name: sum(int(np.prod(sh)) for sh in outshape) * itemsize if isinstance(outshape, list) else
+		int(np.prod(outshape)) * itemsize for name, outshape in shapes.items()
+	}
+
+	aliases, lifetimes = findAliases(order), {}
+	steps = {node.name: i for i, node in enumerate(order)}
+
+	for node in order:
+		last = max((steps[fwd.name] for fwd, _ in node.fwds), default=len(order) - 1)
+		lifetimes[node.name] = (steps[node.name], last)
+
+	for node in reversed(order):
+		if node.name in aliases:
+			root = aliases[node.name]
+			first, last = lifetimes[root]
+
+			lifetimes[root] = (first, max(last, lifetimes[node.name][1]))
+
+	for node in order:
+		if node.name in aliases:
+			lifetimes[node.name] = lifetimes[aliases[node.name]]
+
+	return MemoryPlan(graph, order, nbytes, aliases, lifetimes)
+
+
+def findAliases(order):
+	aliases = {}
+
+	for node in order:
+		mod = node.module
+
+		if len(node.bwds) != 1 or node.bwds[0][1] is not None:
+			continue
+
+		if mod.movesData or getattr(mod, "inplace", False):
+			parent = node.bwds[0][0].name
+			aliases[node.name] = aliases.get(parent, parent)
+
+	return aliases
+
+
+def unittest():
+	seqTest()
+	graphTest()
+
+
+def seqTest():
+	from PuzzleLib.Containers import Sequential
+	from PuzzleLib.Modules import Linear, Activation, relu, Flatten
+
+	seq = Sequential()
+
+	for _ in range(8):
+		seq.append(Linear(64, 64))
+		seq.append(Activation(relu, inplace=True))
+
+	seq.append(Flatten())
+	seq.append(Linear(64, 10))
+
+	data = gpuarray.to_gpu(np.random.randn(32, 64).astype(np.float32))
+
+	seq.evalMode()
+	outdata = seq(data).get()
+
+	plan = planMemory(seq, data.shape)
+	naive, peak = plan.report()
+
+	assert peak == 2 * 32 * 64 * data.dtype.itemsize and peak < naive
+	assert np.allclose(outdata, plan(data).get())
+
+	outputs = set(output.name for output in plan.graph.outputs)
+	assert all(node.data is None for node in plan.order if node.name not in outputs)
+
+
+def graphTest():
+	from PuzzleLib.Containers import Graph
+	from PuzzleLib.Modules import Linear, Split, Concat, Activation, relu
+
+	v1 = Linear(100, 50, name="v1").node()
+	h1 = Split(axis=1, sections=(20, 20, 10), name="h1").node(v1)
+
+	v2 = Linear(100, 50, name="v2").node()
+	h2 = Concat(axis=1, name="h2").node((h1, [1, 2]), v2)
+	h3 = Activation(relu, name="h3").node(h2)
+
+	h4 = Concat(axis=1, name="h4").node((h1, 0), h3)
+
+	mlp = Graph(inputs=[v1, v2], outputs=h4)
+
+	v1data = gpuarray.to_gpu(np.random.randn(5, 100).astype(np.float32))
+	v2data = gpuarray.to_gpu(np.random.randn(5, 100).astype(np.float32))
+
+	mlp.evalMode()
+	outdata = mlp([v1data, v2data]).get()
+
+	plan = planMemory(mlp, [v1data.shape, v2data.shape])
+	plan.report()
+
+	assert plan.lifetimes["h1"] == (plan.order.index(plan.graph.nodes["h1"]), len(plan.order) - 1)
+	assert np.allclose(outdata, plan([v1data, v2data]).get())
+
+
+if __name__ == "__main__":
+	unittest()
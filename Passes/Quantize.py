@@ -0,0 +1,380 @@
+import time
+
+import numpy as np
+
+from PuzzleLib import Config
+from PuzzleLib.Backend import gpuarray, Blas
+
+from PuzzleLib.Containers.Container import Container
+from PuzzleLib.Containers.Sequential import Sequential
+from PuzzleLib.Containers.Parallel import Parallel
+from PuzzleLib.Containers.Graph import Graph
+
+from PuzzleLib.Modules.Module import Module
+from PuzzleLib.Modules.Conv2D import Conv2D
+from PuzzleLib.Modules.Linear import Linear
+
+
+class QuantizeError(Exception):
+	pass
+
+
+def quantizeWeights(W):
+	absmax = np.max(np.abs(W), axis=1)
+	scales = np.where(absmax > 0.0, absmax / 127.0, 1.0).astype(np.float32)
+
+	return np.clip(np.rint(W / scales[:, np.newaxis]), -127, 127).astype(np.int8), scales
+
+
+def quantizeData(data, scale):
+	return np.clip(np.rint(data * (1.0 / scale)), -127, 127).astype(np.int8)
+
+
+class QuantizedModule(Module):
+	def __init__(self, mod, absmax, W, bias):
+		super().__init__(mod.name)
+
+		self.module = mod
+		self.train = False
+
+		self.inscale = absmax / 127.0 if absmax > 0.0 else 1.0
+
+		Wq, wscales = quantizeWeights(W)
+		self.W = gpuarray.to_gpu(Wq)
+
+		self.outscales = (self.inscale * wscales).astype(np.float32)
+		self.bias = bias
+
+
+	def mulQuantized(self, qdata):
+		acc = Blas.mulInt8MatrixOnMatrix(gpuarray.to_gpu(qdata), self.W, transpB=True).get()
+		outdata = acc.astype(np.float32) * self.outscales
+
+		if self.bias is not None:
+			outdata += self.bias
+
+		return outdata
+
+
+	def updateGrad(self, grad):
+		raise QuantizeError("Quantized module '%s' is inference-only" % self.name)
+
+
+	def dataShapeFrom(self, shape):
+		return self.module.dataShapeFrom(shape)
+
+
+	def checkDataShape(self, shape):
+		self.module.checkDataShape(shape)
+
+
+class QuantizedLinear(QuantizedModule):
+	def __init__(self, mod, absmax):
+		W = mod.W.get()
+		bias = mod.b.get() if mod.useBias else None
+
+		super().__init__(mod, absmax, W if mod.transpose else W.T, bias)
+
+
+	def updateData(self, data):
+		self.data = gpuarray.to_gpu(self.mulQuantized(quantizeData(data.get(), self.inscale)))
+
+
+class QuantizedConv2D(QuantizedModule):
+	def __init__(self, mod, absmax):
+		W = mod.W.get()
+		bias = mod.b.get().ravel() if mod.useBias else None
+
+		super().__init__(mod, absmax, W.reshape(W.shape[0], -1), bias)
+		self.size = W.shape[2:]
+
+
+	def updateData(self, data):
+		from PuzzleLib.CPU.Wrappers.NumpyDnn import im2col, col2im
+
+		outmaps = self.W.shape[0]
+		_, _, outh, outw = self.module.dataShapeFrom(data.shape)
+
+		coldata = im2col(quantizeData(data.get(), self.inscale), self.size, self.module.stride, self.module.pad)
+		outdata = col2im(self.mulQuantized(np.ascontiguousarray(coldata)), outmaps, (outh, outw))
+
+		self.data = gpuarray.to_gpu(outdata)
+
+
+class QuantizationPlan:
+	def __init__(self, mod, targets, ranges, skipped):
+		self.module = mod
+
+		self.targets = targets
+		self.ranges, self.skipped = ranges, skipped
+
+		self.installed = False
+
+
+	def install(self):
+		if not self.installed:
+			for parent, mod, qmod in self.targets:
+				swapModule(parent, mod, qmod)
+
+			self.installed = True
+
+
+	def uninstall(self):
+		if self.installed:
+			for parent, mod, qmod in self.targets:
+				swapModule(parent, qmod, mod)
+
+			self.installed = False
+
+
+	def __call__(self, data):
+		self.install()
+		return self.module(data)
+
+
+	def run(self, data, batchsize):
+		outdata, secs = [], 0.0
+
+		for batch in splitBatches(data, batchsize):
+			start = time.perf_counter()
+			out = self.module(batch)
+			secs += time.perf_counter() - start
+
+			outdata.append(out.get())
+
+		return np.concatenate(outdata), secs
+
+
+	def report(self, data, labels=None, batchsize=100, log=True):
+		installed = self.installed
+
+		self.uninstall()
+		floatOut, floatSecs = self.run(data, batchsize)
+
+		self.install()
+		quantOut, quantSecs = self.run(data, batchsize)
+
+		if not installed:
+			self.uninstall()
+
+		nsamples = floatOut.shape[0]
+
+		stats = {
+			"maxAbsError": float(np.max(np.abs(quantOut - floatOut))),
+			"relError": float(np.linalg.norm(quantOut - floatOut) / max(np.linalg.norm(floatOut), 1e-12)),
+			"floatThroughput": nsamples / max(floatSecs, 1e-12),
+			"int8Throughput": nsamples / max(quantSecs, 1e-12)
+		}
+
+		if floatOut.ndim == 2:
+			floatPred, quantPred = np.argmax(floatOut, axis=1), np.argmax(quantOut, axis=1)
+			stats["top1Agreement"] = float(np.mean(floatPred == quantPred))
+
+			if labels is not None:
+				stats["floatAccuracy"] = float(np.mean(floatPred == labels))
+				stats["int8Accuracy"] = float(np.mean(quantPred == labels))
+
+		if log:
+			print("[%s] Quantization: %d modules in int8, %d left in float32" % (
+				Config.libname, len(self.targets), len(self.skipped)
+			))
+
+			print("[%s] Output error: %.6f max abs, %.4f%% relative" % (
+				Config.libname, stats["maxAbsError"], stats["relError"] * 100.0
+			))
+
+			if "top1Agreement" in stats:
+				print("[%s] Top-1 agreement with float32: %.2f%%" % (Config.libname, stats["top1Agreement"] * 100.0))
+
+			if "int8Accuracy" in stats:
+				print("[%s] Accuracy: %.2f%% int8 vs %.2f%% float32" % (
+					Config.libname, stats["int8Accuracy"] * 100.0, stats["floatAccuracy"] * 100.0
+				))
+
+			print("[%s] Throughput: %.1f samples/s int8 vs %.1f samples/s float32 (%.2fx)" % (
+				Config.libname, stats["int8Throughput"], stats["floatThroughput"],
+				stats["int8Throughput"] / stats["floatThroughput"]
+			))
+
+		return stats
+
+
+def splitBatches(data, batchsize):
+	data = data if isinstance(data, list) else [data]
+
+	for i in range(0, data[0].shape[0], batchsize):
+		batch = [gpuarray.to_gpu(d[i:i + batchsize]) for d in data]
+		yield batch[0] if len(batch) == 1 else batch
+
+
+def swapModule(parent, old, new):
+	parent.modules[old.name] = new
+
+	if isinstance(parent, (Sequential, Parallel)):
+		parent.graph[parent.graph.index(old)] = new
+
+	elif isinstance(parent, Graph):
+		for node in parent.nodes.values():
+			if node.module is old:
+				node.module = new
+
+
+def findTargets(mod, targets=None):
+	targets = [] if targets is None else targets
+
+	for child in mod.modules.values():
+		if isinstance(child, Container):
+			findTargets(child, targets)
+
+		elif isinstance(child, (Conv2D, Linear)):
+			targets.append((mod, child))
+
+	return targets
+
+
+def calibrate(mod, data, targets, batchsize=100):
+	ranges = {child: 0.0 for _, child in targets}
+	mod.evalMode()
+
+	for batch in splitBatches(data, batchsize):
+		mod(batch)
+
+		for _, child in targets:
+			ranges[child] = max(ranges[child], float(np.max(np.abs(child.inData.get()))))
+
+	return ranges
+
+
+def quantize(mod, data, batchsize=100, install=True):
+	if not Config.isCPUBased(Config.backend):
+		raise QuantizeError("Int8 inference is only supported on cpu backends")
+
+	if not isinstance(mod, Container):
+		raise QuantizeError("Expected container, got %s" % type(mod).__name__)
+
+	candidates, skipped = findTargets(mod), []
+	ranges = calibrate(mod, data, candidates, batchsize)
+
+	targets = []
+
+	for parent, child in candidates:
+		if isinstance(child, Conv2D):
+			if child.groups != 1 or any(d != 1 for d in child.dilation):
+				skipped.append(child)
+				continue
+
+			qmod = QuantizedConv2D(child, ranges[child])
+
+		else:
+			qmod = QuantizedLinear(child, ranges[child])
+
+		targets.append((parent, child, qmod))
+
+	plan = QuantizationPlan(mod, targets, ranges, skipped)
+
+	if install:
+		plan.install()
+
+	return plan
+
+
+def unittest():
+	seqTest()
+	graphTest()
+	nestedNamesTest()
+
+
+def seqTest():
+	from PuzzleLib.Modules import Activation, relu, MaxPool2D, Flatten
+
+	seq = Sequential()
+
+	seq.append(Conv2D(3, 16, 3, pad=1))
+	seq.append(Activation(relu))
+	seq.append(MaxPool2D())
+
+	seq.append(Conv2D(16, 32, 3, stride=2, pad=1))
+	seq.append(Activation(relu))
+
+	seq.append(Flatten())
+	seq.append(Linear(32 * 4 * 4, 64))
+	seq.append(Activation(relu))
+	seq.append(Linear(64, 10))
+
+	data = np.random.randn(64, 3, 16, 16).astype(np.float32)
+	labels = np.random.randint(0, 10, size=(64, ), dtype=np.int32)
+
+	seq.evalMode()
+	outdata = seq(gpuarray.to_gpu(data)).get()
+
+	plan = quantize(seq, data, batchsize=16)
+	assert len(plan.targets) == 4 and len(plan.skipped) == 0
+
+	assert isinstance(seq.graph[0], QuantizedConv2D) and isinstance(seq.graph[-1], QuantizedLinear)
+	assert isinstance(seq.modules[seq.graph[-1].name], QuantizedLinear)
+
+	stats = plan.report(data, labels, batchsize=16)
+	assert stats["relError"] < 5e-2 and stats["top1Agreement"] > 0.8
+
+	plan.uninstall()
+
+	assert isinstance(seq.graph[0], Conv2D) and isinstance(seq.graph[-1], Linear)
+	assert np.allclose(outdata, seq(gpuarray.to_gpu(data)).get())
+
+
+def graphTest():
+	from PuzzleLib.Modules import Concat, Activation, relu
+
+	linear = Linear(20, 30, name="v1")
+	v1 = linear.node()
+	v2 = Linear(20, 30, useBias=False, transpose=True, name="v2").node()
+
+	h1 = Concat(axis=1, name="h1").node(v1, v2)
+	h2 = Activation(relu, name="h2").node(h1)
+	h3 = Linear(60, 5, name="h3").node(h2)
+
+	mlp = Graph(inputs=[v1, v2], outputs=h3)
+
+	data = np.random.randn(32, 20).astype(np.float32)
+	mlp.evalMode()
+
+	floatOut = mlp([gpuarray.to_gpu(data), gpuarray.to_gpu(data)]).get()
+
+	plan = quantize(mlp, [data, data], batchsize=8)
+
+	assert len(plan.targets) == 3
+	assert np.isclose(plan.ranges[linear], np.max(np.abs(data)))
+
+	assert all(isinstance(node.module, QuantizedModule) for node in (v1, v2, h3))
+
+	quantOut = mlp([gpuarray.to_gpu(data), gpuarray.to_gpu(data)]).get()
+	assert np.linalg.norm(quantOut - floatOut) / np.linalg.norm(floatOut) < 5e-2
+
+	plan.uninstall()
+	assert all(isinstance(node.module, Linear) for node in (v1, v2, h3))
+
+
+def nestedNamesTest():
+	seq = Sequential()
+
+	first = Sequential()
+	first.append(Linear(16, 16, wscale=1e3))
+
+	second = Sequential()
+	second.append(Linear(16, 16))
+
+	seq.append(first)
+	seq.append(second)
+
+	assert first.graph[0].name == second.graph[0].name
+
+	data = np.random.randn(32, 16).astype(np.float32)
+	plan = quantize(seq, data, batchsize=16, install=False)
+
+	inner, outer = first.graph[0], second.graph[0]
+	assert np.isclose(plan.ranges[inner], np.max(np.abs(data)))
+	assert plan.ranges[outer] > 10.0 * plan.ranges[inner]
+
+
+if __name__ == "__main__":
+	unittest()
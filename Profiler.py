@@ -0,0 +1,249 @@
+import json, time
+
+from PuzzleLib import Config
+
+from PuzzleLib.Backend import Utils
+from PuzzleLib.Modules.Module import Module
+from PuzzleLib.Containers.Container import Container
+
+
+class ProfilerError(Exception):
+	pass
+
+
+class ModuleStats:
+	def __init__(self, name, classname, paramBytes):
+		self.name, self.classname = name, classname
+		self.paramBytes = paramBytes
+
+		self.fwdSecs, self.fwdCalls = 0.0, 0
+		self.bwdSecs, self.bwdCalls = 0.0, 0
+
+		self.outBytes = 0
+
+
+	@property
+	def totalSecs(self):
+		return self.fwdSecs + self.bwdSecs
+
+
+class Profiler:
+	active = None
+
+
+	def __init__(self, mod, sync=True, trace=True):
+		self.module = mod
+		self.sync, self.trace = sync, trace
+
+		self.names = self.gatherNames(mod)
+		self.stats = {
+			name: ModuleStats(name, type(m).__name__, m.paramSize()) for m, name in self.names.values()
+		}
+
+		self.events = []
+		self.steps = 0
+
+		self.origCall, self.origBackward = None, None
+		self.start = None
+
+
+	@classmethod
+	def gatherNames(cls, mod, names=None, name=None):
+		names = {} if names is None else names
+
+		if isinstance(mod, Container):
+			for child in mod.modules.values():
+				cls.gatherNames(child, names, child.name if name is None else "%s.%s" % (name, child.name))
+
+		else:
+			names[id(mod)] = (mod, mod.name if name is None else name)
+
+		return names
+
+
+	def __enter__(self):
+		self.install()
+		return self
+
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.uninstall()
+
+
+	def install(self):
+		if Profiler.active is not None:
+			raise ProfilerError("Another profiler is already installed")
+
+		Profiler.active = self
+		self.origCall, self.origBackward = Module.__call__, Module.backward
+
+		origCall, origBackward = self.origCall, self.origBackward
+
+		def call(mod, data):
+			entry = self.names.get(id(mod), None)
+			if entry is None:
+				return origCall(mod, data)
+
+			start = self.timestamp()
+			outdata = origCall(mod, data)
+
+			stats = self.record(entry[1], "forward", start)
+			stats.fwdCalls += 1
+			stats.outBytes = self.dataBytes(outdata)
+
+			return outdata
+
+		def backward(mod, grad, *args, **kwargs):
+			entry = self.names.get(id(mod), None)
+			if entry is None:
+				return origBackward(mod, grad, *args, **kwargs)
+
+			start = self.timestamp()
+			origBackward(mod, grad, *args, **kwargs)
+
+			self.record(entry[1], "backward", start).bwdCalls += 1
+
+		Module.__call__, Module.backward = call, backward
+		self.start = self.timestamp() if self.start is None else self.start
+
+
+	def uninstall(self):
+		if Profiler.active is not self:
+			return
+
+		Module.__call__, Module.backward = self.origCall, self.origBackward
+		Profiler.active = None
+
+
+	def timestamp(self):
+		if self.sync:
+			Utils.synchronize()
+
+		return time.perf_counter()
+
+
+	def record(self, name, phase, start):
+		end = self.timestamp()
+		stats = self.stats[name]
+
+		if phase == "forward":
+			stats.fwdSecs += end - start
+		else:
+			stats.bwdSecs += end - start
+
+		if self.trace:
+			self.events.append({
+				"name": name, "cat": phase, "ph": "X", "pid": 0, "tid": 0,
+				"ts": (start - self.start) * 1e6, "dur": (end - start) * 1e6,
+				"args": {"class": stats.classname, "step": self.steps}
+			})
+
+		return stats
+
+
+	@classmethod
+	def dataBytes(cls, data):
+		if isinstance(data, (tuple, list)):
+			return sum(cls.dataBytes(d) for d in data)
+
+		return data.nbytes if data is not None else 0
+
+
+	def step(self):
+		self.steps += 1
+
+
+	def reset(self):
+		for stats in self.stats.values():
+			stats.fwdSecs, stats.fwdCalls, stats.bwdSecs, stats.bwdCalls = 0.0, 0, 0.0, 0
+			stats.outBytes = 0
+
+		self.events.clear()
+
+		self.steps = 0
+		self.start = self.timestamp() if Profiler.active is self else None
+
+
+	def report(self, log=True, limit=None):
+		steps = max(self.steps, 1)
+
+		rows = sorted(
+			(stats for stats in self.stats.values() if stats.fwdCalls + stats.bwdCalls > 0),
+			key=lambda st: st.totalSecs, reverse=True
+		)
+		rows = rows if limit is None else rows[:limit]
+
+		if log:
+			total = sum(stats.totalSecs for stats in self.stats.values())
+			width = max((len(stats.name) for stats in rows), default=4)
+
+			print("[%s] Profile over %s step(s), times are per step:" % (Config.libname, steps))
+			print("%-*s %-16s %12s %12s %8s %12s %12s" % (
+				width, "name", "class", "fwd ms", "bwd ms", "share", "out kb", "params kb"
+			))
+
+			for stats in rows:
+				print("%-*s %-16s %12.3f %12.3f %7.1f%% %12.1f %12.1f" % (
+					width, stats.name, stats.classname, stats.fwdSecs / steps * 1e3, stats.bwdSecs / steps * 1e3,
+					100.0 * stats.totalSecs / max(total, 1e-12), stats.outBytes / 1024, stats.paramBytes / 1024
+				))
+
+		return rows
+
+
+	def saveTrace(self, filename):
+		with open(filename, "w") as file:
+			json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+def unittest():
+	profileTest()
+
+
+def profileTest():
+	import os
+	import numpy as np
+
+	from PuzzleLib.Backend import gpuarray
+	from PuzzleLib.Containers import Sequential
+	from PuzzleLib.Modules import Linear, Activation, relu
+
+	seq = Sequential(name="net")
+	seq.append(Linear(64, 128, name="fc1"))
+	seq.append(Activation(relu, name="act1"))
+	seq.append(Linear(128, 10, name="fc2"))
+
+	data = gpuarray.to_gpu(np.random.randn(32, 64).astype(np.float32))
+	outsize = 32 * 128 * data.dtype.itemsize
+
+	with Profiler(seq) as profiler:
+		seq(data)
+		profiler.reset()
+
+		for _ in range(3):
+			seq(data)
+			profiler.step()
+
+	assert Module.__call__ is profiler.origCall and Profiler.active is None
+
+	rows = profiler.report()
+	stats = profiler.stats
+
+	assert len(rows) == 3 and all(stats[name].fwdCalls == 3 for name in ("fc1", "act1", "fc2"))
+	assert stats["act1"].outBytes == outsize and stats["fc1"].paramBytes == seq["fc1"].paramSize()
+
+	filename = "./TestData/trace.json"
+
+	try:
+		profiler.saveTrace(filename)
+
+		with open(filename) as file:
+			assert len(json.load(file)["traceEvents"]) == 9
+
+	finally:
+		if os.path.exists(filename):
+			os.remove(filename)
+
+
+if __name__ == "__main__":
+	unittest()
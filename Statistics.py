@@ -2,105 +2,194 @@ import numpy as np
 
 
 def confusion(labels, predictions, dim=0, log=True):
-	if dim <= 0:
-		for label in labels:
-			if int(label) >= dim:
-				dim = int(label)+1
-
-		for label in predictions:
-			if int(label) >= dim:
-				dim = int(label) + 1
+	length = min(len(labels), len(predictions))
+	labels, predictions = np.asarray(labels[:length], dtype=np.int64), np.asarray(predictions[:length], dtype=np.int64)
 
-	cm = [[0] * dim for _ in range(dim)]
+	if dim <= 0:
+		dim = int(max(labels.max(initial=-1), predictions.max(initial=-1))) + 1
 
-	for i in range(min(len(labels), len(predictions))):
-		cm[int(labels[i])][int(predictions[i])] += 1
+	cm = np.bincount(labels * dim + predictions, minlength=dim * dim).reshape(dim, dim)
 
 	if log:
 		print("Confusion Matrix:")
 
 		for mst in cm:
-			print(str(mst))
+			print(str(mst.tolist()))
 
 	return cm
 
 
-def precision(cm, log=True, verbose=True):
-	dim = len(cm)
-	prs, pr = [], 0
-
-	for i in range(dim):
-		summary = 0
+def classRatios(hits, totals):
+	totals = np.asarray(totals, dtype=np.float64)
+	return np.divide(hits, totals, out=np.ones_like(totals), where=totals != 0)
 
-		for j in range(dim):
-			summary += cm[j][i]
 
-		if summary == 0:
-			tpr = 1.0
-		else:
-			tpr = cm[i][i] / summary
-
-		pr += tpr
-		prs.append(tpr)
+def precision(cm, log=True, verbose=True):
+	cm = np.asarray(cm)
+	prs = classRatios(np.diag(cm), cm.sum(axis=0))
 
-		if log and verbose:
+	if log and verbose:
+		for i, tpr in enumerate(prs):
 			print("Precision on class %s: %s" % (i, tpr))
 
-	pr /= dim
+	pr = prs.mean()
 
 	if log:
 		print("Precision mean: %s" % pr)
 
-	return pr, prs
+	return pr, prs.tolist()
 
 
 def recall(cm, log=True, verbose=True):
-	dim = len(cm)
-	rcs, rc = [], 0
+	cm = np.asarray(cm)
+	rcs = classRatios(np.diag(cm), cm.sum(axis=1))
 
-	for i in range(dim):
-		summary = 0
+	if log and verbose:
+		for i, trc in enumerate(rcs):
+			print("Recall on class %d: %f" % (i, trc))
 
-		for j in range(dim):
-			summary += cm[i][j]
+	rc = rcs.mean()
 
-		if summary == 0:
-			trc = 1.0
-		else:
-			trc = cm[i][i] / summary
+	if log:
+		print("Recall mean: %s" % rc)
 
-		rc += trc
-		rcs.append(trc)
+	return rc, rcs.tolist()
 
-		if log and verbose:
-			print("Recall on class %d: %f" % (i, trc))
 
-	rc /= dim
+def f1(cm, log=True, verbose=True):
+	_, prs = precision(cm, log=False)
+	_, rcs = recall(cm, log=False)
+
+	prs, rcs = np.array(prs), np.array(rcs)
+	f1s = classRatios(2.0 * prs * rcs, prs + rcs)
+
+	if log and verbose:
+		for i, tf1 in enumerate(f1s):
+			print("F1 on class %d: %f" % (i, tf1))
+
+	f1mean = f1s.mean()
 
 	if log:
-		print("Recall mean: %s" % rc)
+		print("F1 mean: %s" % f1mean)
 
-	return rc, rcs
+	return f1mean, f1s.tolist()
 
 
 def accuracy(cm, log=True):
-	dim = len(cm)
-	acc, summary = 0, 0
+	cm = np.asarray(cm)
+	acc = np.trace(cm) / cm.sum()
 
-	for i in range(dim):
-		for j in range(dim):
-			summary += cm[i][j]
+	if log:
+		print("Accuracy: %s" % acc)
 
-		acc += cm[i][i]
+	return acc
+
+
+def topkHits(labels, scores, k):
+	scores = np.asarray(scores)
+	labels = np.asarray(labels, dtype=np.int64)
+
+	if k >= scores.shape[1]:
+		return labels.shape[0]
 
-	acc /= summary
+	labelScores = scores[np.arange(labels.shape[0]), labels]
+	return int(np.count_nonzero(np.sum(scores > labelScores[:, np.newaxis], axis=1) < k))
+
+
+def topkAccuracy(labels, scores, k=5, log=True):
+	acc = topkHits(labels, scores, k) / len(labels)
 
 	if log:
-		print("Accuracy: %s" % acc)
+		print("Top-%d accuracy: %s" % (k, acc))
 
 	return acc
 
 
+class ConfusionAccumulator:
+	def __init__(self, dim, topk=()):
+		self.dim = dim
+		self.cm = np.zeros((dim, dim), dtype=np.int64)
+
+		self.topk = {k: 0 for k in topk}
+		self.samples = 0
+
+
+	def update(self, labels, predictions):
+		self.cm += confusion(labels, predictions, self.dim, log=False)
+		self.samples += min(len(labels), len(predictions))
+
+
+	def updateFromScores(self, labels, scores):
+		self.update(labels, np.argmax(scores, axis=1))
+
+		for k in self.topk:
+			self.topk[k] += topkHits(labels, scores, k)
+
+
+	def topkAccuracy(self, k):
+		return self.topk[k] / max(self.samples, 1)
+
+
+	def reset(self):
+		self.cm[:] = 0
+		self.topk = {k: 0 for k in self.topk}
+		self.samples = 0
+
+
+def editDistance(hyp, ref):
+	hyp, ref = np.asarray(hyp), np.asarray(ref)
+
+	if len(hyp) == 0 or len(ref) == 0:
+		return max(len(hyp), len(ref))
+
+	offsets = np.arange(len(ref) + 1)
+	row = offsets.copy()
+
+	for i, symbol in enumerate(hyp):
+		costs = np.empty_like(row)
+		costs[0] = i + 1
+		costs[1:] = np.minimum(row[1:] + 1, row[:-1] + (ref != symbol))
+
+		row = np.minimum.accumulate(costs - offsets) + offsets
+
+	return int(row[-1])
+
+
+class EditDistanceAccumulator:
+	def __init__(self):
+		self.edits, self.symbols = 0, 0
+		self.exact, self.sequences = 0, 0
+
+
+	def update(self, hyps, hyplengths, refs, reflengths):
+		hyps = np.split(np.asarray(hyps), np.cumsum(hyplengths)[:-1])
+		refs = np.split(np.asarray(refs), np.cumsum(reflengths)[:-1])
+
+		for hyp, ref in zip(hyps, refs):
+			edits = editDistance(hyp, ref)
+
+			self.edits += edits
+			self.symbols += len(ref)
+
+			self.exact += int(edits == 0)
+			self.sequences += 1
+
+
+	@property
+	def errorRate(self):
+		return self.edits / max(self.symbols, 1)
+
+
+	@property
+	def sequenceAccuracy(self):
+		return self.exact / max(self.sequences, 1)
+
+
+	def reset(self):
+		self.edits, self.symbols = 0, 0
+		self.exact, self.sequences = 0, 0
+
+
 def fullstats(labels, predictions, dim=0, printing=True, verbose=True):
 	cm = confusion(labels, predictions, dim, printing)
 	pr, prs = precision(cm, printing, verbose)
@@ -133,6 +222,35 @@ def unittest():
 	assert np.allclose(np.array(prs), npprs)
 	assert np.allclose(np.array(rcs), nprcs)
 
+	pred = np.random.randn(10000, 6).astype(np.float32)
+	acc = ConfusionAccumulator(6, topk=(1, 3))
+
+	for i in range(0, 10000, 3000):
+		acc.updateFromScores(labels[i:i + 3000], pred[i:i + 3000])
+
+	assert np.all(acc.cm == confusion(labels, np.argmax(pred, axis=1), 6, log=False))
+	assert np.isclose(acc.topkAccuracy(1), accuracy(acc.cm, log=False))
+
+	top3 = np.argsort(-pred, axis=1)[:, :3]
+	assert np.isclose(acc.topkAccuracy(3), np.mean(np.any(top3 == labels[:, np.newaxis], axis=1)))
+	assert np.isclose(topkAccuracy(labels, pred, k=3, log=False), acc.topkAccuracy(3))
+
+	f1mean, f1s = f1(acc.cm, verbose=False)
+	_, prs = precision(acc.cm, log=False)
+	_, rcs = recall(acc.cm, log=False)
+
+	assert np.allclose(f1s, 2.0 * np.array(prs) * np.array(rcs) / (np.array(prs) + np.array(rcs)))
+
+	assert editDistance(list("kitten"), list("sitting")) == 3 and editDistance([], [1, 2]) == 2
+	assert editDistance([1, 2, 3], [1, 2, 3]) == 0 and editDistance([3, 2, 1], [1, 2, 3]) == 2
+
+	edits = EditDistanceAccumulator()
+	edits.update([1, 2, 3, 4, 4], [3, 2], [1, 2, 3, 4], [3, 1])
+	edits.update([], [0], [5, 6], [2])
+
+	assert edits.edits == 3 and edits.symbols == 6 and np.isclose(edits.errorRate, 0.5)
+	assert np.isclose(edits.sequenceAccuracy, 1.0 / 3.0)
+
 
 if __name__ == "__main__":
 	unittest()
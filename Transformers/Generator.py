@@ -21,6 +21,13 @@ def unittest():
 		generator.prepareData()
 		assert generator.getData().shape == (40, 3, 4, 4)
 
+	with Generator(numofthreads=4, sharedMemory=True) as generator:
+		generator.addTransformer(TestGenTransformer())
+
+		for _ in range(3):
+			generator.prepareData()
+			assert generator.getData().shape == (40, 3, 4, 4)
+
 
 if __name__ == "__main__":
 	unittest()
@@ -1,12 +1,11 @@
-import random
 import numpy as np
 
 from PuzzleLib.Transformers.Provider import Provider
 
 
 class Merger(Provider):
-	def __init__(self, datasets, labelIds=None, numofthreads=4):
-		super().__init__(numofthreads)
+	def __init__(self, datasets, labelIds=None, numofthreads=4, sharedMemory=False):
+		super().__init__(numofthreads, sharedMemory)
 
 		self.datalens = []
 		self.datasets = datasets
@@ -59,13 +58,16 @@ class Merger(Provider):
 
 		idx = 0
 		for i, dataset in enumerate(self.datasets):
-			for _ in range(ratios[i]):
-				chunk[order[idx]] = dataset[random.randint(0, self.datalens[i]-1)]
+			if ratios[i] == 0:
+				continue
 
-				if self.labelIds is not None:
-					labels[order[idx]] = self.labelIds[i]
+			indices, inverse = np.unique(np.random.randint(0, self.datalens[i], size=ratios[i]), return_inverse=True)
+			chunk[order[idx:idx + ratios[i]]] = self.readRows(dataset, indices)[inverse]
 
-				idx += 1
+			if self.labelIds is not None:
+				labels[order[idx:idx + ratios[i]]] = self.labelIds[i]
+
+			idx += ratios[i]
 
 		if self.labelIds is not None:
 			return chunk, labels
@@ -73,6 +75,24 @@ class Merger(Provider):
 			return chunk
 
 
+	@staticmethod
+	def readRows(dataset, indices):
+		if isinstance(dataset, np.ndarray):
+			return dataset[indices]
+
+		breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+
+		if len(breaks) + 1 > indices.shape[0] // 2:
+			return dataset[indices.tolist()]
+
+		rows = np.empty((indices.shape[0], ) + dataset.shape[1:], dtype=dataset.dtype)
+
+		for start, stop in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [indices.shape[0]]))):
+			rows[start:stop] = dataset[indices[start]:indices[stop - 1] + 1]
+
+		return rows
+
+
 	def getRationedChunk(self, chunksize, ratios, permutate):
 		chunk = np.empty((chunksize, ) + self.datasets[0].shape[1:], dtype=self.datasets[0].dtype)
 
@@ -148,7 +168,23 @@ class Merger(Provider):
 		super().prepareData(chunksize, ratios=ratios, randomize=randomize, permutate=permutate)
 
 
+	def stream(self, ratios=None, chunksize=20000, randomize=False, permutate=True, inflight=2, workitems=None):
+		if ratios is None:
+			ratios = [1] * len(self.datasets)
+		else:
+			assert (len(ratios) == len(self.datasets))
+
+		return super().stream(
+			chunksize, inflight, workitems, ratios=ratios, randomize=randomize, permutate=permutate
+		)
+
+
 def unittest():
+	mergeTest()
+	randomChunkTest()
+
+
+def mergeTest():
 	from PuzzleLib.Datasets.ZipLoader import ZipLoader
 
 	zipfile = ZipLoader()
@@ -160,6 +196,62 @@ def unittest():
 			merger.prepareData(chunksize=10, ratios=[6, 4], permutate=False)
 			merger.getData()
 
+		for _, (data, labels) in zip(range(5), merger.stream(chunksize=10, ratios=[6, 4], inflight=2)):
+			assert data.shape[0] == 10 and np.sum(labels == 0) == 6
+
+
+def randomChunkTest():
+	from PuzzleLib.Datasets.ZipLoader import ZipLoader
+
+	zipfile = ZipLoader()
+	data = zipfile.load("../TestData/test.zip")
+
+	hostData = data[:]
+	rows = {row.tobytes() for row in hostData}
+
+	with Merger([data, hostData], [0, 1]) as merger:
+		chunk, labels = merger.getRandomChunk(64, [40, 24], permutate=True)
+
+		assert np.sum(labels == 0) == 40 and np.sum(labels == 1) == 24
+		assert all(row.tobytes() in rows for row in chunk)
+
+		indices = np.array([0, 1, 2, 5, 6, data.shape[0] - 1])
+		assert np.allclose(Merger.readRows(data, indices), hostData[indices])
+
+
+def benchmark():
+	import time
+	from PuzzleLib.Datasets.ZipLoader import ZipLoader
+
+	loader = ZipLoader(onFile=lambda f: np.random.randn(400, 3, 16, 16).astype(np.float32),
+					   cachename="../TestData/benchmark.hdf")
+	data = loader.load("../TestData/test.zip", log=False)
+
+	try:
+		with Merger([data]) as merger:
+			chunksize, looplength = 1024, 2
+
+			hostStart = time.time()
+			for _ in range(looplength):
+				for _ in range(chunksize):
+					np.array(data[np.random.randint(0, data.shape[0])])
+
+			perSampleSecs = (time.time() - hostStart) / looplength
+
+			hostStart = time.time()
+			for _ in range(looplength):
+				merger.getRandomChunk(chunksize, [chunksize], permutate=True)
+
+			batchedSecs = (time.time() - hostStart) / looplength
+
+		print("Random %s-sample chunk from %s-sample hdf cache: per-sample reads %.4f secs, batched reads %.4f secs" % (
+			chunksize, data.shape[0], perSampleSecs, batchedSecs
+		))
+
+	finally:
+		data.file.close()
+		loader.clear()
+
 
 if __name__ == "__main__":
 	unittest()
@@ -1,17 +1,104 @@
-from multiprocessing import Pool
+from collections import deque
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 
 import numpy as np
 
 
+attachedMemory = {}
+
+
+def attachSharedMemory(key, name):
+	shm = attachedMemory.get(key, None)
+
+	if shm is not None and shm.name != name:
+		try:
+			shm.close()
+		except BufferError:
+			pass
+
+		shm = None
+
+	if shm is None:
+		shm = SharedMemory(name=name)
+		attachedMemory[key] = shm
+
+	return shm
+
+
+class SharedSlot:
+	def __init__(self):
+		self.inputs, self.outputs = [], []
+		self.retired = []
+
+
+	def ensure(self, buffers, layout):
+		for i, (shape, dtype) in enumerate(layout):
+			nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+
+			if i < len(buffers) and buffers[i].size >= nbytes:
+				continue
+
+			shm = SharedMemory(create=True, size=nbytes)
+
+			if i < len(buffers):
+				self.retire(buffers[i])
+				buffers[i] = shm
+			else:
+				buffers.append(shm)
+
+		return [
+			(shm.name, tuple(shape), np.dtype(dtype).str) for shm, (shape, dtype) in zip(buffers, layout)
+		]
+
+
+	def retire(self, shm):
+		shm.unlink()
+		self.retired.append(shm)
+
+
+	@staticmethod
+	def views(buffers, specs):
+		return [np.ndarray(shape, dtype=dtype, buffer=shm.buf) for shm, (_, shape, dtype) in zip(buffers, specs)]
+
+
+	def close(self):
+		for shm in self.inputs + self.outputs:
+			shm.unlink()
+
+		for shm in self.inputs + self.outputs + self.retired:
+			try:
+				shm.close()
+			except BufferError:
+				pass
+
+		self.inputs, self.outputs, self.retired = [], [], []
+
+
 class Provider:
-	def __init__(self, numofthreads=4):
+	"""
+	With sharedMemory=True, getData() returns views into a ring of ringsize shared segments instead of copies:
+	a returned chunk stays valid only until ringsize more chunks are prepared, so copy it to keep it longer.
+	"""
+
+	def __init__(self, numofthreads=4, sharedMemory=False, ringsize=2):
 		self.transformers = []
 
+		if sharedMemory:
+			resource_tracker.ensure_running()
+
 		self.numofthreads = numofthreads
 		self.pool = Pool(numofthreads)
 		self.pool.starmap(lambda: np.random.seed(), ())
 		self.poolresults = None
 
+		self.sharedMemory = sharedMemory
+		self.ring = [SharedSlot() for _ in range(ringsize)] if sharedMemory else None
+		self.slotidx = 0
+
+		self.outlayout = None
+		self.pending = None
+
 		self.data = None
 
 
@@ -27,9 +114,14 @@ class Provider:
 		self.pool.close()
 		self.pool.join()
 
+		if self.ring is not None:
+			for slot in self.ring:
+				slot.close()
+
 
 	def addTransformer(self, transformer):
 		self.transformers.append(transformer)
+		self.outlayout = None
 
 
 	def getNextChunk(self, chunksize, **kwargs):
@@ -43,6 +135,10 @@ class Provider:
 			self.data = result
 			return
 
+		if self.sharedMemory and self.outlayout is not None:
+			self.poolresults = self.dispatchShared(result)
+			return
+
 		if result is not None:
 			if isinstance(result, tuple) or isinstance(result, list):
 				batchsize = result[0].shape[0] // self.numofthreads
@@ -70,9 +166,102 @@ class Provider:
 			for i in range(self.numofthreads):
 				args.append((self.transformers, None, i))
 
+		self.pending = None
 		self.poolresults = self.pool.starmap_async(self.worker, args)
 
 
+	def stream(self, chunksize=20000, inflight=2, workitems=None, **kwargs):
+		workitems = 4 * self.numofthreads if workitems is None else workitems
+		chunks = deque()
+
+		try:
+			while True:
+				while len(chunks) < inflight:
+					chunks.append(self.submitChunk(chunksize, workitems, **kwargs))
+
+				yield self.collectChunk(chunks.popleft())
+
+		finally:
+			for chunk in chunks:
+				if isinstance(chunk, list):
+					for result in chunk:
+						result.wait()
+
+
+	def submitChunk(self, chunksize, workitems, **kwargs):
+		result = self.getNextChunk(chunksize, **kwargs)
+
+		if len(self.transformers) == 0:
+			return result
+
+		if result is None:
+			return [
+				self.pool.apply_async(self.worker, (self.transformers, None, i)) for i in range(self.numofthreads)
+			]
+
+		isTuple = isinstance(result, tuple) or isinstance(result, list)
+		length = result[0].shape[0] if isTuple else result.shape[0]
+
+		return [
+			self.pool.apply_async(self.worker, (
+				self.transformers, [res[start:stop] for res in result] if isTuple else result[start:stop],
+				i % self.numofthreads
+			)) for i, (start, stop) in enumerate(self.splitRows(length, min(workitems, max(length, 1))))
+		]
+
+
+	def collectChunk(self, chunk):
+		if not isinstance(chunk, list):
+			return chunk
+
+		return self.assemble([result.get()[0] for result in chunk])
+
+
+	def splitRows(self, length, parts=None):
+		parts = self.numofthreads if parts is None else parts
+
+		batchsize = length // parts
+		bounds = [(i * batchsize, (i + 1) * batchsize) for i in range(parts - 1)]
+
+		bounds.append(((parts - 1) * batchsize, length))
+		return bounds
+
+
+	def dispatchShared(self, result):
+		slotidx, slot = self.slotidx, self.ring[self.slotidx]
+		self.slotidx = (self.slotidx + 1) % len(self.ring)
+
+		isTuple, layout, genrows = self.outlayout
+
+		if result is not None:
+			inputs = list(result) if isinstance(result, (tuple, list)) else [result]
+			inspecs = slot.ensure(slot.inputs, [(inp.shape, inp.dtype) for inp in inputs])
+
+			for view, inp in zip(SharedSlot.views(slot.inputs, inspecs), inputs):
+				view[...] = inp
+
+			bounds = self.splitRows(inputs[0].shape[0])
+
+		else:
+			inspecs = None
+
+			bounds, start = [], 0
+			for rows in genrows:
+				bounds.append((start, start + rows))
+				start += rows
+
+		length = bounds[-1][1]
+		outspecs = slot.ensure(slot.outputs, [((length, ) + shape, dtype) for shape, dtype in layout])
+
+		args = [
+			(self.transformers, None if inspecs is None else (inspecs, isinstance(result, (tuple, list))),
+			 (outspecs, isTuple), slotidx, start, stop, i) for i, (start, stop) in enumerate(bounds)
+		]
+
+		self.pending = (slot, outspecs, bounds, isTuple)
+		return self.pool.starmap_async(self.sharedWorker, args)
+
+
 	def getData(self):
 		if self.poolresults is not None:
 			self.poolresults.wait()
@@ -84,37 +273,76 @@ class Provider:
 
 			self.poolresults = None
 
-			length = 0
-			if isinstance(results[0], tuple) or isinstance(results[0], list):
-				datshape = [res.shape[1:] for res in results[0]]
+			if self.pending is not None:
+				self.data = self.gatherShared(results)
+				self.pending = None
+
+			else:
+				self.learnLayout(results)
+				self.data = self.assemble(results)
+
+		return self.data
 
-				for res in results:
-					length += res[0].shape[0]
 
-				self.data = tuple(np.empty((length, )+shape, dtype=results[0][i].dtype)
-								  for i, shape in enumerate(datshape))
+	def learnLayout(self, results):
+		if not self.sharedMemory:
+			return
 
-				idx = 0
-				for res in results:
-					for i, dat in enumerate(res):
-						self.data[i][idx:idx + dat.shape[0]] = dat
+		isTuple = isinstance(results[0], (tuple, list))
+		outputs = results[0] if isTuple else [results[0]]
 
-					idx += res[0].shape[0]
+		layout = [(out.shape[1:], out.dtype) for out in outputs]
+		genrows = [res[0].shape[0] if isTuple else res.shape[0] for res in results]
 
-			else:
-				datshape = results[0].shape[1:]
+		self.outlayout = (isTuple, layout, genrows)
 
-				for res in results:
-					length += res.shape[0]
 
-				self.data = np.empty((length, ) + datshape, dtype=np.float32)
+	def gatherShared(self, results):
+		slot, outspecs, bounds, isTuple = self.pending
+		views = SharedSlot.views(slot.outputs, outspecs)
 
-				idx = 0
-				for res in results:
-					self.data[idx:idx + res.shape[0]] = res
-					idx += res.shape[0]
+		if all(result is None for result in results):
+			return tuple(views) if isTuple else views[0]
+
+		for i, (start, stop) in enumerate(bounds):
+			if results[i] is None:
+				results[i] = tuple(view[start:stop] for view in views) if isTuple else views[0][start:stop]
+
+		return self.assemble(results)
 
-		return self.data
+
+	@staticmethod
+	def assemble(results):
+		length = 0
+		if isinstance(results[0], tuple) or isinstance(results[0], list):
+			datshape = [res.shape[1:] for res in results[0]]
+
+			for res in results:
+				length += res[0].shape[0]
+
+			data = tuple(np.empty((length, )+shape, dtype=results[0][i].dtype) for i, shape in enumerate(datshape))
+
+			idx = 0
+			for res in results:
+				for i, dat in enumerate(res):
+					data[i][idx:idx + dat.shape[0]] = dat
+
+				idx += res[0].shape[0]
+
+		else:
+			datshape = results[0].shape[1:]
+
+			for res in results:
+				length += res.shape[0]
+
+			data = np.empty((length, ) + datshape, dtype=np.float32)
+
+			idx = 0
+			for res in results:
+				data[idx:idx + res.shape[0]] = res
+				idx += res.shape[0]
+
+		return data
 
 
 	@staticmethod
@@ -123,3 +351,36 @@ class Provider:
 			batch = transformer(batch, threadidx)
 
 		return batch, threadidx
+
+
+	@staticmethod
+	def sharedWorker(transformers, inspec, outspec, slotidx, start, stop, threadidx):
+		batch = None
+
+		if inspec is not None:
+			inspecs, isTuple = inspec
+
+			inputs = [
+				np.ndarray(shape, dtype=dtype, buffer=attachSharedMemory((slotidx, "in", i), name).buf)[start:stop]
+				for i, (name, shape, dtype) in enumerate(inspecs)
+			]
+			batch = inputs if isTuple else inputs[0]
+
+		for transformer in transformers:
+			batch = transformer(batch, threadidx)
+
+		outspecs, isTuple = outspec
+		outputs = list(batch) if isTuple else [batch]
+
+		views = [
+			np.ndarray(shape, dtype=dtype, buffer=attachSharedMemory((slotidx, "out", i), name).buf)[start:stop]
+			for i, (name, shape, dtype) in enumerate(outspecs)
+		]
+
+		if len(outputs) != len(views) or any(out.shape != view.shape for out, view in zip(outputs, views)):
+			return batch, threadidx
+
+		for out, view in zip(outputs, views):
+			view[...] = out
+
+		return None, threadidx
@@ -1,11 +1,12 @@
 import numpy as np
 
 from PuzzleLib.Transformers.Provider import Provider
+from PuzzleLib.Transformers.Transformer import Transformer
 
 
 class Serial(Provider):
-	def __init__(self, dataset, labels=None, numofthreads=4):
-		super().__init__(numofthreads)
+	def __init__(self, dataset, labels=None, numofthreads=4, sharedMemory=False):
+		super().__init__(numofthreads, sharedMemory)
 
 		self.datalen = dataset.shape[0]
 
@@ -37,7 +38,7 @@ class Serial(Provider):
 			chunk[self.datalen - begin:] = self.dataset[:self.index]
 
 			if self.labels is not None:
-				labels = np.empty((chunksize, ) + self.dataset.shape[1:], dtype=self.labels.dtype)
+				labels = np.empty((chunksize, ) + self.labels.shape[1:], dtype=self.labels.dtype)
 				tup = (chunk, labels)
 
 				labels[:self.datalen - begin] = self.labels[begin:self.datalen]
@@ -55,7 +56,20 @@ class Serial(Provider):
 		return tup
 
 
+class TestScaleTransformer(Transformer):
+	def __call__(self, batch, threadidx):
+		data, labels = batch
+		return (2.0 * data).astype(np.float32), labels
+
+
 def unittest():
+	zipTest()
+	sharedMemoryTest()
+	attachTest()
+	streamTest()
+
+
+def zipTest():
 	from PuzzleLib.Datasets.ZipLoader import ZipLoader
 
 	zipfile = ZipLoader()
@@ -67,5 +81,58 @@ def unittest():
 			serial.getData()
 
 
+def sharedMemoryTest():
+	data = np.random.randn(64, 3, 8, 8).astype(np.float32)
+	labels = np.random.randint(0, 10, size=(64, ), dtype=np.int32)
+
+	with Serial(data, labels, sharedMemory=True) as serial:
+		serial.addTransformer(TestScaleTransformer())
+
+		for i in range(4):
+			serial.prepareData(chunksize=16)
+			outdata, outlabels = serial.getData()
+
+			assert np.allclose(outdata, 2.0 * data[i * 16:(i + 1) * 16])
+			assert np.all(outlabels == labels[i * 16:(i + 1) * 16])
+
+		assert serial.outlayout is not None and outdata.base is not None
+
+
+def attachTest():
+	from multiprocessing.shared_memory import SharedMemory
+	from PuzzleLib.Transformers.Provider import attachSharedMemory, attachedMemory
+
+	segments = [SharedMemory(create=True, size=64) for _ in range(2)]
+
+	try:
+		first = attachSharedMemory((0, "out", 0), segments[0].name)
+		assert attachSharedMemory((0, "out", 0), segments[0].name) is first
+
+		second = attachSharedMemory((0, "out", 0), segments[1].name)
+		assert second is not first and first.buf is None and attachedMemory[(0, "out", 0)] is second
+
+		second.close()
+		del attachedMemory[(0, "out", 0)]
+
+	finally:
+		for shm in segments:
+			shm.close()
+			shm.unlink()
+
+
+def streamTest():
+	data = np.random.randn(64, 3, 8, 8).astype(np.float32)
+	labels = np.random.randint(0, 10, size=(64, ), dtype=np.int32)
+
+	with Serial(data, labels) as serial:
+		serial.addTransformer(TestScaleTransformer())
+
+		for i, (outdata, outlabels) in zip(range(8), serial.stream(chunksize=16, inflight=3, workitems=5)):
+			i %= 4
+
+			assert np.allclose(outdata, 2.0 * data[i * 16:(i + 1) * 16])
+			assert np.all(outlabels == labels[i * 16:(i + 1) * 16])
+
+
 if __name__ == "__main__":
 	unittest()
@@ -6,7 +6,7 @@ class Variable:
 	index = 0
 
 
-	def __init__(self, data, name=None, withgrad=True, grad=None, updater=None, postUpdater=None):
+	def __init__(self, data, name=None, withgrad=True, grad=None, updater=None, postUpdater=None, rowSparse=False):
 		if name is None:
 			self.name = str(type(self).index)
 			type(self).index += 1
@@ -16,6 +16,9 @@ class Variable:
 		self.data = data
 		self.updater = updater
 
+		self.rowSparse = rowSparse
+		self.rows = None
+
 		if updater is not None:
 			return
 